@@ -0,0 +1,40 @@
+"""Market aggregate added
+
+Revision ID: 5b2f8e41c9d7
+Revises: 7394e0001ea8
+Create Date: 2021-06-01 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2f8e41c9d7'
+down_revision = '7394e0001ea8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('market_aggregate',
+    sa.Column('id', sa.BIGINT(), nullable=False),
+    sa.Column('state_id', sa.BIGINT(), nullable=False),
+    sa.Column('city_id', sa.BIGINT(), nullable=False),
+    sa.Column('realty_type_id', sa.BIGINT(), nullable=False),
+    sa.Column('operation_type_id', sa.BIGINT(), nullable=False),
+    sa.Column('count', sa.BIGINT(), nullable=False),
+    sa.Column('price_sum', sa.Float(), nullable=False),
+    sa.Column('square_count', sa.BIGINT(), nullable=False),
+    sa.Column('square_sum', sa.Float(), nullable=False),
+    sa.Column('price_per_square_sum', sa.Float(), nullable=False),
+    sa.Column('price_per_square_sketch', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('state_id', 'city_id', 'realty_type_id', 'operation_type_id')
+    )
+
+
+def downgrade():
+    op.drop_table('market_aggregate')
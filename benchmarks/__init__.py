@@ -0,0 +1,4 @@
+"""
+Performance benchmarks of the service.
+Run single benchmark with: python -m benchmarks.<name>
+"""
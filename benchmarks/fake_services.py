@@ -0,0 +1,213 @@
+"""
+Local stand-ins of DomRia API and OLX site for offline benchmarks.
+
+DomRia endpoints (states, cities, options, search, info) answer with recorded JSON,
+OLX listing and ad pages are rendered from recorded HTML.
+Every search and listing page returns ads that were not returned before,
+so repeated benchmark runs load new realties instead of hitting duplicates
+"""
+import csv
+import itertools
+import json
+import os
+import re
+import threading
+from copy import deepcopy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import Template
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+from service_api.constants import PATH_TO_CITIES_CSV, PATH_TO_METADATA, PATH_TO_STATE_CSV
+
+RECORDED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recorded")
+# DomRia updater takes ad id from the last 8 digits of url
+FIRST_AD_ID = 20_000_000
+
+
+def read_recorded(name: str) -> str:
+    """
+    Content of recorded response
+    """
+    with open(os.path.join(RECORDED_DIR, name), encoding="utf-8") as file:
+        return file.read()
+
+
+def read_csv(path: str) -> List[Dict]:
+    """
+    Rows of static data csv file
+    """
+    with open(path, encoding="utf-8") as file:
+        return list(csv.DictReader(file))
+
+
+class FakeServices:
+    """
+    Data served by stand-ins. Settings can be changed while server is running
+
+    :param search_ads_number: int - number of ids in every DomRia search response
+    :param listing_ads_number: int - number of ads on every OLX listing page
+    :param listing_pages: int - number of OLX listing pages of every search
+    """
+
+    def __init__(self, search_ads_number: int = 100, listing_ads_number: int = 40, listing_pages: int = 3) -> None:
+        self.search_ads_number = search_ads_number
+        self.listing_ads_number = listing_ads_number
+        self.listing_pages = listing_pages
+        # added to prices of all ads, increase it to make updater rewrite realties
+        self.revision = 0
+        self.ids = itertools.count(FIRST_AD_ID)
+        self.lock = threading.Lock()
+
+        self.domria_ads = json.loads(read_recorded("domria_ads.json"))
+        self.domria_options = json.loads(read_recorded("domria_options.json"))
+        with open(PATH_TO_METADATA, encoding="utf-8") as file:
+            realty_types = json.load(file)["DOMRIA API"]["entities"]["realty_type"]
+        self.realty_type_names = {str(realty_type_id): name for name, realty_type_id in realty_types.items()}
+        self.states = [{"stateID": int(row["self_id"]), "name": row["name"]} for row in read_csv(PATH_TO_STATE_CSV)]
+        self.cities = {}
+        for row in read_csv(PATH_TO_CITIES_CSV):
+            self.cities.setdefault(row["state_id"], []).append({"cityID": int(row["self_id"]), "name": row["name"]})
+
+        self.olx_listing = Template(read_recorded("olx_listing.html"))
+        self.olx_ad = Template(read_recorded("olx_ad.html"))
+
+    def new_ids(self, number: int) -> List[int]:
+        """
+        Ids of ads that were not returned yet
+        """
+        with self.lock:
+            return [next(self.ids) for _ in range(number)]
+
+    def domria_ad(self, ad_id: int) -> Dict:
+        """
+        Recorded DomRia ad with given id
+        """
+        ad = deepcopy(self.domria_ads[ad_id % len(self.domria_ads)])
+        ad["realty_id"] = ad_id
+        ad["beautiful_url"] = re.sub(r"\d+\.html$", f"{ad_id}.html", ad["beautiful_url"])
+        ad["price"] += self.revision
+        return ad
+
+    def domria_options_response(self, realty_type_id: str) -> List[Dict]:
+        """
+        Characteristics of realty type in DomRia format
+        """
+        characteristics = self.domria_options.get(self.realty_type_names.get(realty_type_id), {})
+        return [{"items": [{"field_name": name, "characteristic_id": characteristic_id}
+                           for name, characteristic_id in characteristics.items()]}]
+
+    def olx_listing_page(self, base_url: str, path: str, page: int) -> str:
+        """
+        OLX listing page with links to new ads and to the next page
+        """
+        ads = "\n".join(f'<a data-cy="listing-ad-title" href="{base_url}/olx/d/uk/obyavlenie/{ad_id}.html">'
+                        f'<h6>Квартира {ad_id}</h6></a>' for ad_id in self.new_ids(self.listing_ads_number))
+        next_page = ""
+        if page < self.listing_pages:
+            next_page = f'<a data-cy="page-link-next" href="{base_url}{path}?page={page + 1}">Далі</a>'
+        return self.olx_listing.substitute(ads=ads, next_page=next_page)
+
+    def olx_ad_page(self, ad_id: int) -> str:
+        """
+        OLX ad page
+        """
+        price = f"{30000 + ad_id % 1000 + self.revision:,}".replace(",", " ")
+        return self.olx_ad.substitute(ad_id=ad_id, price=price, floor=ad_id % 9 + 1, square=30 + ad_id % 70)
+
+
+class FakeServicesHandler(BaseHTTPRequestHandler):
+    """
+    Routes requests to DomRia (/domria) and OLX (/olx) stand-ins
+    """
+    server: "FakeServicesServer"
+    # keep-alive, so pooled connections of the app are reused like with real services
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """
+        Respond with stand-in of the requested service page
+        """
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        services = self.server.services
+        path = url.path.rstrip("/")
+
+        if path == "/domria/states":
+            return self.send_json(services.states)
+        if match := re.fullmatch(r"/domria/cities/(\d+)", path):
+            return self.send_json(services.cities.get(match.group(1), []))
+        if path == "/domria/options":
+            return self.send_json(services.domria_options_response(query.get("realty_type", [""])[0]))
+        if path == "/domria/search":
+            ids = services.new_ids(services.search_ads_number)
+            return self.send_json({"items": ids, "count": len(ids)})
+        if match := re.fullmatch(r"/domria/info/(\d+)", path):
+            return self.send_json(services.domria_ad(int(match.group(1))))
+        if match := re.fullmatch(r"/olx/d/uk/obyavlenie/(\d+)\.html", path):
+            return self.send_html(services.olx_ad_page(int(match.group(1))))
+        if path.startswith("/olx"):
+            page = int(query.get("page", ["1"])[0])
+            return self.send_html(services.olx_listing_page(self.server.base_url, url.path, page))
+        return self.send_error(404)
+
+    def send_json(self, data) -> None:
+        """
+        Respond with json body
+        """
+        self.send_body(json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json")
+
+    def send_html(self, html: str) -> None:
+        """
+        Respond with html page
+        """
+        self.send_body(html.encode("utf-8"), "text/html; charset=utf-8")
+
+    def send_body(self, body: bytes, content_type: str) -> None:
+        """
+        Respond with 200 and body
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """
+        Don't write access log to stderr
+        """
+
+
+class FakeServicesServer(ThreadingHTTPServer):
+    """
+    HTTP server of stand-ins running in background thread
+
+        with FakeServicesServer() as server:
+            flask_app.config["SERVICE_BASE_URLS"] = server.service_base_urls()
+    """
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, advertised_host: str = None,
+                 services: FakeServices = None) -> None:
+        """
+        :param advertised_host: str - host in urls of OLX pages, when selenium runs on another machine
+        """
+        super().__init__((host, port), FakeServicesHandler)
+        self.services = services or FakeServices()
+        self.base_url = f"http://{advertised_host or host}:{self.server_address[1]}"
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def service_base_urls(self) -> Dict[str, str]:
+        """
+        Value of SERVICE_BASE_URLS config that points services to stand-ins
+        """
+        return {"DOMRIA API": f"{self.base_url}/domria", "OLX": f"{self.base_url}/olx/uk/"}
+
+    def __enter__(self) -> "FakeServicesServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,130 @@
+"""
+Replay of logged realty filters against the latest data cache: hit rate with keys of filters
+as they were validated vs keys of filters in canonical form.
+Filters are taken from "Realty filters: ..." debug records of the service log (plain or json lines),
+only requests with latest flag are replayed as only they are cached. Without a log
+synthetic traffic with equivalent spellings of the same filters is generated:
+
+    python -m benchmarks.filter_cache_replay logs/service.log
+    python -m benchmarks.filter_cache_replay --synthetic 10000
+"""
+import argparse
+import ast
+import datetime
+import json
+import random
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from service_api.client_api.utils import hash_key
+from service_api.constants import CACHED_REQUESTS_EXPIRE_TIME
+from service_api.exceptions import BadFiltersException
+from service_api.models import AdditionalFilters, Realty, RealtyDetails
+from service_api.schemas import (AdditionalFilterParametersSchema, RealtyDetailsInputSchema, RealtySchema,
+                                 filters_validation)
+from service_api.utils.canonical_filters import canonical_filters
+
+FILTERS_RECORD = re.compile(r"^(?P<time>\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)?.*?Realty filters: (?P<filters>\{.*\})\s*$")
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def read_log(path: str) -> Iterator[Tuple[Optional[datetime.datetime], Dict]]:
+    """
+    Logged filters of requests with their time
+    """
+    with open(path, encoding="utf-8") as log:
+        for line in log:
+            if line.startswith("{"):
+                record = json.loads(line)
+                line = f"{record.get('time', '')} {record.get('message', '')}"
+            if not (match := FILTERS_RECORD.match(line)):
+                continue
+            time = datetime.datetime.strptime(match["time"], TIME_FORMAT) if match["time"] else None
+            yield time, ast.literal_eval(match["filters"])
+
+
+def synthetic_log(size: int, seed: int = 0) -> Iterator[Tuple[Optional[datetime.datetime], Dict]]:
+    """
+    Requests for a small set of searches, every search is spelled in different ways as clients do:
+    ids as strings, zero lower bounds, empty characteristics and integral floats
+    """
+    rand = random.Random(seed)
+    started_at = datetime.datetime(2021, 5, 1)
+    for index in range(size):
+        city_id, realty_type_id = rand.randint(1, 10), rand.randint(1, 3)
+        price_le = rand.choice((50000, 100000))
+        filters = {"latest": True, "page": rand.randint(1, 3), "page_ads_number": 10, "operation_type_id": 1,
+                   "city_id": rand.choice((city_id, str(city_id))),
+                   "realty_type_id": rand.choice((realty_type_id, str(realty_type_id)))}
+        price = rand.choice(({"le": price_le}, {"ge": 0, "le": price_le}, {"le": float(price_le)}))
+        filters["price"] = price
+        if rand.random() < 0.3:
+            filters["square"] = {}
+        yield started_at + datetime.timedelta(seconds=index), filters
+
+
+def split_filters(filters: Dict) -> Optional[Dict]:
+    """
+    Filters split by sections as RealtyResource does, None for requests that aren't cached
+    """
+    filters = dict(filters)
+    if not filters.pop("latest", False):
+        return None
+    filters.pop("expand", None)
+    try:
+        realty_dict, realty_details_dict, additional_params_dict, *_ = filters_validation(
+            filters,
+            [(Realty, RealtySchema),
+             (RealtyDetails, RealtyDetailsInputSchema),
+             (AdditionalFilters, AdditionalFilterParametersSchema)])
+    except BadFiltersException:
+        return None
+    return {"realty_filters": realty_dict, "characteristics": realty_details_dict,
+            "additional": additional_params_dict}
+
+
+def replay(records: List[Tuple[Optional[datetime.datetime], Dict]]) -> Dict[str, float]:
+    """
+    Hit rate of cache with CACHED_REQUESTS_EXPIRE_TIME for raw and canonical keys.
+    Records without time are considered to be sent at once
+    """
+    expire_time = datetime.timedelta(**CACHED_REQUESTS_EXPIRE_TIME)
+    caches = {"raw": {}, "canonical": {}}
+    hits = dict.fromkeys(caches, 0)
+    requests = 0
+    for time, filters in records:
+        if (request_filters := split_filters(filters)) is None:
+            continue
+        requests += 1
+        now = time or datetime.datetime.min
+        keys = {"raw": hash_key(request_filters), "canonical": hash_key(canonical_filters(request_filters))}
+        for name, key in keys.items():
+            if (expires_at := caches[name].get(key)) is not None and now < expires_at:
+                hits[name] += 1
+            else:
+                caches[name][key] = now + expire_time
+    result = {"requests": requests}
+    result.update({name: hits[name] / requests if requests else 0.0 for name in caches})
+    return result
+
+
+def main():
+    """
+    Replay realty filters and print hit rate of the cache
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", nargs="?", help="service log with debug records of realty filters")
+    parser.add_argument("--synthetic", type=int, default=10000, help="synthetic requests if log isn't passed")
+    args = parser.parse_args()
+
+    records = list(read_log(args.log) if args.log else synthetic_log(args.synthetic))
+    result = replay(records)
+    print(f"{'source':>10}: {args.log or 'synthetic'}")
+    print(f"{'requests':>10}: {result['requests']}")
+    print(f"{'raw':>10}: {result['raw']:8.1%} hit rate")
+    print(f"{'canonical':>10}: {result['canonical']:8.1%} hit rate")
+    print(f"{'gain':>10}: {result['canonical'] - result['raw']:+8.1%}")
+
+
+if __name__ == "__main__":
+    main()
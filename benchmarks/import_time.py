@@ -0,0 +1,102 @@
+"""
+Import time of the app for every process role, measured with `python -X importtime` in a fresh interpreter.
+Fails (exit code 1) if a role imports modules it must not need or is slower than --max-ms,
+so it can be run in CI to catch eager imports:
+
+    python -m benchmarks.import_time --role api --max-ms 800
+"""
+import argparse
+import subprocess
+import sys
+from typing import Dict, List, NamedTuple
+
+ROLES = ("api", "grabbing", "worker", "all")
+# top-level packages that processes of the role never use
+FORBIDDEN_MODULES = {
+    "api": ("selenium", "bs4", "celery", "service_api.services", "service_api.grabbing_api"),
+    "grabbing": ("selenium", "bs4", "service_api.services", "service_api.client_api"),
+    "worker": (),
+    "all": ()
+}
+
+
+class ImportRecord(NamedTuple):
+    """
+    Line of -X importtime output
+    """
+    module: str
+    self_us: int
+    cumulative_us: int
+    # 0 for modules imported directly by the measured code
+    depth: int
+
+
+def measure_imports(role: str) -> List[ImportRecord]:
+    """
+    Import app with components of role in a new interpreter and parse its import times
+    """
+    code = f"import service_api; service_api.create_app({role!r})"
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                             check=True)
+    records = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        depth = (len(module) - len(module.lstrip()) - 1) // 2
+        records.append(ImportRecord(module.strip(), int(self_us), int(cumulative_us), depth))
+    return records
+
+
+def forbidden_imports(role: str, records: List[ImportRecord]) -> List[str]:
+    """
+    Imported modules that role must not need
+    """
+    return [record.module for record in records
+            if any(record.module == prefix or record.module.startswith(prefix + ".")
+                   for prefix in FORBIDDEN_MODULES[role])]
+
+
+def summarize(role: str, records: List[ImportRecord], top: int) -> Dict:
+    """
+    Total import time of the app and the heaviest imports of the role
+    """
+    # interpreter startup imports are listed before the app, components of role after it
+    app_index = next(index for index, record in enumerate(records) if record.module == "service_api")
+    total_us = sum(record.cumulative_us for record in records[app_index:] if record.depth == 0)
+    return {
+        "role": role,
+        "total_ms": total_us / 1000,
+        "modules": len(records),
+        "heaviest": sorted(records, key=lambda record: record.self_us, reverse=True)[:top],
+        "forbidden": forbidden_imports(role, records)
+    }
+
+
+def main(argv: List[str] = None) -> None:
+    """
+    Measure import time of every role and print the heaviest modules
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--role", "-r", dest="roles", action="append", choices=ROLES, help="Role, all by default")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if import of a role takes longer")
+    parser.add_argument("--top", type=int, default=10, help="Number of the heaviest modules to show")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for role in args.roles or ROLES:
+        summary = summarize(role, measure_imports(role), args.top)
+        print(f"{role}: {summary['total_ms']:.1f} ms, {summary['modules']} modules")
+        for record in summary["heaviest"]:
+            print(f"    {record.self_us / 1000:8.1f} ms  {record.module}")
+        if summary["forbidden"]:
+            failed = True
+            print(f"    FORBIDDEN: {', '.join(summary['forbidden'])}")
+        if args.max_ms is not None and summary["total_ms"] > args.max_ms:
+            failed = True
+            print(f"    SLOWER than {args.max_ms} ms")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
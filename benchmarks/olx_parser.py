@@ -0,0 +1,110 @@
+"""
+Microbenchmark of OLX pages parsing over recorded pages (see fake_services): parsing driven by raw
+parser metadata as it was done before vs compiled parser specification. Also counts lookups of
+patterns in `re` module per ad page, compiled specification must not do any.
+Neither database, redis nor selenium is required
+"""
+import re
+import timeit
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+from unittest import mock
+
+from bs4 import BeautifulSoup
+
+from benchmarks.fake_services import FakeServices
+from service_api.constants import PATH_TO_PARSER_METADATA
+from service_api.services.olx.convertors import OlxParser
+from service_api.utils import open_metadata
+
+PAGES = 50
+REPEAT = 7
+NUMBER = 3
+LOCATION = "Вінниця, Ленінський\nВінницька область"
+
+
+def metadata_parse_page(parser_metadata: Dict, html: str) -> Dict:
+    """
+    Ad page parsed with patterns built from metadata on every call
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    result = {}
+    for tag in soup.find("ul", attrs={"class": parser_metadata["tags"]["class"]}):
+        tag = str(tag.contents[0].string)
+        if tag.startswith(parser_metadata["tags"]["floor"]):
+            result["floor"] = int(float(tag[tag.find(":") + 2:]))
+        elif tag.startswith(parser_metadata["tags"]["floors_number"]):
+            result["floors_number"] = int(float(tag[tag.find(":") + 2:]))
+        elif tag.startswith(parser_metadata["tags"]["square"]):
+            result["square"] = float(re.search(": (.*?) м", tag).group(1))
+        elif re.search("|".join(parser_metadata["tags"]["realty_type"]), tag):
+            result["realty_type_id"] = tag[tag.find(":") + 2:]
+
+    price = str(soup.find(parser_metadata["price"]["html_tag"], attrs={"class": parser_metadata["price"]["class"]}))
+    result["price"] = (float(re.search(">(.*?)<!--", price).group(1).replace(" ", "")),
+                       re.search("<!-- -->(.*?)</h3>", price).group(1)[9:])
+
+    date = str(soup.find(parser_metadata["published_at"]["html_tag"],
+                         attrs={"class": parser_metadata["published_at"]["class"]}).string)
+    year, day = re.search(r"\d{4}", date).group(), re.search(r"\d{2}", date).group()
+    month = re.search("|".join(parser_metadata["published_at"]["months"].keys()), date).group()
+    result["published_at"] = f"{year}-{parser_metadata['published_at']['months'][month]}-{day} 00:00:00"
+
+    result["city_id"] = LOCATION[:LOCATION.find("\n") - 1].split(",")[0]
+    result["state_id"] = re.search("(.*?) область", LOCATION).group(1)
+    links = soup.findAll(parser_metadata["operation_type"]["html_tag"],
+                         attrs={"class": parser_metadata["operation_type"]["class"]})
+    for element in links[2:4]:
+        if operation_type := re.search("|".join(parser_metadata["operation_type"]["types"]), str(element)):
+            result["operation_type_id"] = operation_type.group()
+            break
+    original_id = soup.find(parser_metadata["original_id"]["html_tag"],
+                            attrs={"class": parser_metadata["original_id"]["class"]})
+    result["original_id"] = int(original_id.text[4:])
+    return result
+
+
+@contextmanager
+def count_pattern_lookups() -> Iterator[List[int]]:
+    """
+    Count calls of re module functions that look up or compile patterns
+    """
+    counter = [0]
+    compile_pattern = re._compile  # pylint: disable=protected-access
+
+    def counted(*args, **kwargs):
+        counter[0] += 1
+        return compile_pattern(*args, **kwargs)
+
+    with mock.patch.object(re, "_compile", counted):
+        yield counter
+
+
+def main():
+    """
+    Time parsing of OLX listing and ad pages
+    """
+    services = FakeServices()
+    pages = [services.olx_ad_page(ad_id) for ad_id in range(PAGES)]
+    listing = services.olx_listing_page("http://127.0.0.1", "/olx/nedvizhimost/", 1)
+    service_metadata = open_metadata(PATH_TO_PARSER_METADATA)["OLX"]
+    parser_metadata = service_metadata["urls"]["single_ad"]["parser"]
+    parser = OlxParser(service_metadata)
+
+    assert metadata_parse_page(parser_metadata, pages[0]) == parser.parse_page(pages[0], LOCATION)
+    results = {}
+    for name, func in (("metadata", lambda: [metadata_parse_page(parser_metadata, page) for page in pages]),
+                       ("compiled spec", lambda: [parser.parse_page(page, LOCATION) for page in pages])):
+        with count_pattern_lookups() as lookups:
+            func()
+        best = min(timeit.repeat(func, repeat=REPEAT, number=NUMBER)) / NUMBER / PAGES
+        results[name] = best
+        print(f"{name:>14}: {best * 1000:8.3f} ms per ad page, {lookups[0] / PAGES:4.1f} re lookups per ad page")
+    print(f"{'speedup':>14}: {results['metadata'] / results['compiled spec']:8.2f}x")
+
+    best = min(timeit.repeat(lambda: OlxParser.parse_listing(listing), repeat=REPEAT, number=NUMBER)) / NUMBER
+    print(f"{'listing page':>14}: {best * 1000:8.3f} ms per page of {services.listing_ads_number} ads")
+
+
+if __name__ == "__main__":
+    main()
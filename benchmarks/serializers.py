@@ -0,0 +1,73 @@
+"""
+Microbenchmark of realty serialization: marshmallow + json vs precompiled serializer + json
+(the same bytes flask_restful output_json sends) and + orjson (async grabbing api).
+Realty objects are built in memory, so neither database nor redis is required
+"""
+import json
+import timeit
+from datetime import datetime
+
+from service_api.models import City, OperationType, Realty, RealtyDetails, RealtyType, Service, State
+from service_api.schemas import RealtySchema
+from service_api.serializers import dumps, serialize
+
+PAGE_SIZE = 100
+REPEAT = 5
+NUMBER = 20
+
+
+def make_page(size: int = PAGE_SIZE):
+    """
+    Build a page of realties with all relations loaded
+    """
+    city = City(id=1, name="Київ", self_id=301, state_id=1)
+    state = State(id=1, name="Київська", self_id=111)
+    realty_type = RealtyType(id=2, name="Квартира", self_id=102, category_id=1)
+    operation_type = OperationType(id=1, name="Продаж", self_id=201)
+    service = Service(id=1, name="DOMRIA API")
+    return [Realty(id=index, city=city, state=state, realty_type=realty_type, operation_type=operation_type,
+                   service=service,
+                   realty_details=RealtyDetails(id=index, floor=index % 9 + 1, floors_number=9, square=40.0 + index,
+                                                price=30000.0 + index, published_at=datetime(2021, 5, 1, 12, 30),
+                                                original_url=f"https://dom.ria.com/uk/{index}.html",
+                                                original_id=index))
+            for index in range(size)]
+
+
+def marshmallow_page(page):
+    """
+    Serialize page with marshmallow schema and json
+    """
+    return json.dumps(RealtySchema(many=True).dump(page), ensure_ascii=False)
+
+
+def compiled_page(page):
+    """
+    Serialize page with compiled serializer and json
+    """
+    return json.dumps(serialize(RealtySchema, page, many=True), ensure_ascii=False)
+
+
+def compiled_orjson_page(page):
+    """
+    Serialize page with compiled serializer and orjson
+    """
+    return dumps(serialize(RealtySchema, page, many=True))
+
+
+def main():
+    """
+    Time serializers and print time per page
+    """
+    page = make_page()
+    results = {}
+    for name, func in (("marshmallow+json", marshmallow_page), ("compiled+json", compiled_page),
+                       ("compiled+orjson", compiled_orjson_page)):
+        best = min(timeit.repeat(lambda func=func: func(page), repeat=REPEAT, number=NUMBER)) / NUMBER
+        results[name] = best
+        print(f"{name:>18}: {best * 1000:8.3f} ms per page of {PAGE_SIZE}")
+    print(f"{'speedup':>18}: {results['marshmallow+json'] / results['compiled+json']:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
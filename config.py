@@ -1,6 +1,8 @@
 """
 Flask config
 """
+import json
+import logging
 import os
 basedir = os.path.abspath(os.path.dirname(__file__))
 
@@ -16,6 +18,54 @@ class Config:
     CELERY_BROKER_URL = os.environ['CELERY_BROKER_URL']
     CELERY_BACKEND_URL = os.environ['CELERY_BACKEND_URL']
     SELENIUM_URL = os.environ['SELENIUM_URL']
+    # how realty details are loaded with realties: joined, selectin or lazy
+    REALTY_LOADING_STRATEGY = os.environ.get('REALTY_LOADING_STRATEGY', 'joined')
+    LOG_LEVEL = logging.DEBUG
+    # levels of modules that differ from LOG_LEVEL, submodules are included
+    LOG_MODULE_LEVELS = {
+        'service_api.celery_tasks.updaters': logging.INFO,
+        'service_api.utils.loaders': logging.INFO
+    }
+    # share of DEBUG records of every log call that are written
+    LOG_DEBUG_SAMPLE_RATE = 0.1
+    # where finished tracing spans go: noop (tracing disabled), console or file
+    TRACING_EXPORTER = os.environ.get('TRACING_EXPORTER', 'noop')
+    TRACING_FILE = os.environ.get('TRACING_FILE', 'logs/traces.jsonl')
+    # base urls of services that replace ones from metadata, e.g. {"DOMRIA API": "http://127.0.0.1:8001/domria"}
+    SERVICE_BASE_URLS = json.loads(os.environ.get('SERVICE_BASE_URLS', '{}'))
+    # requests with this token in X-Profile header are profiled, profiling of requests is off without it
+    PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN')
+    # where profiles and SQL statements of profiled requests and tasks are saved
+    PROFILING_DIR = os.environ.get('PROFILING_DIR', 'logs/profiles')
+    # what the process serves: api (client api), grabbing (grabbing api), worker (celery tasks) or all
+    APP_ROLE = os.environ.get('APP_ROLE', 'all')
+    # DB pool and redis connections of every process role, None redis connections is an unbounded pool.
+    # api serves cached reads from many threads, grabbing mostly waits on redis streams,
+    # worker threads of a task share one process
+    ROLE_PROFILES = {
+        'api': {'DB_POOL_SIZE': 10, 'DB_MAX_OVERFLOW': 10, 'REDIS_MAX_CONNECTIONS': 20},
+        'grabbing': {'DB_POOL_SIZE': 1, 'DB_MAX_OVERFLOW': 2, 'REDIS_MAX_CONNECTIONS': 50},
+        'worker': {'DB_POOL_SIZE': 4, 'DB_MAX_OVERFLOW': 2, 'REDIS_MAX_CONNECTIONS': 10},
+        'all': {'DB_POOL_SIZE': 5, 'DB_MAX_OVERFLOW': 10, 'REDIS_MAX_CONNECTIONS': None}
+    }
+    # seconds to wait for a free redis connection of a bounded pool
+    REDIS_POOL_TIMEOUT = 5
+    # outbound requests to services: hosts with kept pools, kept-alive connections per host
+    # and whether threads wait for a free connection instead of opening an extra one
+    HTTP_POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS', 10))
+    HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 10))
+    HTTP_POOL_BLOCK = os.environ.get('HTTP_POOL_BLOCK', 'false').lower() == 'true'
+    # resilience of requests to services (see service_api.services.resilience.ServicePolicy):
+    # retries with exponential backoff, breaker that opens for open_seconds after failure_threshold
+    # failed requests, second request for single ad after hedge_after seconds (None disables hedging,
+    # DomRia hedges would spend tokens budget). DomRia counts every response against tokens budget
+    # and DomriaBudgetScheduler charges work before it is done, so its failed responses aren't retried,
+    # only network errors are
+    SERVICE_POLICIES = {
+        'DOMRIA API': {'retries': 2, 'retry_failed_responses': False, 'backoff': 0.5, 'failure_threshold': 5,
+                       'open_seconds': 30, 'hedge_after': None},
+        'OLX': {'retries': 2, 'backoff': 1.0, 'failure_threshold': 5, 'open_seconds': 60, 'hedge_after': 3.0}
+    }
 
 
 class ProductionConfig(Config):
@@ -23,6 +73,7 @@ class ProductionConfig(Config):
     Config for production
     """
     DEBUG = False
+    LOG_LEVEL = logging.INFO
 
 
 class StagingConfig(Config):
@@ -47,3 +98,4 @@ class TestingConfig(Config):
     """
     TESTING = True
     SQLALCHEMY_DATABASE_URL = os.environ['DATABASE_TEST_URL']
+    LOG_DEBUG_SAMPLE_RATE = 1.0
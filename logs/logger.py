@@ -1,29 +1,191 @@
 """
-File for setuping logger
+File for setuping logger.
+Records are put into in-memory queue on the calling thread and
+formatted and written to handlers by a background listener thread
 """
+import atexit
+import copy
+import itertools
+import json
 import logging
+import os
+import queue
 import sys
+from collections import defaultdict
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
 
 log_formatter = logging.Formatter(
     '%(asctime)s | [%(lineno)d]%(filename)s in %(funcName)s() -> [%(levelname)s]: %(message)s')
 
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-def setup_logger(logger_name, log_file, logging_level=logging.DEBUG):
+# attributes every LogRecord has, everything else is passed with `extra`
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", logging.INFO, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats record as one line json, fields passed with `extra` are added as is
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        Format record as one line json
+        """
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": module_name(record.pathname),
+            "line": record.lineno,
+            "function": record.funcName,
+            "message": record.getMessage()
+        }
+        data.update({key: value for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES})
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def module_name(pathname: str) -> str:
+    """
+    Dotted module name of source file, e.g. service_api.celery_tasks.updaters
+    """
+    relative = os.path.relpath(pathname, PROJECT_DIR)
+    return os.path.splitext(relative)[0].replace(os.sep, ".")
+
+
+class ModuleLevelFilter(logging.Filter):
+    """
+    Drops records below the level configured for the module they are logged from.
+    The longest configured module prefix wins, default level is used for other modules
+    """
+
+    def __init__(self, default_level: int, module_levels: Optional[Dict[str, int]] = None) -> None:
+        super().__init__()
+        self.default_level = default_level
+        self.module_levels = module_levels or {}
+        self.path_levels: Dict[str, int] = {}
+
+    def level_of(self, pathname: str) -> int:
+        """
+        Level of the source file. Calculated once per file
+        """
+        level = self.path_levels.get(pathname)
+        if level is None:
+            name = module_name(pathname)
+            prefixes = [prefix for prefix in self.module_levels if name == prefix or name.startswith(prefix + ".")]
+            level = self.module_levels[max(prefixes, key=len)] if prefixes else self.default_level
+            self.path_levels[pathname] = level
+        return level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """
+        Pass record if its level isn't lower than the level of its module
+        """
+        return record.levelno >= self.level_of(record.pathname)
+
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    Passes only every n-th DEBUG record of every log call, records of higher levels are always passed
     """
-    Can setup as many loggers as you want
+
+    def __init__(self, rate: float = 1.0) -> None:
+        """
+        :param rate: float - share of DEBUG records to keep, from 0 to 1
+        """
+        super().__init__()
+        self.every = round(1 / rate) if rate > 0 else 0
+        self.counters = defaultdict(itertools.count)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """
+        Pass records above DEBUG and every n-th DEBUG record of the log call
+        """
+        if record.levelno > logging.DEBUG:
+            return True
+        if not self.every:
+            return False
+        return next(self.counters[(record.pathname, record.lineno)]) % self.every == 0
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Queue handler that leaves formatting of records to the listener thread.
+    Message is merged with its args before enqueueing, so args changed after logging call
+    aren't seen by the listener. Records go to in-process queue only, so exception info
+    is kept for formatters and isn't made picklable
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Copy of record with merged message and without formatting
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class AsyncLogging:
+    """
+    Queue and listener of logger handlers. Listener is restarted in forked processes
+    (celery workers), because threads don't survive fork
+    """
+
+    def __init__(self, queue_handler: QueueHandler, *handlers: logging.Handler) -> None:
+        self.queue_handler = queue_handler
+        self.handlers = handlers
+        self.listener = None
+        self.start()
+        atexit.register(self.stop)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self.start)
+
+    def start(self) -> None:
+        """
+        Start listener with new queue
+        """
+        self.queue_handler.queue = queue.SimpleQueue()
+        self.listener = QueueListener(self.queue_handler.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self) -> None:
+        """
+        Write remaining records and stop listener
+        """
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+
+def setup_logger(logger_name, log_file, logging_level=logging.DEBUG, module_levels: Optional[Dict[str, int]] = None,
+                 debug_sample_rate: float = 1.0):
+    """
+    Can setup as many loggers as you want.
+    File gets json records, console gets human readable ones
+
+    :param module_levels: Dict[str, int] - levels of modules (and their submodules) that differ from logging_level
+    :param debug_sample_rate: float - share of DEBUG records of every log call to keep
     """
 
     file_handler = logging.FileHandler(log_file)
-    file_handler.setFormatter(log_formatter)
+    file_handler.setFormatter(JsonFormatter())
     file_handler.setLevel(logging.INFO)
 
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(log_formatter)
     console_handler.setLevel(logging.DEBUG)
 
+    queue_handler = LazyQueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(ModuleLevelFilter(logging_level, module_levels))
+    queue_handler.addFilter(DebugSamplingFilter(debug_sample_rate))
+    queue_handler.async_logging = AsyncLogging(queue_handler, file_handler, console_handler)
+
     logger = logging.getLogger(logger_name)
-    logger.setLevel(logging_level)
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    logger.setLevel(min([logging_level, *(module_levels or {}).values()]))
+    logger.addHandler(queue_handler)
 
     return logger
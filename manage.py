@@ -3,16 +3,20 @@ CLI for app management
 """
 import os
 import re
+import subprocess
 from typing import Dict
 
 import click
 
 
-from service_api import Base, session_scope, flask_app, LOGGER, engine
+import service_api
+from service_api import Base, flask_app, session_scope, create_app, LOGGER
+from service_api.constants import APP_ROLES, CELERY_QUEUES, PATH_TO_CORE_DB_METADATA
 from service_api.exceptions import MetaDataError
-from service_api.utils.db import CoreDataLoadersFactory
+from service_api.utils import open_metadata
 
-BASE_ENTITIES = CoreDataLoadersFactory.get_available_entities()
+# the same entities CoreDataLoadersFactory loads, it isn't imported for other commands
+BASE_ENTITIES = list(open_metadata(PATH_TO_CORE_DB_METADATA)["CORE DATA"])
 
 
 def parse_entities(ctx, param, values) -> Dict:
@@ -34,29 +38,97 @@ def parse_entities(ctx, param, values) -> Dict:
     return entities
 
 
-cli = click.Group(name="commands")
+@click.group(name="commands")
+@click.option("--role", "-r", show_default=True, type=click.Choice(list(APP_ROLES)),
+              default=os.environ.get("APP_ROLE", "all"), help="Process role, sets DB pool and redis connections")
+@click.pass_context
+def cli(ctx, role):
+    """
+    Sets process role for commands. DB and redis resources of the role are created on first access,
+    app with components of the role is created only by commands that serve requests
+    """
+    flask_app.config["APP_ROLE"] = role
+    ctx.obj = role
 
 
 @cli.command("runserver")
 @click.option("--port", "-p", show_default=True, type=str, default=os.environ.get("CS_HOST_PORT"), required=True)
 @click.option("--host", "-h", show_default=True, type=str, default=os.environ.get("CS_HOST_IP"), required=True)
 @click.option("--config", "-c", show_default=True, type=str, default=os.environ.get("FLASK_ENV"), required=True)
-def run_app(port, host, config):
+@click.pass_obj
+def run_app(role, port, host, config):
     """
     Starts flask application in development mode
     """
     # flask_app.config.from_object(config)
-    flask_app.run(port=port, host=host)
+    create_app(role).run(port=port, host=host)
 
 
 @cli.command("run_celery")
-def run_celery():
+@click.option("--queue", "-Q", "queues", multiple=True, default=list(CELERY_QUEUES), show_default=True,
+              type=click.Choice(list(CELERY_QUEUES)), help="Queue to start worker for")
+@click.option("--beat/--no-beat", default=True, show_default=True, help="Run scheduler of periodic tasks")
+@click.option("--concurrency", "-c", type=int, default=None,
+              help="Worker processes of every started queue instead of CELERY_QUEUES concurrency")
+def run_celery(queues, beat, concurrency):
     """
-    Start celery application in `beat` mode
+    Start separate celery worker for every queue
+    with concurrency and prefetch from CELERY_QUEUES.
     `celery_app` defined in service_api
-    `-B` mean beat mode. It's for running periodic tasks
+    `beat` is for running periodic tasks
+    """
+    commands = [
+        ["celery", "-A", "service_api.celery_app", "worker", "-Q", queue, "-n", f"{queue}@%h",
+         "--concurrency", str(concurrency or CELERY_QUEUES[queue]["concurrency"]),
+         "--prefetch-multiplier", str(CELERY_QUEUES[queue]["prefetch_multiplier"]), "--loglevel=info"]
+        for queue in queues
+    ]
+    if beat:
+        commands.append(["celery", "-A", "service_api.celery_app", "beat", "--loglevel=info"])
+
+    # workers create DB and redis pools of worker role on first access
+    processes = [subprocess.Popen(command, env=dict(os.environ, APP_ROLE="worker")) for command in commands]
+    for process in processes:
+        process.wait()
+
+
+@cli.command("skipped_tasks")
+def skipped_tasks() -> None:
+    """
+    Show how many duplicated celery tasks were skipped
+    because the same task was already running
+    """
+    from service_api.celery_tasks.locks import get_skipped_tasks
+    for task_name, count in get_skipped_tasks().items():
+        LOGGER.info("%s: %s", task_name, count)
+
+
+@cli.command("rebuild_aggregates")
+def rebuild_aggregates() -> None:
+    """
+    Recalculate market aggregates from all actual realties.
+    Aggregates are kept up to date by loaders and updaters,
+    so it is needed only once after the aggregates table is created
+    """
+    from service_api.utils.aggregates import rebuild_market_aggregates
+    rebuild_market_aggregates()
+
+
+@cli.command("profiles")
+@click.option("--show", "-s", "profile_id", default=None, help="Id of profile to summarize")
+@click.option("--limit", "-l", default=20, show_default=True, help="Functions and SQL statements to show")
+def profiles(profile_id, limit) -> None:
+    """
+    List profiles of requests and tasks saved to PROFILING_DIR
+    or show the slowest functions and SQL statements of one of them
     """
-    os.system("celery  -A service_api.celery_app worker -B --loglevel=info")
+    from service_api.profiling import list_profiles, summarize_profile
+    if profile_id is not None:
+        click.echo(summarize_profile(profile_id, limit))
+        return
+    for summary in list_profiles()[:limit]:
+        click.echo(f"{summary['id']}  {summary['name']}: {summary['duration_s']:.3f} s, "
+                   f"{summary['sql_count']} SQL statements ({summary['sql_duration_ms']:.1f} ms)")
 
 
 @cli.command("load_core_data")
@@ -82,6 +154,7 @@ def fill_db_with_core_data(columns, load_all) -> None:
     (Params are only available for cities)
     """
 
+    from service_api.utils.db import CoreDataLoadersFactory
     entities = dict.fromkeys(BASE_ENTITIES, []) if load_all else {}
     entities.update(columns)
     factory = CoreDataLoadersFactory()
@@ -128,10 +201,10 @@ def reset_db(drop_only, create_only) -> None:
     if input("Are you sure? (y/n)\n").lower() == "y":
         if drop_only:
             LOGGER.info("Dropping db...")
-            Base.metadata.drop_all(engine)
+            Base.metadata.drop_all(service_api.engine)
             LOGGER.info("Tables droped!")
         if create_only:
-            Base.metadata.create_all(engine)
+            Base.metadata.create_all(service_api.engine)
             LOGGER.info("Tables created!")
 
 
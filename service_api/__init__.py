@@ -1,12 +1,16 @@
 """
-Module that contains client_api, grabbing_api, models, schemas
+Module that contains client_api, grabbing_api, models, schemas.
+Importing it creates app and logger only. DB engine, sessions and redis client are created
+with pool sizes of the process role (ROLE_PROFILES) by create_app or on first access,
+resources and tasks of process role are imported by create_app
 """
 
 import logging
 import os
 from contextlib import contextmanager
+from importlib import import_module
 import threading
-from typing import Iterator
+from typing import Iterator, Optional
 
 import redis
 from flask import Flask
@@ -18,6 +22,15 @@ from sqlalchemy.orm import Session, declarative_base, sessionmaker
 from logs.logger import setup_logger
 
 
+def output_traced_json(data, code, headers=None):
+    """
+    Makes a Flask response with JSON encoded body by flask_restful output_json, encoding is traced
+    """
+    from .tracing import start_span
+    with start_span("serialize.response"):
+        return output_json(data, code, headers)
+
+
 class UnicodeApi(Api):
     """
     Redefined Api classs to suppoer unicode text responses
@@ -29,27 +42,63 @@ class UnicodeApi(Api):
             "ensure_ascii": False
         }
         self.representations = {
-            "application/json; charset=utf-8": output_json
+            "application/json; charset=utf-8": output_traced_json
         }
 
 
 flask_app = Flask(__name__)
 flask_app.config.from_object(os.environ.get("FLASK_CONFIG_MODE", "config.DevelopmentConfig"))
 api_ = UnicodeApi(flask_app)
-from .celery_tasks import celery_app
 
-# connecting to DB
-engine = create_engine(flask_app.config.get("SQLALCHEMY_DATABASE_URL"))
-metadata = MetaData(bind=engine)
+metadata = MetaData()
 Base = declarative_base(metadata)
-Session_factory = sessionmaker(bind=engine)
-sql_session = Session_factory()
 
-# entrypoint for caching using redis
-CACHE = redis.Redis(
-    host=os.environ["REDIS_IP"], port=os.environ["REDIS_PORT"], decode_responses=True)
+LOGGER = setup_logger('app_logger', 'logs/service.log', flask_app.config.get("LOG_LEVEL", logging.DEBUG),
+                      flask_app.config.get("LOG_MODULE_LEVELS"), flask_app.config.get("LOG_DEBUG_SAMPLE_RATE", 1.0))
+
+# engine, Session_factory, sql_session and CACHE, created by init_resources
+RESOURCE_NAMES = ("engine", "Session_factory", "sql_session", "CACHE")
+_resources_lock = threading.Lock()
+_resources_role: Optional[str] = None
+
+
+def init_resources(role: str) -> None:
+    """
+    Create DB engine, session and redis client with pool sizes from ROLE_PROFILES.
+    Resources are created once per process, later calls with another role are ignored
+
+    :param role: str - api, grabbing, worker or all
+    """
+    global _resources_role
+    with _resources_lock:
+        if _resources_role is not None:
+            if role != _resources_role:
+                LOGGER.warning("Resources are created for %s role already, %s role is ignored", _resources_role, role)
+            return
+        profile = flask_app.config["ROLE_PROFILES"][role]
+
+        # connecting to DB
+        engine = create_engine(flask_app.config.get("SQLALCHEMY_DATABASE_URL"), pool_size=profile["DB_POOL_SIZE"],
+                               max_overflow=profile["DB_MAX_OVERFLOW"])
+        session_factory = sessionmaker(bind=engine)
 
-LOGGER = setup_logger('app_logger', 'logs/service.log', logging.DEBUG)
+        # entrypoint for caching using redis, blocking pool waits for a free connection instead of failing
+        pool_options = {"host": os.environ["REDIS_IP"], "port": os.environ["REDIS_PORT"], "decode_responses": True}
+        if profile["REDIS_MAX_CONNECTIONS"]:
+            pool = redis.BlockingConnectionPool(max_connections=profile["REDIS_MAX_CONNECTIONS"],
+                                                timeout=flask_app.config.get("REDIS_POOL_TIMEOUT"), **pool_options)
+        else:
+            pool = redis.ConnectionPool(**pool_options)
+
+        globals().update(engine=engine, Session_factory=session_factory, sql_session=session_factory(),
+                         CACHE=redis.Redis(connection_pool=pool))
+        _resources_role = role
+
+        from .tracing import instrument_engine
+        instrument_engine(engine)
+        LOGGER.info("Resources of %s role created: DB pool %s+%s, redis connections %s", role,
+                    profile["DB_POOL_SIZE"], profile["DB_MAX_OVERFLOW"],
+                    profile["REDIS_MAX_CONNECTIONS"] or "unlimited")
 
 
 @contextmanager
@@ -58,7 +107,7 @@ def session_scope() -> Iterator[Session]:
     Context manager to handle transaction to DB
     """
     try:
-        session = sql_session
+        session = __getattr__("sql_session")
         yield session
         session.commit()
     except SQLAlchemyError:
@@ -72,4 +121,37 @@ def session_scope() -> Iterator[Session]:
             raise
 
 
-from . import celery_tasks, client_api, grabbing_api
+def __getattr__(name: str):
+    """
+    Celery app is created on first access, processes that don't send tasks don't import celery.
+    DB and redis resources are created on first access with role from APP_ROLE config
+    if create_app wasn't called before
+    """
+    if name == "celery_app":
+        from .celery_tasks import celery_app
+        return celery_app
+    if name in RESOURCE_NAMES:
+        init_resources(flask_app.config["APP_ROLE"])
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def create_app(role: str = None) -> Flask:
+    """
+    Create DB and redis resources of process role, import its components
+    and return app with their resources registered
+
+    :param role: str - api (client api), grabbing (grabbing api), worker (celery tasks) or all,
+                       APP_ROLE config by default
+    :returns: Flask
+    """
+    from .constants import APP_ROLES
+    role = role or flask_app.config["APP_ROLE"]
+    flask_app.config["APP_ROLE"] = role
+    init_resources(role)
+    for component in APP_ROLES[role]:
+        import_module(f".{component}", __name__)
+    return flask_app
+
+
+from . import metrics, models, profiling, tracing
@@ -2,6 +2,10 @@
 Module with celery tasks and configuration
 """
 from service_api import flask_app
+from ..metrics import register_task_metrics
+from ..tracing import register_task_tracing
 from .utils import make_celery
 
 celery_app = make_celery(flask_app)
+register_task_metrics()
+register_task_tracing()
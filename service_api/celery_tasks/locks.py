@@ -0,0 +1,128 @@
+"""
+Distributed locks for celery tasks.
+Prevents periodic and fan-out tasks from running several times simultaneously
+"""
+import datetime
+import functools
+import threading
+import uuid
+from typing import Callable, Dict
+
+from celery import Task
+
+from service_api import CACHE, LOGGER
+from ..constants import (SKIPPED_TASKS_COUNTER, TASK_LOCK_EXPIRE_TIME, TASK_LOCK_PREFIX)
+from ..utils.canonical_filters import canonical_key
+
+# Both scripts check the owner token, so lock that was expired and taken by
+# another worker will not be extended or deleted by the previous owner
+EXTEND_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("expire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class TaskLock:
+    """
+    Redis lock with expiry that is kept alive by heartbeat while the owner is running
+    """
+
+    def __init__(self, name: str, expire_time: Dict = None) -> None:
+        """
+        :param name: str - unique name of the lock
+        :param expire_time: Dict - datetime.timedelta params after which lock expires without heartbeat
+        """
+        self.name = f"{TASK_LOCK_PREFIX}:{name}"
+        self.expire = int(datetime.timedelta(**(expire_time or TASK_LOCK_EXPIRE_TIME)).total_seconds())
+        self.token = uuid.uuid4().hex
+        self._stop_heartbeat = threading.Event()
+        self._heartbeat = None
+
+    def acquire(self) -> bool:
+        """
+        Try to take the lock. Starts heartbeat if lock is taken
+        :return: bool - True if the lock is acquired
+        """
+        if not CACHE.set(self.name, self.token, ex=self.expire, nx=True):
+            return False
+        self._heartbeat = threading.Thread(target=self._beat, name=f"heartbeat-{self.name}", daemon=True)
+        self._heartbeat.start()
+        return True
+
+    def release(self) -> None:
+        """
+        Stop heartbeat and delete the lock if it still belongs to this owner
+        """
+        self._stop_heartbeat.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+            self._heartbeat = None
+        CACHE.eval(RELEASE_LOCK_SCRIPT, 1, self.name, self.token)
+
+    def _beat(self) -> None:
+        """
+        Prolong the lock until the owner releases it
+        """
+        while not self._stop_heartbeat.wait(self.expire / 3):
+            if not CACHE.eval(EXTEND_LOCK_SCRIPT, 1, self.name, self.token, self.expire):
+                LOGGER.warning("Lock %s was lost before release", self.name)
+                break
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *args) -> None:
+        self.release()
+
+
+def filters_key(filters: Dict, *args, **kwargs) -> str:
+    """
+    Uniqueness key of a task based on its filters in canonical form,
+    so filters that differ only in types or empty values share the lock
+    """
+    return canonical_key(filters)
+
+
+def singleton_task(key: Callable = None, expire_time: Dict = None):
+    """
+    Decorator that skips task execution if the same task is already running.
+    Should be applied under the celery task decorator.
+    Skipped executions are counted in redis (see get_skipped_tasks)
+
+    :param key: optional function that builds uniqueness key from task arguments
+                (without task instance for bound tasks).
+                If not passed only one instance of the task can run at the same time
+    :param expire_time: datetime.timedelta params of lock expiry
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key_args = args[1:] if args and isinstance(args[0], Task) else args
+            lock_name = func.__name__ if key is None else f"{func.__name__}:{key(*key_args, **kwargs)}"
+            lock = TaskLock(lock_name, expire_time)
+            if not lock.acquire():
+                skipped = CACHE.hincrby(SKIPPED_TASKS_COUNTER, func.__name__)
+                LOGGER.info("Task %s is already running. Skipped (total skipped: %s)", lock_name, skipped)
+                return None
+            try:
+                return func(*args, **kwargs)
+            finally:
+                lock.release()
+        return wrapper
+    return decorator
+
+
+def get_skipped_tasks() -> Dict[str, int]:
+    """
+    Returns number of skipped duplicates for each task
+    """
+    return {name: int(count) for name, count in CACHE.hgetall(SKIPPED_TASKS_COUNTER).items()}
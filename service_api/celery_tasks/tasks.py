@@ -1,7 +1,7 @@
 """
 Celery tasks. Loading realties to db logic.
 """
-from typing import Dict
+from typing import Dict, List
 
 from celery import group
 from sqlalchemy import select
@@ -12,27 +12,50 @@ from ..errors import BadRequestException
 from ..exceptions import BadFiltersException, LimitBoundError
 from ..models import (AdditionalFilters, OperationType, Realty, RealtyDetails, RealtyType, State)
 from ..schemas import (AdditionalFilterParametersSchema, RealtyDetailsInputSchema, RealtySchema, filters_validation)
+from ..services.domria.scheduler import DomriaBudgetScheduler
+from ..utils.canonical_filters import canonical_value
 from ..utils.db import RealtyFetcher
+from ..utils.streaming import push_to_stream
 from . import celery_app
+from .locks import filters_key, singleton_task
 from .updaters import RealtyUpdater
 
 
 @celery_app.task
-def load_realties_by_filters(filters: Dict):
+def grab_latest_realties(filters: Dict, stream_key: str = None) -> List[Dict]:
+    """
+    Fetch latest realties from services for grabbing api.
+    Runs on the interactive queue, so background crawls don't delay it
+
+    :param filters: Dict - dict of filters
+    :param stream_key: str - if passed realties are pushed to redis list one by one
+                       instead of returning them all at once
+    :returns: List[Dict] - loaded realties
+    """
+    if stream_key is None:
+        return RealtyFetcher(filters).fetch()
+    push_to_stream(stream_key, RealtyFetcher(filters).iter_fetch())
+    return []
+
+
+@celery_app.task(bind=True, max_retries=None)
+@singleton_task(key=filters_key)
+def load_realties_by_filters(self, filters: Dict, page: int = 1):
     """
     Calls RealtyFetcher to load realties by input filters.
+    Every page waits for DomRia budget of requests it sends. If budget is exhausted
+    task is retried from the same page in the next budget window.
 
     :param filters: Dict - dict of filters
+    :param page: int - page to start from
     :returns: None
     """
 
-    page = 1
     while page < PAGE_LIMIT:
-        filters["page"] = page
-        filters["page_ads_number"] = 100
+        page_filters = dict(filters, page=page, page_ads_number=100)
         try:
             realty_dict, realty_details_dict, additional_params_dict, *_ = filters_validation(
-                filters,
+                page_filters,
                 [(Realty, RealtySchema),
                  (RealtyDetails, RealtyDetailsInputSchema),
                  (AdditionalFilters, AdditionalFilterParametersSchema)])
@@ -45,12 +68,19 @@ def load_realties_by_filters(filters: Dict):
             "additional": additional_params_dict
         }
 
-        if not RealtyFetcher(request_filters).fetch(limit_data=True):
+        fetcher = RealtyFetcher(request_filters)
+        domria_ads_number = fetcher.split_page(limit_data=True).get("DOMRIA API")
+        cost = DomriaBudgetScheduler.page_cost(page, domria_ads_number) if domria_ads_number is not None else 0
+        if not DomriaBudgetScheduler.acquire(cost, DomriaBudgetScheduler.BACKGROUND):
+            raise self.retry(args=(filters,), kwargs={"page": page}, countdown=DomriaBudgetScheduler.get_delay())
+
+        if not fetcher.fetch(limit_data=True):
             break
         page += 1
 
 
 @celery_app.task
+@singleton_task()
 def fill_db_with_realties():
     """
     Create all minimally needed filter combinations.
@@ -59,16 +89,18 @@ def fill_db_with_realties():
     with session_scope() as session:
         query = select((RealtyType.id, State.id, OperationType.id))
         filters = session.execute(query).all()
-    filters = [{"realty_type_id": realty_type_id,
-                "state_id": state_id,
-                "operation_type_id": operation_type_id}
-               for realty_type_id, state_id, operation_type_id in filters]
+    # combinations are deduplicated by canonical key, the same one would only wait for the lock of the other
+    filters = {filters_key(f): canonical_value(f) for f in ({"realty_type_id": realty_type_id,
+                                                             "state_id": state_id,
+                                                             "operation_type_id": operation_type_id}
+                                                            for realty_type_id, state_id, operation_type_id in filters)}
 
-    group_of_tasks = group([load_realties_by_filters.s(f) for f in filters])
+    group_of_tasks = group([load_realties_by_filters.s(f) for f in filters.values()])
     group_of_tasks()
 
 
 @celery_app.task()
+@singleton_task()
 def update_realties():
     """
     Passes on all records of realty and realty details in a DB,
@@ -6,17 +6,21 @@ import json
 from abc import ABC, abstractmethod
 from typing import Dict
 
-import requests
 from sqlalchemy.engine.row import Row
+from sqlalchemy.orm import contains_eager
 
 from service_api import session_scope, models, schemas, LOGGER
 from ..services.domria.limitation import DomriaLimitationSystem
 from ..errors import InternalServerErrorException
 from ..exceptions import ResponseNotOkException, MetaDataError
-from ..constants import PATH_TO_METADATA
+from ..constants import PATH_TO_METADATA, VERSION_DEFAULT_TIMESTAMP
 from ..utils import open_metadata, load_data
+from ..utils.aggregates import retire_from_market_aggregates
+from ..utils.http_client import get_http_session
+from ..services.resilience import ServicePolicy
 from ..services.domria.convertors import DomRiaOutputConverter
 from ..models import Realty, RealtyDetails
+from ..tracing import start_span
 
 
 class AbstractUpdater(ABC):
@@ -61,6 +65,7 @@ class RealtyUpdater(AbstractUpdater):
 
     def __init__(self):
         self.metadata = open_metadata(PATH_TO_METADATA)["DOMRIA API"]
+        self.policy = ServicePolicy.for_service(self.metadata["name"])
         with session_scope() as session:
             self.cursor = session.execute(
                 "SELECT floor, floors_number, square, price, original_url FROM realty_details"
@@ -79,16 +84,18 @@ class RealtyUpdater(AbstractUpdater):
         Runs the logic to update all data
         """
         for db_record in self.cursor:
-            LOGGER.info(db_record)
+            LOGGER.debug("Updating realty details %s", db_record)
             self.update_single_record(db_record)
 
     def send_request_by_id(self, ad_id: int):
         """
         Send request to get info about single ad by id
         """
-        response = requests.get(self.url.format(id=ad_id),
-                                params=self.params,
-                                headers={'User-Agent': 'Mozilla/5.0'})
+        with start_span("scrape.request", method="GET", url=self.url.format(id=ad_id)):
+            response = self.policy.call(lambda: get_http_session().get(self.url.format(id=ad_id),
+                                                                       params=self.params,
+                                                                       headers={'User-Agent': 'Mozilla/5.0'}),
+                                        hedge=True)
 
         if not response:
             raise ResponseNotOkException(response)
@@ -148,14 +155,15 @@ class RealtyUpdater(AbstractUpdater):
         Called if the ad from the database does not exist on the server
         """
         with session_scope() as session:
-            realty_details = session.query(RealtyDetails).filter(
-                RealtyDetails.original_url == db_record[-1] and RealtyDetails.version is None
-            ).first()
-            realty = session.query(Realty).filter(Realty.id == realty_details.id).first()
+            realty = session.query(Realty).join(RealtyDetails).filter(
+                RealtyDetails.original_url == db_record.original_url,
+                RealtyDetails.version == VERSION_DEFAULT_TIMESTAMP
+            ).options(contains_eager(Realty.realty_details)).first()
 
             if realty:
                 realty.version = datetime.datetime.utcnow()
-                realty_details.version = datetime.datetime.utcnow()
+                realty.realty_details.version = datetime.datetime.utcnow()
+                retire_from_market_aggregates(session, realty, realty.realty_details)
 
 
 if __name__ == "__main__":
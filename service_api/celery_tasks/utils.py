@@ -1,10 +1,26 @@
 """
 Celery config module
 """
-from celery import Celery
+from celery import Celery, Task
 from celery.schedules import crontab
+from kombu import Queue
 
-from ..constants import CRONTAB_FILLING_DB_WITH_REALTIES_SCHEDULE
+from ..constants import (CELERY_DEFAULT_QUEUE, CELERY_QUEUES, CELERY_TASK_ROUTES,
+                         CRONTAB_FILLING_DB_WITH_REALTIES_SCHEDULE, PROFILE_TASK_KWARG)
+
+
+class ProfiledTask(Task):
+    """
+    Base class of service tasks. Execution of task sent with profile=True kwarg
+    is profiled, e.g. load_realties_by_filters.apply_async(args=(filters,), kwargs={"profile": True})
+    """
+
+    def __call__(self, *args, **kwargs):
+        if not kwargs.pop(PROFILE_TASK_KWARG, False):
+            return super().__call__(*args, **kwargs)
+        from ..profiling import profile_execution
+        with profile_execution(f"task {self.name}"):
+            return super().__call__(*args, **kwargs)
 
 
 def setup_periodic_tasks(sender, **kwargs):
@@ -31,8 +47,16 @@ def make_celery(flask_app):
 
     celery_app = Celery("service_api",
                         backend=backend_url or "redis://127.0.0.1:6379/0",
-                        broker=broker_url or "redis://127.0.0.1:6379/0")
+                        broker=broker_url or "redis://127.0.0.1:6379/0",
+                        task_cls=ProfiledTask)
     celery_app.conf.update(flask_app.config)
+    celery_app.conf.update(
+        task_queues=[Queue(queue) for queue in CELERY_QUEUES],
+        task_default_queue=CELERY_DEFAULT_QUEUE,
+        task_routes=CELERY_TASK_ROUTES,
+        # worker imports tasks itself, api processes import them only when they send tasks
+        imports=("service_api.celery_tasks.tasks",)
+    )
     # celery_app.control.purge()
 
     celery_app.autodiscover_tasks(["service_api"])
@@ -1,18 +1,39 @@
 """
 Api routes for client api
 """
+import json
+from typing import Dict, List, Tuple
 
 from flask import request
 from flask_restful import Resource
 from redis.exceptions import ConnectionError as RedisConnectionError
 
 from service_api import CACHE, LOGGER, api_, models, schemas, session_scope
-from ..client_api.utils import get_latest_data_from_grabbing
-from ..constants import BASE_URL, GE, LE, URLS, VERSION_DEFAULT_TIMESTAMP
+from ..client_api.stats import get_realty_stats, realty_filters_criteria
+from ..client_api.utils import get_hash, get_latest_data_from_grabbing, make_hash, stream_latest_data_from_grabbing
+from ..constants import (ADDITIONAL_FILTERS, BASE_URL, REALTY_EXPANDABLE_RELATIONS, REALTY_STATS_CACHE_PREFIX,
+                         REALTY_STATS_EXPIRE_TIME, REALTY_STREAM_CHUNK_SIZE, URLS, VERSION_DEFAULT_TIMESTAMP)
 from ..errors import BadRequestException
 from ..exceptions import BadFiltersException
 from ..models import AdditionalFilters, Realty, RealtyDetails
 from ..schemas import (AdditionalFilterParametersSchema, RealtyDetailsInputSchema, RealtySchema, filters_validation)
+from ..serializers import serialize
+from ..tracing import start_span
+from ..utils.aggregates import get_market_aggregates
+from ..utils.loading import preload_references, realty_loading_options
+from ..utils.streaming import ndjson_response, wants_ndjson
+
+
+def parse_ids(ids: str) -> List[int]:
+    """
+    Parse comma separated ids from query string
+    :param ids: str - e.g. "1,2,3"
+    :raises: BadRequestException
+    """
+    try:
+        return [int(id_) for id_ in ids.split(",") if id_.strip()]
+    except ValueError as error:
+        raise BadRequestException("ids must be comma separated integers") from error
 
 
 class IndexResource(Resource):
@@ -55,7 +76,7 @@ class CityResource(Resource):
             raise BadRequestException(errors)
         with session_scope() as session:
             city = session.query(models.City).filter_by(**filters, version=VERSION_DEFAULT_TIMESTAMP).all()
-        return schemas.CitySchema(many=True).dump(city), 200
+        return serialize(schemas.CitySchema, city, many=True), 200
 
 
 class CitiesResource(Resource):
@@ -65,14 +86,17 @@ class CitiesResource(Resource):
 
     def get(self):
         """
-        Method that returns city by it`s id
-        :params: int, int
+        Method that returns all cities or cities with ids from ?ids=1,2,3
+        :params: str
         :return: json(schema)
         """
 
         with session_scope() as session:
-            cities = session.query(models.City).all()
-        return schemas.CitySchema(many=True).dump(cities), 200
+            query = session.query(models.City)
+            if "ids" in request.args:
+                query = query.filter(models.City.id.in_(parse_ids(request.args["ids"])))
+            cities = query.all()
+        return serialize(schemas.CitySchema, cities, many=True), 200
 
 
 class StatesResource(Resource):
@@ -82,13 +106,16 @@ class StatesResource(Resource):
 
     def get(self):
         """
-        Method that returns list of all available states
-        :param:
+        Method that returns list of all available states or states with ids from ?ids=1,2,3
+        :param: str
         :return: json(schema)
         """
         with session_scope() as session:
-            states = session.query(models.State).filter_by(version=VERSION_DEFAULT_TIMESTAMP).all()
-        return schemas.StateSchema(many=True).dump(states), 200
+            query = session.query(models.State).filter_by(version=VERSION_DEFAULT_TIMESTAMP)
+            if "ids" in request.args:
+                query = query.filter(models.State.id.in_(parse_ids(request.args["ids"])))
+            states = query.all()
+        return serialize(schemas.StateSchema, states, many=True), 200
 
 
 class StateResource(Resource):
@@ -104,7 +131,54 @@ class StateResource(Resource):
         """
         with session_scope() as session:
             state = session.query(models.State).filter_by(id=state_id, version=VERSION_DEFAULT_TIMESTAMP).first()
-        return schemas.StateSchema().dump(state), 200
+        return serialize(schemas.StateSchema, state), 200
+
+
+def parse_expand(expand) -> Tuple[str, ...]:
+    """
+    Validate relations requested to be embedded into realty records.
+    All relations are embedded if expand is not passed
+    :param expand: list or comma separated str of relation names
+    :raises: BadRequestException
+    """
+    if expand is None:
+        return REALTY_EXPANDABLE_RELATIONS
+    if isinstance(expand, str):
+        expand = [name.strip() for name in expand.split(",") if name.strip()]
+    if not isinstance(expand, list) or not set(expand) <= set(REALTY_EXPANDABLE_RELATIONS):
+        raise BadRequestException(f"expand must be a list of {', '.join(REALTY_EXPANDABLE_RELATIONS)}")
+    return tuple(expand)
+
+
+def serialize_realties(session, realties: List[Realty], expand: Tuple[str, ...]) -> List[Dict]:
+    """
+    Serialize realties with only expand relations embedded, other relations are replaced by ids
+    """
+    loaded = preload_references(session, realties, expand)
+    with start_span("serialize.realties", count=len(realties)):
+        records = serialize(RealtySchema, realties, many=True)
+    for realty, record in zip(realties, records):
+        for name in REALTY_EXPANDABLE_RELATIONS:
+            if name not in expand:
+                del record[name]
+                record[f"{name}_id"] = getattr(realty, f"{name}_id")
+    # referenced entities had to be alive only until serialization
+    del loaded
+    return records
+
+
+def iter_realty_records(query, offset: int, limit: int, expand: Tuple[str, ...] = REALTY_EXPANDABLE_RELATIONS):
+    """
+    Lazily fetch realties page from DB by chunks and serialize them one by one
+    """
+    with session_scope() as session:
+        chunk = []
+        for realty in query.offset(offset).limit(limit).yield_per(REALTY_STREAM_CHUNK_SIZE):
+            chunk.append(realty)
+            if len(chunk) == REALTY_STREAM_CHUNK_SIZE:
+                yield from serialize_realties(session, chunk, expand)
+                chunk = []
+        yield from serialize_realties(session, chunk, expand)
 
 
 class RealtyResource(Resource):
@@ -115,17 +189,19 @@ class RealtyResource(Resource):
 
     def post(self):
         """
-        Method that retrieves a list of realty from database or grabbing
+        Method that retrieves a list of realty from database or grabbing.
+        Streams newline delimited json if client accepts application/x-ndjson
         :param: json
         :return: json(schema)
         """
         filters = request.get_json()
         if not filters:
             raise BadRequestException("No filters provided")
-        LOGGER.info(filters)
+        LOGGER.debug("Realty filters: %s", filters)
         latest = filters.pop("latest", False)
         if not isinstance(latest, bool):
             raise BadRequestException("Latest field is not bool")
+        expand = parse_expand(filters.pop("expand", None))
 
         try:
             realty_dict, realty_details_dict, additional_params_dict, *_ = filters_validation(
@@ -143,6 +219,9 @@ class RealtyResource(Resource):
         }
 
         if latest:
+            if wants_ndjson():
+                return ndjson_response(stream_latest_data_from_grabbing(request_filters,
+                                                                        f"{BASE_URL}/grabbing/latest"))
             return get_latest_data_from_grabbing(request_filters, f"{BASE_URL}/grabbing/latest")
 
         with session_scope() as session:
@@ -155,18 +234,66 @@ class RealtyResource(Resource):
                 raise BadRequestException(error.args)from error
 
             offset = (page - 1) * per_page
-            realty = session.query(Realty).filter_by(**realty_dict).filter(
-                *[
-                    getattr(RealtyDetails, key).between(
-                        value.get(GE) or 0,
-                        value.get(LE) or 10**19)
-                    if isinstance(value, dict)
-                    else getattr(RealtyDetails, key) == value
-                    for key, value in realty_details_dict.items()
-                ]
-            ).filter_by(version=VERSION_DEFAULT_TIMESTAMP).join(RealtyDetails)
+            realty = session.query(Realty).join(RealtyDetails).filter(
+                *realty_filters_criteria(realty_dict, realty_details_dict)).options(*realty_loading_options())
+
+            if wants_ndjson():
+                return ndjson_response(iter_realty_records(realty, offset, per_page, expand))
+            return serialize_realties(session, realty.offset(offset).limit(per_page).all(), expand)
+
+
+class RealtyStatsResource(Resource):
+    """
+    Route to count realties matching filters without loading them
+    """
 
-            return RealtySchema(many=True).dump(realty.all()[offset: offset + per_page])
+    def post(self):
+        """
+        Method that returns total count, facet counts and price/square histograms
+        of realties matching the same filters as RealtyResource.
+        Pagination and latest parameters are ignored
+        :param: json
+        :return: json
+        """
+        filters = request.get_json()
+        if not filters:
+            raise BadRequestException("No filters provided")
+        filters = {key: value for key, value in filters.items() if key not in ("latest", "expand", *ADDITIONAL_FILTERS)}
+
+        try:
+            realty_dict, realty_details_dict, *_ = filters_validation(
+                filters,
+                [(Realty, RealtySchema),
+                 (RealtyDetails, RealtyDetailsInputSchema)])
+        except BadFiltersException as error:
+            raise BadRequestException(error.desc) from error
+
+        if cached_stats := get_hash(filters, REALTY_STATS_CACHE_PREFIX):
+            return json.loads(cached_stats), 200
+
+        with session_scope() as session:
+            stats = get_realty_stats(session, realty_filters_criteria(realty_dict, realty_details_dict))
+        make_hash(filters, stats, REALTY_STATS_EXPIRE_TIME, REALTY_STATS_CACHE_PREFIX)
+        return stats, 200
+
+
+class MarketAggregatesResource(Resource):
+    """
+    Route to retrieve market statistics of actual realties
+    """
+
+    def get(self):
+        """
+        Method that returns count, averages and price per square meter quantiles
+        of realties filtered by state, city, realty type and operation type (all optional)
+        :params: int, int, int, int
+        :return: json
+        """
+        errors = schemas.MarketAggregateInputSchema().validate(request.args)
+        if errors:
+            LOGGER.info(errors)
+            raise BadRequestException(errors)
+        return get_market_aggregates(schemas.MarketAggregateInputSchema().load(request.args)), 200
 
 
 class RealtyTypesResource(Resource):
@@ -176,13 +303,16 @@ class RealtyTypesResource(Resource):
 
     def get(self):
         """
-        Method that retrieves all realty types
-        :param:
+        Method that retrieves all realty types or realty types with ids from ?ids=1,2,3
+        :param: str
         :return: json(schema)
         """
         with session_scope() as session:
-            realty_types = session.query(models.RealtyType).filter_by(version=VERSION_DEFAULT_TIMESTAMP).all()
-        return schemas.RealtyTypeSchema(many=True).dump(realty_types), 200
+            query = session.query(models.RealtyType).filter_by(version=VERSION_DEFAULT_TIMESTAMP)
+            if "ids" in request.args:
+                query = query.filter(models.RealtyType.id.in_(parse_ids(request.args["ids"])))
+            realty_types = query.all()
+        return serialize(schemas.RealtyTypeSchema, realty_types, many=True), 200
 
 
 class RealtyTypeResource(Resource):
@@ -199,7 +329,7 @@ class RealtyTypeResource(Resource):
         with session_scope() as session:
             realty_type = session.query(models.RealtyType).filter_by(id=realty_type_id,
                                                                      version=VERSION_DEFAULT_TIMESTAMP).first()
-        return schemas.RealtyTypeSchema().dump(realty_type), 200
+        return serialize(schemas.RealtyTypeSchema, realty_type), 200
 
 
 class OperationTypesResource(Resource):
@@ -209,13 +339,16 @@ class OperationTypesResource(Resource):
 
     def get(self):
         """
-        Method that retrieves all operation types
-        :param:
+        Method that retrieves all operation types or operation types with ids from ?ids=1,2,3
+        :param: str
         :return: json(schema)
         """
         with session_scope() as session:
-            operation_types = session.query(models.OperationType).filter_by(version=VERSION_DEFAULT_TIMESTAMP).all()
-        return schemas.OperationTypeSchema(many=True).dump(operation_types), 200
+            query = session.query(models.OperationType).filter_by(version=VERSION_DEFAULT_TIMESTAMP)
+            if "ids" in request.args:
+                query = query.filter(models.OperationType.id.in_(parse_ids(request.args["ids"])))
+            operation_types = query.all()
+        return serialize(schemas.OperationTypeSchema, operation_types, many=True), 200
 
 
 class OperationTypeResource(Resource):
@@ -232,13 +365,15 @@ class OperationTypeResource(Resource):
         with session_scope() as session:
             operation_type = session.query(models.OperationType).filter_by(version=VERSION_DEFAULT_TIMESTAMP,
                                                                            id=operation_type_id).first()
-        return schemas.OperationTypeSchema().dump(operation_type), 200
+        return serialize(schemas.OperationTypeSchema, operation_type), 200
 
 
 api_.add_resource(IndexResource, URLS["CLIENT"]["INDEX_URL"])
 api_.add_resource(CityResource, URLS["CLIENT"]["GET_CITIES_URL"])
 api_.add_resource(CitiesResource, URLS["CLIENT"]["GET_CITY_BY_ID_URL"])
 api_.add_resource(RealtyResource, URLS["CLIENT"]["GET_REALTY_URL"])
+api_.add_resource(RealtyStatsResource, URLS["CLIENT"]["GET_REALTY_STATS_URL"])
+api_.add_resource(MarketAggregatesResource, URLS["CLIENT"]["GET_MARKET_AGGREGATES_URL"])
 api_.add_resource(StatesResource, URLS["CLIENT"]["GET_STATES_URL"])
 api_.add_resource(StateResource, URLS["CLIENT"]["GET_STATES_BY_ID_URL"])
 api_.add_resource(RealtyTypesResource, URLS["CLIENT"]["GET_REALTY_TYPES_URL"])
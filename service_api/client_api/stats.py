@@ -0,0 +1,88 @@
+"""
+Aggregations over realty search results.
+Everything is counted in DB, so matching rows are never loaded into the service
+"""
+from typing import Dict, List
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..constants import (GE, LE, REALTY_STATS_FACETS, REALTY_STATS_HISTOGRAM_BINS, REALTY_STATS_HISTOGRAMS,
+                         VERSION_DEFAULT_TIMESTAMP)
+from ..models import Realty, RealtyDetails
+
+
+def realty_filters_criteria(realty_dict: Dict, realty_details_dict: Dict) -> List:
+    """
+    SQL criteria of realty search filters.
+    Query must select from Realty joined with RealtyDetails
+    :param realty_dict: Dict - validated filters of Realty model
+    :param realty_details_dict: Dict - validated filters of RealtyDetails model, ranges are dicts with le/ge
+    """
+    criteria = [getattr(Realty, key) == value for key, value in realty_dict.items()]
+    criteria += [
+        getattr(RealtyDetails, key).between(value.get(GE) or 0, value.get(LE) or 10**19)
+        if isinstance(value, dict)
+        else getattr(RealtyDetails, key) == value
+        for key, value in realty_details_dict.items()
+    ]
+    criteria.append(Realty.version == VERSION_DEFAULT_TIMESTAMP)
+    return criteria
+
+
+def get_facets(session: Session, criteria: List) -> Dict[str, List[Dict]]:
+    """
+    Number of matching realties grouped by every facet column
+    """
+    facets = {}
+    for name in REALTY_STATS_FACETS:
+        column = getattr(Realty, name)
+        rows = session.query(column, func.count()).select_from(Realty).join(RealtyDetails) \
+            .filter(*criteria).group_by(column).order_by(func.count().desc())
+        facets[name] = [{"id": value, "count": count} for value, count in rows]
+    return facets
+
+
+def get_histogram(session: Session, criteria: List, name: str, low: float, high: float) -> List[Dict]:
+    """
+    Histogram of equal-width bins between the lowest and highest value of the column.
+    Highest value is put into the last bin
+    """
+    if low is None or high is None:
+        return []
+    if low == high:
+        count = session.query(func.count()).select_from(Realty).join(RealtyDetails) \
+            .filter(*criteria, getattr(RealtyDetails, name).isnot(None)).scalar()
+        return [{"from": low, "to": high, "count": count}]
+
+    column = getattr(RealtyDetails, name)
+    bins = REALTY_STATS_HISTOGRAM_BINS
+    bucket = func.least(func.width_bucket(column, low, high, bins), bins).label("bucket")
+    rows = dict(session.query(bucket, func.count()).select_from(Realty).join(RealtyDetails)
+                .filter(*criteria, column.isnot(None)).group_by(bucket))
+    width = (high - low) / bins
+    return [{"from": low + width * index, "to": low + width * (index + 1), "count": rows.get(index + 1, 0)}
+            for index in range(bins)]
+
+
+def get_realty_stats(session: Session, criteria: List) -> Dict:
+    """
+    Total count, facet counts and histograms of realties matching criteria
+    """
+    bounds = []
+    for name in REALTY_STATS_HISTOGRAMS:
+        column = getattr(RealtyDetails, name)
+        bounds += [func.min(column), func.max(column)]
+    total, *bounds = session.query(func.count(), *bounds).select_from(Realty).join(RealtyDetails) \
+        .filter(*criteria).one()
+
+    if not total:
+        return {"total": 0,
+                "facets": {name: [] for name in REALTY_STATS_FACETS},
+                "histograms": {name: [] for name in REALTY_STATS_HISTOGRAMS}}
+    return {
+        "total": total,
+        "facets": get_facets(session, criteria),
+        "histograms": {name: get_histogram(session, criteria, name, *bounds[2 * index: 2 * index + 2])
+                       for index, name in enumerate(REALTY_STATS_HISTOGRAMS)}
+    }
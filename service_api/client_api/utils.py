@@ -3,42 +3,129 @@ Utilities for cashing requests and saving them in redis
 """
 import datetime
 import json
-from typing import Dict, Union
+from typing import Dict, Iterator, List, Union
 from hashlib import sha256
-import requests
+from requests import RequestException, Response
 from sqlalchemy.util.langhelpers import NoneType
 
 from service_api import CACHE, LOGGER
 from ..errors import ServiceUnavailableException
-from ..constants import CACHED_REQUESTS_EXPIRE_TIME
+from ..constants import (CACHED_EMPTY_REQUESTS_EXPIRE_TIME, CACHED_PARTIAL_REQUESTS_EXPIRE_TIME,
+                         CACHED_REQUESTS_EXPIRE_TIME, NDJSON_MIMETYPE)
+from ..metrics import CACHE_REQUESTS, SCRAPES_AVOIDED
+from ..utils.canonical_filters import canonical_filters
+from ..utils.http_client import get_http_session
+from ..utils.scrape_cache import unavailable_services
+from ..utils.streaming import is_error_record
+from ..tracing import inject, start_span
 
 
-def make_hash(request_data: Dict, response_data: Dict, redis_ex_time: Union[Dict, NoneType] = None):
+def hash_key(request_data: Dict, prefix: str = "") -> str:
+    """
+    Redis key of hashed request. Prefix separates caches of different kinds of responses
+    """
+    key = sha256(json.dumps(request_data, sort_keys=True).encode("utf-8")).hexdigest()
+    return f"{prefix}:{key}" if prefix else key
+
+
+def make_hash(request_data: Dict, response_data: Dict, redis_ex_time: Union[Dict, NoneType] = None,
+              prefix: str = ""):
     """
     Hash request to redis
     """
-    CACHE.set(str(sha256(json.dumps(request_data, sort_keys=True).encode("utf-8")).hexdigest()),
-              json.dumps(response_data), datetime.timedelta(**(redis_ex_time or CACHED_REQUESTS_EXPIRE_TIME)))
+    with start_span("cache.set", prefix=prefix):
+        CACHE.set(hash_key(request_data, prefix), json.dumps(response_data),
+                  datetime.timedelta(**(redis_ex_time or CACHED_REQUESTS_EXPIRE_TIME)))
+
+
+def get_hash(request_data: Dict, prefix: str = ""):
+    """
+    Get hashed request from redis. Hits and misses are counted by prefix
+    """
+    with start_span("cache.get", prefix=prefix) as span:
+        cached = CACHE.get(hash_key(request_data, prefix))
+        span.set_attribute("cache.hit", cached is not None)
+    CACHE_REQUESTS.labels(prefix or "latest", "hit" if cached is not None else "miss").inc()
+    return cached
+
+
+def get_cached_latest_data(request_filters: Dict) -> Union[List[Dict], NoneType]:
+    """
+    Latest data cached for filters in canonical form, cached empty results are counted as avoided scrapes
+    """
+    if (cached_response := get_hash(canonical_filters(request_filters))) is None:
+        return None
+    LOGGER.debug("___hashed stuff___")
+    result = json.loads(cached_response)
+    if not result:
+        SCRAPES_AVOIDED.labels("all", "empty").inc()
+    return result
 
 
-def get_hash(request_data: Dict):
+def cache_latest_data(request_filters: Dict, result: List[Dict]) -> None:
     """
-    Get hashed request from redis
+    Cache latest data from grabbing. Empty results are cached for a shorter time.
+    If some service is unavailable, realties of others are cached shortly and empty result is not cached,
+    so outage doesn't hide realties once the service is back
     """
-    return CACHE.get(str(sha256(json.dumps(request_data, sort_keys=True).encode("utf-8")).hexdigest()))
+    request_filters = canonical_filters(request_filters)
+    if unavailable_services():
+        if result:
+            make_hash(request_filters, result, CACHED_PARTIAL_REQUESTS_EXPIRE_TIME)
+        return
+    make_hash(request_filters, result, None if result else CACHED_EMPTY_REQUESTS_EXPIRE_TIME)
 
 
 def get_latest_data_from_grabbing(request_filters: Dict, url: str):
     """
     Entrypoint to get latest data from grabbing or from cache
     """
-    if cached_response := get_hash(request_filters):
-        LOGGER.debug("___hashed stuff___")
-        return json.loads(cached_response), 200
-    response = requests.post(url, json=request_filters)
+    if (cached_result := get_cached_latest_data(request_filters)) is not None:
+        return cached_result, 200
+    with start_span("grabbing.request", url=url):
+        response = get_http_session().post(url, json=request_filters, headers=inject())
     if response.status_code >= 400:
         raise ServiceUnavailableException("GRABBING does not respond")
     result = response.json()
-    if result:
-        make_hash(request_filters, result)
+    cache_latest_data(request_filters, result)
     return result, 200
+
+
+def stream_latest_data_from_grabbing(request_filters: Dict, url: str) -> Iterator[Dict]:
+    """
+    Streaming version of get_latest_data_from_grabbing.
+    Request to grabbing is sent immediately, so errors are raised before streaming starts.
+    Records are yielded as soon as grabbing sends them
+    """
+    if (cached_result := get_cached_latest_data(request_filters)) is not None:
+        return iter(cached_result)
+    with start_span("grabbing.request", url=url, stream=True):
+        response = get_http_session().post(url, json=request_filters, headers=inject({"Accept": NDJSON_MIMETYPE}),
+                                           stream=True)
+    if response.status_code >= 400:
+        raise ServiceUnavailableException("GRABBING does not respond")
+    return cache_streamed_response(request_filters, response)
+
+
+def cache_streamed_response(request_filters: Dict, response: Response) -> Iterator[Dict]:
+    """
+    Yield records from newline delimited json response and cache them after the last one.
+    Records are cached only if the stream is completed: error record of grabbing is passed to client
+    and nothing is cached then. Response is closed, so its connection goes back to the pool
+    even if client stops reading
+    """
+    result: List[Dict] = []
+    try:
+        for line in response.iter_lines():
+            if not line:
+                continue
+            record = json.loads(line)
+            yield record
+            if is_error_record(record):
+                return
+            result.append(record)
+    except RequestException as error:
+        raise ServiceUnavailableException("GRABBING does not respond") from error
+    finally:
+        response.close()
+    cache_latest_data(request_filters, result)
@@ -10,6 +10,9 @@ URLS = {
         "GET_CITIES_URL": "/cities",
         "GET_CITY_BY_ID_URL": "/city",
         "GET_REALTY_URL": "/realty",
+        "GET_REALTY_STATS_URL": "/realty/stats",
+        "GET_MARKET_AGGREGATES_URL": "/market/aggregates",
+        "METRICS_URL": "/metrics",
         "GET_STATES_URL": "/states",
         "GET_STATES_BY_ID_URL": "/states/<state_id>",
         "GET_REALTY_TYPES_URL": "/realty_types",
@@ -25,6 +28,37 @@ URLS = {
 CACHED_REQUESTS_EXPIRE_TIME = {
     "hours": 2
 }
+# empty results are cached shorter, new ads may appear
+CACHED_EMPTY_REQUESTS_EXPIRE_TIME = {
+    "minutes": 10
+}
+# results that miss realties of an unavailable service
+CACHED_PARTIAL_REQUESTS_EXPIRE_TIME = {
+    "minutes": 2
+}
+EMPTY_RESULT_PREFIX = "empty_result"
+SERVICE_UNAVAILABLE_PREFIX = "service_unavailable"
+# services that failed are skipped for this time
+SERVICE_UNAVAILABLE_EXPIRE_TIME = {
+    "minutes": 2
+}
+# scraped pages of services (DomRia search pages, OLX listing pages) and single ads
+PAGE_BLOCK_PREFIX = "page_block"
+SCRAPED_AD_PREFIX = "scraped_ad"
+# new ads appear on the first pages of searches
+PAGE_BLOCK_EXPIRE_TIME = {
+    "minutes": 10
+}
+# prices of loaded ads are refreshed by updater
+SCRAPED_AD_EXPIRE_TIME = {
+    "hours": 1
+}
+# ids on one DomRia search page
+DOMRIA_SEARCH_PAGE_SIZE = 100
+# OLX listing pages requested at once for one client page
+OLX_LISTING_MAX_WORKERS = 4
+# characteristics that can't be negative, lower bound 0 of them is the same as no bound
+NON_NEGATIVE_CHARACTERISTICS = ("floor", "floors_number", "square", "price")
 
 
 ADDITIONAL_FILTERS = ["page", "page_ads_number"]
@@ -38,8 +72,97 @@ CRONTAB_FILLING_DB_WITH_REALTIES_SCHEDULE = {
     "minute": "*/2"
 }
 
+# modules create_app imports for every process role, each of them registers its resources or tasks
+APP_ROLES = {
+    "api": ("client_api",),
+    "grabbing": ("grabbing_api",),
+    "worker": ("celery_tasks.tasks",),
+    "all": ("client_api", "grabbing_api", "celery_tasks.tasks")
+}
+
+# worker options for every celery queue. Every interactive task is one grabbing request in flight,
+# requests beyond concurrency of all interactive workers wait in the queue and get 503 after
+# GRABBING_TASK_TIMEOUT. Its tasks mostly wait on services, so it runs more processes than CPUs
+CELERY_QUEUES = {
+    "interactive": {
+        "concurrency": 16,
+        "prefetch_multiplier": 1
+    },
+    "crawl": {
+        "concurrency": 2,
+        "prefetch_multiplier": 1
+    },
+    "refresh": {
+        "concurrency": 1,
+        "prefetch_multiplier": 1
+    }
+}
+CELERY_DEFAULT_QUEUE = "crawl"
+CELERY_TASK_ROUTES = {
+    "service_api.celery_tasks.tasks.grab_latest_realties": {"queue": "interactive"},
+    "service_api.celery_tasks.tasks.fill_db_with_realties": {"queue": "crawl"},
+    "service_api.celery_tasks.tasks.load_realties_by_filters": {"queue": "crawl"},
+    "service_api.celery_tasks.tasks.update_realties": {"queue": "refresh"}
+}
+GRAB_LATEST_REALTIES_TASK = "service_api.celery_tasks.tasks.grab_latest_realties"
+# seconds grabbing api waits for result of interactive task
+GRABBING_TASK_TIMEOUT = 60
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+GRABBING_STREAM_PREFIX = "grabbing_stream"
+# seconds
+GRABBING_STREAM_EXPIRE_TIME = 2 * GRABBING_TASK_TIMEOUT
+# seconds of one BLPOP of async grabbing api, streams of new requests wake it up earlier
+ASYNC_GRABBING_POLL_TIMEOUT = 1
+# number of rows fetched from DB at once during streaming
+REALTY_STREAM_CHUNK_SIZE = 100
+# relations of realty that can be embedded into records with "expand" filter
+REALTY_EXPANDABLE_RELATIONS = ("city", "state", "realty_type", "operation_type", "service")
+# seconds reference entities (cities, states, types, services) are cached in process
+REFERENCE_CACHE_EXPIRE_TIME = 10 * 60
+
+REALTY_STATS_FACETS = ("state_id", "city_id", "realty_type_id", "operation_type_id")
+REALTY_STATS_HISTOGRAMS = ("price", "square")
+REALTY_STATS_HISTOGRAM_BINS = 10
+REALTY_STATS_CACHE_PREFIX = "realty_stats"
+# must be dict with datetime.timedelta params
+REALTY_STATS_EXPIRE_TIME = {
+    "minutes": 1
+}
+
+# relative error of price per square meter quantiles in market aggregates
+SKETCH_RELATIVE_ACCURACY = 0.01
+MARKET_AGGREGATE_DIMENSIONS = ("state_id", "city_id", "realty_type_id", "operation_type_id")
+MARKET_AGGREGATE_QUANTILES = (0.25, 0.5, 0.75)
+
+# must be dict with datetime.timedelta params
+TASK_LOCK_EXPIRE_TIME = {
+    "minutes": 5
+}
+TASK_LOCK_PREFIX = "task_lock"
+SKIPPED_TASKS_COUNTER = "skipped_tasks"
+
+# request header with PROFILING_TOKEN that turns on profiling of the request
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+# celery task kwarg that turns on profiling of the task execution
+PROFILE_TASK_KWARG = "profile"
+# longer SQL parameters are cut in saved statements log
+PROFILE_MAX_PARAMETERS_LENGTH = 300
+
+# redis keys of circuit breakers of services
+CIRCUIT_BREAKER_PREFIX = "circuit"
+# responses with these statuses are retried and counted as failures of service
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+# threads sending hedged requests of the process
+HEDGE_MAX_WORKERS = 16
+
 
 DOMRIA_TOKENS_LIST = os.environ.get("DOMRIA_API_KEYS").split(".")
+# part of hourly budget of all DomRia tokens that background crawls can't use
+DOMRIA_INTERACTIVE_BUDGET_SHARE = 0.2
+DOMRIA_BUDGET_WINDOW_SECONDS = 60
+DOMRIA_BUDGET_WINDOW_PREFIX = "domria_budget"
 CACHED_CHARACTERISTICS = "characteristics_avaliable"
 
 # must be dict with datetime.timedelta params
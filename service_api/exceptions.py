@@ -89,3 +89,9 @@ class ServiceHandlerError(BaseCustomException):
     """
     Raised when handler error appears
     """
+
+
+class CircuitOpenError(BaseCustomException):
+    """
+    Raised instead of sending request while circuit breaker of service is open
+    """
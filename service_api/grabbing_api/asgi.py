@@ -0,0 +1,254 @@
+"""
+ASGI variant of grabbing api. All requests of a process are served by one event loop:
+realties are scraped by interactive celery task that pushes them to redis list (see push_to_stream),
+records of all in-flight requests are awaited with one BLPOP over their lists,
+so waiting requests hold neither a thread nor a redis connection each.
+Run with any ASGI server, e.g.
+
+    uvicorn service_api.grabbing_api.asgi:app --workers 2
+"""
+import asyncio
+import itertools
+import json
+import os
+from functools import partial
+from typing import AsyncIterator, Callable, Dict, Optional
+from uuid import uuid4
+
+from redis.asyncio import BlockingConnectionPool, Redis
+from redis.exceptions import RedisError
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+import service_api
+from service_api import LOGGER, flask_app
+from ..constants import (ASYNC_GRABBING_POLL_TIMEOUT, GRAB_LATEST_REALTIES_TASK, GRABBING_STREAM_EXPIRE_TIME,
+                         GRABBING_STREAM_PREFIX, GRABBING_TASK_TIMEOUT, NDJSON_MIMETYPE, URLS)
+from ..errors import BadRequestException, InternalServerErrorException, ServiceUnavailableException
+from ..serializers import dumps
+from ..utils.streaming import STREAM_END, STREAM_ERROR, error_record
+
+
+class StreamDispatcher:
+    """
+    Reads records pushed to redis lists of all in-flight requests with one BLPOP over their keys
+    and hands them to queues of requests. Runs while there are subscribed keys.
+    BLPOP also waits on wake-up list of dispatcher, new key is pushed to it on subscribe,
+    so running BLPOP returns and the next one awaits the new key too
+
+    :param client: Redis - asyncio redis client for BLPOP
+    :param poll_timeout: int - seconds of one BLPOP
+    """
+
+    def __init__(self, client: Redis, poll_timeout: int = ASYNC_GRABBING_POLL_TIMEOUT) -> None:
+        self.client = client
+        self.poll_timeout = poll_timeout
+        self.queues: Dict[str, asyncio.Queue] = {}
+        self.task: Optional[asyncio.Future] = None
+        self.rounds = itertools.count()
+        self.wake_key = f"{GRABBING_STREAM_PREFIX}:wake:{uuid4().hex}"
+
+    async def subscribe(self, key: str) -> asyncio.Queue:
+        """
+        Queue that receives values pushed to list key
+        """
+        queue = self.queues[key] = asyncio.Queue()
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.run())
+            return queue
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                await pipe.rpush(self.wake_key, key).expire(self.wake_key, GRABBING_STREAM_EXPIRE_TIME).execute()
+        except (RedisError, OSError) as error:
+            LOGGER.warning("Waking up grabbing streams reader failed: %s", error)
+        return queue
+
+    def unsubscribe(self, key: str) -> None:
+        """
+        Stop reading list key
+        """
+        self.queues.pop(key, None)
+
+    async def run(self) -> None:
+        """
+        Dispatch values until no key is subscribed
+        """
+        while self.queues:
+            keys = list(self.queues)
+            # BLPOP pops from the first non-empty list, rotation keeps busy lists from starving others
+            shift = next(self.rounds) % len(keys)
+            try:
+                item = await self.client.blpop([self.wake_key] + keys[shift:] + keys[:shift], self.poll_timeout)
+            except (RedisError, OSError) as error:
+                LOGGER.warning("Reading grabbing streams failed: %s", error)
+                await asyncio.sleep(self.poll_timeout)
+                continue
+            if item is not None and (queue := self.queues.get(item[0])) is not None:
+                queue.put_nowait(item[1])
+
+    async def records(self, key: str, timeout: int) -> AsyncIterator[Dict]:
+        """
+        Records pushed by push_to_stream until end marker, list is deleted after reading
+
+        :param timeout: int - seconds to wait for every next record
+        :raises asyncio.TimeoutError: if next record wasn't pushed in time
+        :raises InternalServerErrorException: if producer of records failed
+        """
+        queue = await self.subscribe(key)
+        try:
+            while (value := await asyncio.wait_for(queue.get(), timeout)) != STREAM_END:
+                if value == STREAM_ERROR:
+                    raise InternalServerErrorException("Grabbing failed")
+                yield json.loads(value)
+        finally:
+            self.unsubscribe(key)
+            await self.client.delete(key)
+
+
+class GrabbingApp:
+    """
+    ASGI app with POST endpoint of grabbing api. Responds with json list of realties
+    or streams newline delimited json if client accepts application/x-ndjson, like LatestDataResource
+
+    :param client: Redis - asyncio redis client, created with grabbing role connections limit by default
+    """
+
+    def __init__(self, client: Redis = None) -> None:
+        self.client = client
+        self.dispatcher: Optional[StreamDispatcher] = None
+
+    def get_dispatcher(self) -> StreamDispatcher:
+        """
+        Dispatcher of the app, created in the running loop
+        """
+        if self.dispatcher is None:
+            if self.client is None:
+                profile = flask_app.config["ROLE_PROFILES"]["grabbing"]
+                pool = BlockingConnectionPool(host=os.environ["REDIS_IP"], port=os.environ["REDIS_PORT"],
+                                              max_connections=profile["REDIS_MAX_CONNECTIONS"] or 10,
+                                              timeout=flask_app.config.get("REDIS_POOL_TIMEOUT"),
+                                              decode_responses=True)
+                self.client = Redis(connection_pool=pool)
+            self.dispatcher = StreamDispatcher(self.client)
+        return self.dispatcher
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        if scope["type"] != "http":
+            return None
+        if scope["path"].rstrip("/") != URLS["GRABBING"]["GET_LATEST_URL"]:
+            return await send_json(send, 404, {"code": 404, "type": "NOT_FOUND", "message": "Not found"})
+        if scope["method"] != "POST":
+            return await send_json(send, 405, {"code": 405, "type": "METHOD_NOT_ALLOWED",
+                                               "message": "Method not allowed"})
+        try:
+            return await self.grab(scope, receive, send)
+        except (BadRequestException, InternalServerErrorException, ServiceUnavailableException) as error:
+            return await send_json(send, error.status_code, error.to_dict())
+
+    async def lifespan(self, receive: Callable, send: Callable) -> None:
+        """
+        Close redis connections on server shutdown
+        """
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self.client is not None:
+                    await self.client.close(close_connection_pool=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def grab(self, scope: Dict, receive: Callable, send: Callable) -> None:
+        """
+        Send grabbing task and respond with realties it pushes to redis
+        """
+        try:
+            filters = json.loads(await read_body(receive) or b"null")
+        except ValueError as error:
+            raise BadRequestException("Request body is not a valid json") from error
+
+        stream_key = f"{GRABBING_STREAM_PREFIX}:{uuid4().hex}"
+        signature = service_api.celery_app.signature(GRAB_LATEST_REALTIES_TASK)
+        # publishing to broker is a short blocking call, it runs in the default executor
+        task = await asyncio.get_running_loop().run_in_executor(
+            None, partial(signature.apply_async, args=(filters,), kwargs={"stream_key": stream_key}))
+        stream = self.get_dispatcher().records(stream_key, GRABBING_TASK_TIMEOUT)
+        records = revoke_on_timeout(stream, task)
+        try:
+            if wants_ndjson(scope):
+                await stream_ndjson(send, records)
+            else:
+                await send_json(send, 200, [record async for record in records])
+        finally:
+            await records.aclose()
+            await stream.aclose()
+
+
+async def revoke_on_timeout(records: AsyncIterator[Dict], task) -> AsyncIterator[Dict]:
+    """
+    Records of stream, task is revoked if they are not ready in time
+
+    :raises ServiceUnavailableException: if grabbing takes too long
+    """
+    try:
+        async for record in records:
+            yield record
+    except asyncio.TimeoutError as error:
+        await asyncio.get_running_loop().run_in_executor(None, task.revoke)
+        raise ServiceUnavailableException("Grabbing takes too long") from error
+
+
+async def stream_ndjson(send: Callable, records: AsyncIterator[Dict]) -> None:
+    """
+    Send every record as a json line as soon as it is pushed.
+    If grabbing fails or takes too long error record is sent as the last line, like ndjson_response does
+    """
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", NDJSON_MIMETYPE.encode())]})
+    try:
+        async for record in records:
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            await send({"type": "http.response.body", "body": line.encode("utf-8"), "more_body": True})
+    except (InternalServerErrorException, ServiceUnavailableException) as error:
+        LOGGER.warning("Grabbing stream failed: %s", error.message)
+        line = json.dumps(error_record(error), ensure_ascii=False) + "\n"
+        await send({"type": "http.response.body", "body": line.encode("utf-8"), "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def read_body(receive: Callable) -> bytes:
+    """
+    Whole body of request
+    """
+    body, more_body = b"", True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+    return body
+
+
+def wants_ndjson(scope: Dict) -> bool:
+    """
+    Check if client asked for streaming response with Accept header
+    """
+    accept = dict(scope["headers"]).get(b"accept", b"").decode("latin-1")
+    return parse_accept_header(accept, MIMEAccept).best_match(["application/json", NDJSON_MIMETYPE]) == \
+        NDJSON_MIMETYPE
+
+
+async def send_json(send: Callable, status: int, data) -> None:
+    """
+    Respond with json body
+    """
+    body = dumps(data)
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json; charset=utf-8"),
+                            (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+app = GrabbingApp()
@@ -2,14 +2,18 @@
 Resources and urls for grabbing service
 """
 
+from uuid import uuid4
+
+from celery.exceptions import TimeoutError as CeleryTimeoutError
 from flask import request
 from flask_restful import Resource
 
+import service_api
 from service_api import api_
-from ..constants import URLS
-from ..errors import InternalServerErrorException
+from ..constants import GRAB_LATEST_REALTIES_TASK, GRABBING_STREAM_PREFIX, GRABBING_TASK_TIMEOUT, URLS
+from ..errors import InternalServerErrorException, ServiceUnavailableException
 from ..exceptions import MetaDataError
-from ..utils.db import RealtyFetcher
+from ..utils.streaming import iter_stream, ndjson_response, wants_ndjson
 
 
 class LatestDataResource(Resource):
@@ -19,15 +23,25 @@ class LatestDataResource(Resource):
 
     def post(self):
         """
-        Returns latest information about realty and save it to DB
+        Returns latest information about realty and save it to DB.
+        Streams newline delimited json if client accepts application/x-ndjson
         """
 
         post_body = request.get_json()
+        # sent by name, grabbing api doesn't import tasks with the whole scraping stack
+        grab_latest_realties = service_api.celery_app.signature(GRAB_LATEST_REALTIES_TASK)
+        if wants_ndjson():
+            stream_key = f"{GRABBING_STREAM_PREFIX}:{uuid4().hex}"
+            grab_latest_realties.apply_async(args=(post_body,), kwargs={"stream_key": stream_key})
+            return ndjson_response(iter_stream(stream_key, GRABBING_TASK_TIMEOUT))
+
+        task = grab_latest_realties.apply_async(args=(post_body,))
         try:
-            fetcher = RealtyFetcher(post_body)
+            return task.get(timeout=GRABBING_TASK_TIMEOUT)
+        except CeleryTimeoutError as error:
+            task.revoke()
+            raise ServiceUnavailableException("Grabbing takes too long") from error
         except MetaDataError as error:
             raise InternalServerErrorException() from error
 
-        return fetcher.fetch()
-
 api_.add_resource(LatestDataResource, URLS["GRABBING"]["GET_LATEST_URL"])
@@ -0,0 +1,192 @@
+"""
+Prometheus metrics of API, scraping, caches, DB pool and celery.
+When PROMETHEUS_MULTIPROC_DIR is set (gunicorn or celery prefork) counters and histograms
+of all processes are aggregated through that directory
+"""
+import os
+import time
+from typing import Iterator
+
+from flask import Flask, Response, g, request
+from flask_restful import Resource
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+from sqlalchemy.exc import SQLAlchemyError
+from redis.exceptions import RedisError
+
+import service_api
+from service_api import LOGGER, api_, flask_app
+from .constants import CELERY_QUEUES, URLS
+
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Latency of API requests",
+                            ["endpoint", "method", "status"])
+SCRAPE_LATENCY = Histogram("scrape_duration_seconds", "Time of fetching and loading realties from service",
+                           ["service"], buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+SCRAPE_ERRORS = Counter("scrape_errors_total", "Failed fetches of realties from service", ["service", "error"])
+SERVICE_RETRIES = Counter("service_request_retries_total", "Retried requests to services", ["service"])
+SERVICE_HEDGES = Counter("service_hedged_requests_total", "Hedged requests sent to services", ["service"])
+CIRCUIT_REJECTIONS = Counter("circuit_breaker_rejections_total", "Requests not sent because breaker is open",
+                             ["service"])
+SCRAPES_AVOIDED = Counter("scrapes_avoided_total", "Scrapes not sent because negative result is cached",
+                          ["service", "reason"])
+CACHE_REQUESTS = Counter("cache_requests_total", "Lookups of cached responses", ["cache", "result"])
+TASK_DURATION = Histogram("celery_task_duration_seconds", "Duration of celery tasks", ["task", "state"],
+                          buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600))
+
+
+class DomriaBudgetCollector:
+    """
+    Remaining DomRia requests of every token during the current hour
+    """
+
+    def describe(self) -> Iterator[GaugeMetricFamily]:
+        """
+        Metrics without samples, so registry doesn't collect them (and query DB) on registration
+        """
+        yield GaugeMetricFamily("domria_requests_remaining", "DomRia requests left during the last hour",
+                                labels=["token"])
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        """
+        Remaining requests of every DomRia token
+        """
+        from .services.domria.limitation import DomriaLimitationSystem
+        gauge, = self.describe()
+        try:
+            remaining = DomriaLimitationSystem.get_remaining_requests()
+        except SQLAlchemyError as error:
+            LOGGER.warning("DomRia budget metric is not available: %s", error)
+            return
+        for hashed_token, requests_left in remaining.items():
+            gauge.add_metric([hashed_token[:8]], requests_left)
+        yield gauge
+
+
+class DBPoolCollector:
+    """
+    State of SQLAlchemy connection pool of this process
+    """
+    GAUGES = (("size", "Pool size"), ("checked_out", "Connections in use"), ("checked_in", "Idle connections"),
+              ("overflow", "Connections over pool size"))
+
+    def describe(self) -> Iterator[GaugeMetricFamily]:
+        """
+        Metrics without samples, so registry doesn't create engine of the process on registration
+        """
+        for name, description in self.GAUGES:
+            yield GaugeMetricFamily(f"db_pool_{name}", description)
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        """
+        Current state of the pool
+        """
+        pool = service_api.engine.pool
+        values = (pool.size(), pool.checkedout(), pool.checkedin(), pool.overflow())
+        for (name, description), value in zip(self.GAUGES, values):
+            yield GaugeMetricFamily(f"db_pool_{name}", description, value=value)
+
+
+class CeleryQueueCollector:
+    """
+    Number of messages waiting in every celery queue (redis broker keeps them in lists)
+    """
+
+    def describe(self) -> Iterator[GaugeMetricFamily]:
+        """
+        Metrics without samples, so registry doesn't collect them (and query redis) on registration
+        """
+        yield GaugeMetricFamily("celery_queue_length", "Messages waiting in celery queue", labels=["queue"])
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        """
+        Length of every celery queue
+        """
+        gauge, = self.describe()
+        try:
+            for queue in CELERY_QUEUES:
+                gauge.add_metric([queue], service_api.CACHE.llen(queue))
+        except RedisError as error:
+            LOGGER.warning("Celery queue metric is not available: %s", error)
+            return
+        yield gauge
+
+
+COLLECTORS = (DomriaBudgetCollector(), DBPoolCollector(), CeleryQueueCollector())
+
+
+def get_registry() -> CollectorRegistry:
+    """
+    Registry to expose. In multiprocess mode metrics of all processes are read from files
+    """
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    for collector in COLLECTORS:
+        registry.register(collector)
+    return registry
+
+
+if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    for _collector in COLLECTORS:
+        REGISTRY.register(_collector)
+
+
+def register_request_metrics(app: Flask) -> None:
+    """
+    Measure latency of every request by endpoint (flask_restful resource)
+    """
+    @app.before_request
+    def start_timer():
+        g.request_started_at = time.perf_counter()
+
+    @app.after_request
+    def observe_latency(response):
+        started_at = getattr(g, "request_started_at", None)
+        if started_at is not None:
+            REQUEST_LATENCY.labels(request.endpoint or "unknown", request.method,
+                                   response.status_code).observe(time.perf_counter() - started_at)
+        return response
+
+
+def start_task_timer(task_id=None, task=None, **kwargs):
+    """
+    Remember start time of celery task
+    """
+    task.request.metrics_started_at = time.perf_counter()
+
+
+def observe_task_duration(task_id=None, task=None, state=None, **kwargs):
+    """
+    Observe duration of finished celery task
+    """
+    started_at = getattr(task.request, "metrics_started_at", None)
+    if started_at is not None:
+        TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(time.perf_counter() - started_at)
+
+
+def register_task_metrics() -> None:
+    """
+    Measure duration of celery tasks. Called when celery app is created
+    """
+    from celery.signals import task_postrun, task_prerun
+    task_prerun.connect(start_task_timer)
+    task_postrun.connect(observe_task_duration)
+
+
+class MetricsResource(Resource):
+    """
+    Route to expose metrics to Prometheus
+    """
+
+    def get(self):
+        """
+        Method that returns all metrics in Prometheus text format
+        :return: text
+        """
+        return Response(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)
+
+
+register_request_metrics(flask_app)
+api_.add_resource(MetricsResource, URLS["CLIENT"]["METRICS_URL"])
@@ -3,6 +3,7 @@ Models for service_api
 """
 from datetime import datetime
 from sqlalchemy import (BIGINT, TIMESTAMP, VARCHAR, Column, Float, ForeignKey, PrimaryKeyConstraint, UniqueConstraint)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 
 from service_api import Base
@@ -391,3 +392,36 @@ class RequestsHistory(Base):
     url = Column(VARCHAR(4096), nullable=False)
     hashed_token = Column(VARCHAR(200), nullable=False)
     request_timestamp = Column(TIMESTAMP, nullable=False, default=datetime.now())
+
+
+class MarketAggregate(Base):
+    """
+    Rolling statistics of actual realties with the same location, realty type and operation type.
+    Kept up to date when realty versions are inserted or retired.
+    Missing city or operation type is stored as 0
+    :param: count int - number of actual realties
+    :param: price_sum float
+    :param: square_count int - number of realties with known square
+    :param: square_sum float
+    :param: price_per_square_sum float
+    :param: price_per_square_sketch dict - serialized QuantileSketch of price per square meter
+    """
+
+    __tablename__ = "market_aggregate"
+
+    id = Column(BIGINT, primary_key=True)
+    state_id = Column(BIGINT, nullable=False)
+    city_id = Column(BIGINT, nullable=False, default=0)
+    realty_type_id = Column(BIGINT, nullable=False)
+    operation_type_id = Column(BIGINT, nullable=False, default=0)
+    count = Column(BIGINT, nullable=False, default=0)
+    price_sum = Column(Float, nullable=False, default=0)
+    square_count = Column(BIGINT, nullable=False, default=0)
+    square_sum = Column(Float, nullable=False, default=0)
+    price_per_square_sum = Column(Float, nullable=False, default=0)
+    price_per_square_sketch = Column(JSONB, nullable=False, default=dict)
+    updated_at = Column(TIMESTAMP, nullable=False, default=datetime.now)
+
+    __table_args__ = (
+        UniqueConstraint(state_id, city_id, realty_type_id, operation_type_id),
+    )
@@ -0,0 +1,197 @@
+"""
+Opt-in profiling of single requests and celery tasks.
+A request is profiled when X-Profile header carries PROFILING_TOKEN,
+a task is profiled when it is sent with profile=True kwarg (see ProfiledTask).
+cProfile stats (.prof) and SQL statements with durations (.json) are saved to PROFILING_DIR
+and can be listed with `python manage.py profiles`
+"""
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from flask import Flask, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import service_api
+from service_api import LOGGER, flask_app
+from .constants import PROFILE_HEADER, PROFILE_ID_HEADER, PROFILE_MAX_PARAMETERS_LENGTH
+
+_ACTIVE = threading.local()
+
+
+class SQLRecorder:
+    """
+    Records SQL statements executed by engine in the thread that created recorder
+    """
+
+    def __init__(self, db_engine: Engine) -> None:
+        self.engine = db_engine
+        self.thread_id = threading.get_ident()
+        self.statements: List[Dict] = []
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if threading.get_ident() == self.thread_id:
+            conn.info.setdefault("profile_started_at", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if threading.get_ident() == self.thread_id and (started := conn.info.get("profile_started_at")):
+            self.statements.append({
+                "statement": statement,
+                "parameters": repr(parameters)[:PROFILE_MAX_PARAMETERS_LENGTH],
+                "duration_ms": round((time.perf_counter() - started.pop()) * 1000, 3)
+            })
+
+    def __enter__(self) -> "SQLRecorder":
+        event.listen(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(self.engine, "after_cursor_execute", self._after_cursor_execute)
+        return self
+
+    def __exit__(self, *args) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        event.remove(self.engine, "after_cursor_execute", self._after_cursor_execute)
+
+
+def profiles_dir() -> str:
+    """
+    Directory of saved profiles
+    """
+    return flask_app.config.get("PROFILING_DIR", "logs/profiles")
+
+
+def new_profile_id(name: str) -> str:
+    """
+    Unique id of profile that is sorted by time and shows what was profiled
+    """
+    slug = re.sub(r"[^a-zA-Z0-9]+", "-", name).strip("-").lower()[:60]
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{os.urandom(3).hex()}"
+
+
+@contextmanager
+def profile_execution(name: str, db_engine: Engine = None) -> Iterator[Optional[str]]:
+    """
+    Profile block with cProfile and record its SQL statements.
+    Yields id of the profile or None if profiling already runs in this thread
+
+    :param name: str - what is profiled, e.g. "POST /realty" or "task load_realties_by_filters"
+    :param db_engine: Engine - engine to record statements of, service engine by default
+    """
+    if getattr(_ACTIVE, "profiling", False):
+        yield None
+        return
+    profile_id = new_profile_id(name)
+    profiler = cProfile.Profile()
+    recorder = SQLRecorder(db_engine or service_api.engine)
+    started_at = time.time()
+    _ACTIVE.profiling = True
+    try:
+        with recorder:
+            profiler.enable()
+            try:
+                yield profile_id
+            finally:
+                profiler.disable()
+    finally:
+        _ACTIVE.profiling = False
+        save_profile(profile_id, name, started_at, time.time() - started_at, profiler, recorder.statements)
+
+
+def save_profile(profile_id: str, name: str, started_at: float, duration: float, profiler: cProfile.Profile,
+                 statements: List[Dict]) -> None:
+    """
+    Save stats of profiler and summary with SQL statements to PROFILING_DIR
+    """
+    directory = profiles_dir()
+    os.makedirs(directory, exist_ok=True)
+    profiler.dump_stats(os.path.join(directory, f"{profile_id}.prof"))
+    summary = {
+        "id": profile_id,
+        "name": name,
+        "started_at": started_at,
+        "duration_s": round(duration, 6),
+        "sql_count": len(statements),
+        "sql_duration_ms": round(sum(statement["duration_ms"] for statement in statements), 3),
+        "statements": statements
+    }
+    with open(os.path.join(directory, f"{profile_id}.json"), "w", encoding="utf-8") as file:
+        json.dump(summary, file, ensure_ascii=False, indent=1)
+    LOGGER.info("Profile %s of %s saved (%.3f s, %s SQL statements)", profile_id, name, duration, len(statements))
+
+
+def list_profiles() -> List[Dict]:
+    """
+    Summaries of saved profiles without statements, the latest first
+    """
+    directory = profiles_dir()
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for file_name in os.listdir(directory):
+        if file_name.endswith(".json"):
+            with open(os.path.join(directory, file_name), encoding="utf-8") as file:
+                summary = json.load(file)
+            summary.pop("statements", None)
+            profiles.append(summary)
+    return sorted(profiles, key=lambda summary: summary["started_at"], reverse=True)
+
+
+def summarize_profile(profile_id: str, limit: int = 20) -> str:
+    """
+    Text report of profile: functions with the biggest cumulative time and the slowest SQL statements
+    """
+    directory = profiles_dir()
+    with open(os.path.join(directory, f"{profile_id}.json"), encoding="utf-8") as file:
+        summary = json.load(file)
+
+    report = io.StringIO()
+    report.write(f"{summary['name']}: {summary['duration_s']:.3f} s, {summary['sql_count']} SQL statements "
+                 f"({summary['sql_duration_ms']:.1f} ms)\n")
+    stats = pstats.Stats(os.path.join(directory, f"{profile_id}.prof"), stream=report)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+
+    report.write("Slowest SQL statements:\n")
+    for statement in sorted(summary["statements"], key=lambda item: item["duration_ms"], reverse=True)[:limit]:
+        report.write(f"{statement['duration_ms']:>10.3f} ms  {' '.join(statement['statement'].split())}\n")
+    return report.getvalue()
+
+
+def is_authorized(token: Optional[str]) -> bool:
+    """
+    True if token is PROFILING_TOKEN. Profiling of requests is disabled while token is not configured
+    """
+    expected = flask_app.config.get("PROFILING_TOKEN")
+    return bool(expected and token) and hmac.compare_digest(token.encode(), expected.encode())
+
+
+def register_flask_profiling(app: Flask) -> None:
+    """
+    Profile requests that have valid X-Profile header.
+    Id of the saved profile is returned in X-Profile-Id header
+    """
+    @app.before_request
+    def start_request_profile():
+        if PROFILE_HEADER in request.headers and is_authorized(request.headers[PROFILE_HEADER]):
+            g.profile = profile_execution(f"{request.method} {request.path}")
+            g.profile_id = g.profile.__enter__()
+
+    @app.after_request
+    def set_profile_id(response):
+        if (profile_id := g.get("profile_id")) is not None:
+            response.headers[PROFILE_ID_HEADER] = profile_id
+        return response
+
+    @app.teardown_request
+    def end_request_profile(error=None):
+        if (profile := g.pop("profile", None)) is not None:
+            profile.__exit__(None, None, None)
+
+
+register_flask_profiling(flask_app)
@@ -2,6 +2,7 @@
 Schemas for models with fields validation
 """
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict, List, Tuple
 
 from marshmallow import Schema, ValidationError, fields, validate
@@ -171,6 +172,16 @@ class RealtySchema(Schema):
     service = fields.Nested(ServiceSchema, dump_only=True)
 
 
+class MarketAggregateInputSchema(Schema):
+    """
+    Schema for market aggregates filters
+    """
+    state_id = fields.Integer(validate=validate_non_negative_field)
+    city_id = fields.Integer(validate=validate_non_negative_field)
+    realty_type_id = fields.Integer(validate=validate_non_negative_field)
+    operation_type_id = fields.Integer(validate=validate_non_negative_field)
+
+
 class CityXRefServiceSchema(Schema):
     """
     Schema for CityXRefService model
@@ -267,26 +278,70 @@ class RequestsHistorySchema(Schema):
         validate=validate.Range(min=datetime(1990, 1, 1)))
 
 
+class FiltersValidator:
+    """
+    Validator for a fixed list of (model, schema) pairs.
+    Schema instances are created once and every known key is mapped to its models up front,
+    so filters are split and validated in a single pass over params
+    """
+
+    def __init__(self, validators: Tuple[Tuple[Base, Schema], ...]) -> None:
+        """
+        :param validators: Tuple[Tuple[Base, Schema]] - models with schemas to validate their filters
+        """
+        self.models = tuple(model for model, _ in validators)
+        self.schemas = tuple(schema() for _, schema in validators)
+        self.buckets: Dict[str, Tuple[int, ...]] = {}
+
+    def get_buckets(self, key: str) -> Tuple[int, ...]:
+        """
+        Indexes of models that have attribute with the key name.
+        Only known keys are cached, so unknown keys from requests don't grow the cache
+        """
+        buckets = self.buckets.get(key)
+        if buckets is None:
+            buckets = tuple(index for index, model in enumerate(self.models) if hasattr(model, key))
+            if buckets:
+                self.buckets[key] = buckets
+        return buckets
+
+    def __call__(self, params: Dict) -> List[Dict]:
+        """
+        Split params by models and validate them with schemas
+        :param params: Dict - filters
+        :return: List[Dict] - filters of every model
+        """
+        filters = [{} for _ in self.models]
+        matches = 0
+        for key, value in params.items():
+            buckets = self.get_buckets(key)
+            matches += len(buckets)
+            for index in buckets:
+                filters[index][key] = value
+
+        if matches != len(params):
+            raise BadFiltersException("Undefined parameters found")
+
+        for schema, dict_to_validate in zip(self.schemas, filters):
+            try:
+                schema.load(dict_to_validate)
+            except ValidationError as error:
+                raise BadFiltersException("Filters validation error. Bad filters", desc=error.args) from error
+        return filters
+
+
+@lru_cache(maxsize=None)
+def get_filters_validator(validators: Tuple[Tuple[Base, Schema], ...]) -> FiltersValidator:
+    """
+    Compiled validator for validators list. Built once per process
+    """
+    return FiltersValidator(validators)
+
+
 def filters_validation(params: Dict, validators: List[Tuple[Base, Schema]]) -> List[Dict]:
     """
     Method that validates filters for Realty and Realty_details
     :param: dict
     :return: List[dict]
     """
-    models, schemes = zip(*validators)
-    filters = [{key: params.get(key) for key in params if hasattr(objects, key)} for objects in models]
-
-    if sum(map(len, filters)) != len(params):
-        raise BadFiltersException("Undefined parameters found")
-    iter_filters = iter(filters)
-
-    for item in filters:
-        item = {key: values for key, values in item.items() if isinstance(values, dict)}
-
-    for scheme in schemes:
-        dict_to_validate = next(iter_filters)
-        try:
-            scheme().load(dict_to_validate)
-        except ValidationError as error:
-            raise BadFiltersException("Filters validation error. Bad filters", desc=error.args) from error
-    return filters
+    return get_filters_validator(tuple(map(tuple, validators)))(params)
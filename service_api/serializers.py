@@ -0,0 +1,106 @@
+"""
+Precompiled serializers for read-only output schemas.
+
+For every schema a plain python function is generated that turns a model instance
+into the same dict as Schema.dump does, without marshmallow's per-field overhead.
+Fields that can't be compiled fall back to marshmallow field serialization
+"""
+from collections.abc import Mapping
+from datetime import date
+from functools import lru_cache
+from typing import Any, Callable, Dict, Type
+
+import orjson
+from marshmallow import Schema, fields, missing
+
+# Field classes whose dump is just a type conversion of not None value
+SIMPLE_CONVERTERS = {
+    fields.Integer: int,
+    fields.Float: float,
+    fields.String: str
+}
+
+
+def _isoformat(value: date) -> str:
+    return value.isoformat()
+
+
+def _nested_converter(field: fields.Nested) -> Callable:
+    """
+    Converter for Nested field that uses compiled serializer of nested schema
+    """
+    nested_serializer = compile_schema(field.schema)
+    if field.schema.many or field.many:
+        return lambda value: [nested_serializer(item) for item in value]
+    return nested_serializer
+
+
+def _field_converter(field: fields.Field) -> Callable:
+    """
+    Returns function that converts not None value the same way as field does
+    or None if field can't be compiled
+    """
+    if field.default is not missing or (field.attribute and "." in field.attribute):
+        return None
+    if isinstance(field, fields.Nested):
+        return _nested_converter(field)
+    if type(field) is fields.DateTime and (field.format or fields.DateTime.DEFAULT_FORMAT) == "iso":
+        return _isoformat
+    if type(field) in SIMPLE_CONVERTERS and not getattr(field, "as_string", False):
+        return SIMPLE_CONVERTERS[type(field)]
+    return None
+
+
+def compile_schema(schema: Schema) -> Callable[[Any], Dict]:
+    """
+    Generate function that serializes single object according to schema instance.
+    Keys are added in the same order as schema.dump adds them
+    """
+    namespace = {"missing": missing, "Mapping": Mapping, "schema": schema}
+    lines = ["def serialize(obj):",
+             "    if isinstance(obj, Mapping):",
+             "        return schema.dump(obj)",
+             "    result = {}"]
+
+    for index, (attr_name, field) in enumerate(schema.dump_fields.items()):
+        key = field.data_key if field.data_key is not None else attr_name
+        converter = _field_converter(field)
+        if converter is None:
+            namespace[f"field_{index}"] = field
+            lines += [f"    value = field_{index}.serialize({attr_name!r}, obj, accessor=schema.get_attribute)",
+                      "    if value is not missing:",
+                      f"        result[{key!r}] = value"]
+            continue
+        namespace[f"convert_{index}"] = converter
+        lines += [f"    value = getattr(obj, {(field.attribute or attr_name)!r}, missing)",
+                  "    if value is not missing:",
+                  f"        result[{key!r}] = None if value is None else convert_{index}(value)"]
+    lines.append("    return result")
+
+    exec("\n".join(lines), namespace)  # pylint: disable=exec-used
+    return namespace["serialize"]
+
+
+@lru_cache(maxsize=None)
+def get_serializer(schema_class: Type[Schema]) -> Callable[[Any], Dict]:
+    """
+    Compiled serializer for schema class. Compiled once per process
+    """
+    return compile_schema(schema_class())
+
+
+def serialize(schema_class: Type[Schema], obj: Any, many: bool = False):
+    """
+    Drop-in replacement of schema_class(many=many).dump(obj)
+    """
+    serializer = get_serializer(schema_class)
+    if many and obj is not None:
+        return [serializer(item) for item in obj]
+    return serializer(obj)
+
+
+def dumps(data: Any) -> bytes:
+    """
+    Encode serialized data to json with orjson
+    """
+    return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
@@ -1,19 +1,43 @@
-"""
-Contains logic for comunication with external realty services
-"""
-
-from .domria.handlers import DomriaServiceHandler
-from .domria.loaders import (DomriaCityXRefServicesLoader, DomriaStateXRefServicesLoader)
-from .olx.handlers import OlxServiceHandler
-from .olx.loaders import OlxCityXRefServicesLoader, OlxStateXRefServicesLoader
-
-services_handlers = {
-    "DomriaServiceHandler": DomriaServiceHandler,
-    "OlxServiceHandler": OlxServiceHandler
-}
-
-state_loaders = {"DOMRIA API": DomriaStateXRefServicesLoader,
-                 "OLX": OlxStateXRefServicesLoader}
-
-city_loaders = {"DOMRIA API": DomriaCityXRefServicesLoader,
-                "OLX": OlxCityXRefServicesLoader}
+"""
+Contains logic for comunication with external realty services.
+Handlers and loaders are imported on first use, so processes that don't scrape
+don't load selenium, BeautifulSoup and services modules
+"""
+from collections.abc import Mapping
+from importlib import import_module
+from typing import Dict, Iterator
+
+
+class LazyRegistry(Mapping):
+    """
+    Read-only mapping of names to classes given by "module:attribute" paths.
+    Module is imported when class is requested for the first time
+    """
+
+    def __init__(self, paths: Dict[str, str]) -> None:
+        self.paths = paths
+        self.loaded = {}
+
+    def __getitem__(self, name: str):
+        if name not in self.loaded:
+            module_name, attribute = self.paths[name].split(":")
+            self.loaded[name] = getattr(import_module(module_name, __name__), attribute)
+        return self.loaded[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.paths)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+
+services_handlers = LazyRegistry({
+    "DomriaServiceHandler": ".domria.handlers:DomriaServiceHandler",
+    "OlxServiceHandler": ".olx.handlers:OlxServiceHandler"
+})
+
+state_loaders = LazyRegistry({"DOMRIA API": ".domria.loaders:DomriaStateXRefServicesLoader",
+                              "OLX": ".olx.loaders:OlxStateXRefServicesLoader"})
+
+city_loaders = LazyRegistry({"DOMRIA API": ".domria.loaders:DomriaCityXRefServicesLoader",
+                             "OLX": ".olx.loaders:OlxCityXRefServicesLoader"})
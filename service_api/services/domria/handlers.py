@@ -6,10 +6,12 @@ from typing import Dict, List
 
 from service_api import LOGGER
 
-from ...exceptions import (MetaDataError, ObjectNotFoundException, ServiceHandlerError)
+from ...constants import DOMRIA_SEARCH_PAGE_SIZE
+from ...exceptions import (MetaDataError, ObjectNotFoundException, ResponseNotOkException, ServiceHandlerError)
 from ...utils import send_request
 from ...utils.async_logic import get_all_responses
 from ..interfaces import AbstractServiceHandler
+from ..page_cache import cache_ad, cached_page, get_cached_ads, page_key, page_slices
 from .convertors import (DomRiaInputConverter, DomRiaOutputConverter)
 from .limitation import DomriaLimitationSystem
 
@@ -21,7 +23,8 @@ class DomriaServiceHandler(AbstractServiceHandler):
 
     def get_latest_data(self):
         """
-        Method that realise the logic of sending request to DomRia and getting items
+        Method that realise the logic of sending request to DomRia and getting items.
+        Ads from page * page_ads_number are taken from cached search pages
         :return: List[Dict]
         """
         try:
@@ -38,25 +41,51 @@ class DomriaServiceHandler(AbstractServiceHandler):
         params = DomRiaInputConverter(self.post_body, search_realty_metadata, service_name=service_name).convert()
         for param, val in search_realty_metadata["optional"].items():
             params[param] = val
-        params[self.metadata["token_name"]] = DomriaLimitationSystem.get_token()
-        response = send_request("GET", url=url, params=params, headers={'User-Agent': 'Mozilla/5.0'})
-        if response.status_code != 200:
-            raise ServiceHandlerError("Invalid url")
-
-        items = response.json()
         try:
-            return self.process_request(items, self.post_body["additional"].pop("page"),
-                                        self.post_body["additional"].pop("page_ads_number"),
-                                        self.metadata)
+            page = self.post_body["additional"].pop("page")
+            page_ads_number = self.post_body["additional"].pop("page_ads_number")
         except KeyError as error:
             LOGGER.error(error.args)
             raise ServiceHandlerError(error.args) from error
 
+        ids = []
+        start = page * page_ads_number
+        for index, page_start, page_stop in page_slices(start, start + page_ads_number, DOMRIA_SEARCH_PAGE_SIZE):
+            # search pages of DomRia are numbered from 1
+            items = self.search_page(url, dict(params, page=index + 1))
+            ids.extend(items[page_start:page_stop])
+            if len(items) < DOMRIA_SEARCH_PAGE_SIZE:
+                break
+        return self.create_records(ids, self.metadata)
+
+    def search_page(self, url: str, params: Dict) -> List[int]:
+        """
+        Ids of ads on search page, cached by params without token
+        """
+        def load():
+            token = {self.metadata["token_name"]: DomriaLimitationSystem.get_token()}
+            response = send_request("GET", url=url, params=dict(params, **token), headers={'User-Agent': 'Mozilla/5.0'},
+                                    service=self.metadata["name"])
+            if response.status_code != 200:
+                raise ServiceHandlerError("Invalid url")
+            try:
+                return response.json()["items"]
+            except KeyError as error:
+                LOGGER.error(error.args)
+                raise ServiceHandlerError(error.args) from error
+
+        return cached_page(page_key(url, params), load)
+
     @staticmethod
     def create_records(ids: List, service_metadata: Dict) -> List[Dict]:
         """
-        Creates records in the database on the ID list
+        Creates records in the database on the ID list.
+        Converted ads are cached, only ads that aren't cached are requested
+        :raises ResponseNotOkException: if ads were found but responses for all of them failed
         """
+        cached = get_cached_ads(service_metadata["name"], ids)
+        if not (missing := [ad_id for ad_id in ids if ad_id not in cached]):
+            return [cached[ad_id] for ad_id in ids]
         params = {"api_key": DomriaLimitationSystem.get_token()}
         for param, val in service_metadata["optional"].items():
             params[param] = val
@@ -66,11 +95,14 @@ class DomriaServiceHandler(AbstractServiceHandler):
             single_ad=service_metadata["urls"]["single_ad"]["url_prefix"],
             condition=service_metadata["urls"]["single_ad"]["condition"]
         )
-        realty_realty_details = []
-        responses_container = get_all_responses(url, params, ids)
-        for response in responses_container:
+        # ads by id, so cached and requested ones keep the order of search results
+        by_id = dict(cached)
+        responses_container = get_all_responses(url, params, missing, service_metadata["name"])
+        failed = 0
+        for ad_id, response in zip(missing, responses_container):
             if not response.ok:
                 LOGGER.error("Response from Domria not ok: %s", response.content)
+                failed += 1
                 continue
             service_converter = DomRiaOutputConverter(response.json(), service_metadata)
 
@@ -91,15 +123,9 @@ class DomriaServiceHandler(AbstractServiceHandler):
             except ObjectNotFoundException as error:
                 LOGGER.error("Traceback: %s", error.__traceback__)
                 continue
-            realty_realty_details.append((realty_data, realty_details))
-        return realty_realty_details
-
-    def process_request(self, search_response: Dict, page: int, page_ads_number: int, metadata: Dict) -> List[Dict]:
-        """
-        Distributes a list of ids to write to the database and return to the user
-        """
-        page = page % page_ads_number
-        current_items = search_response["items"][
-            (page + 1) * page_ads_number - page_ads_number: (page + 1) * page_ads_number
-        ]
-        return self.create_records(current_items, metadata)
+            by_id[ad_id] = (realty_data, realty_details)
+            cache_ad(service_metadata["name"], ad_id, (realty_data, realty_details))
+        if failed == len(missing) and not by_id:
+            # service failed, it isn't an empty result for filters
+            raise ResponseNotOkException(f"All {failed} ads requests to Domria failed")
+        return [by_id[ad_id] for ad_id in ids if ad_id in by_id]
@@ -5,9 +5,11 @@ Domria limitation system
 
 from datetime import datetime, timedelta
 from hashlib import sha256
+from typing import Dict
 from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
 
 from marshmallow.exceptions import ValidationError
+from sqlalchemy import func
 from service_api import LOGGER, Session_factory
 
 from ...constants import DOMRIA_TOKENS_LIST
@@ -56,7 +58,7 @@ class DomriaLimitationSystem:
         """
         Returns token or raise LimitBoundError
         """
-        for token in range(2):
+        for token in range(len(cls.TOKENS)):
             token = cls.TOKENS[0]
             session = Session_factory()
             hashed_token = sha256(token.encode("utf-8")).hexdigest()
@@ -71,3 +73,19 @@ class DomriaLimitationSystem:
             cls.TOKENS.append(cls.TOKENS.pop(0))
 
         raise LimitBoundError("DOMRIA limit reached! Try later!")
+
+    @classmethod
+    def get_remaining_requests(cls) -> Dict[str, int]:
+        """
+        Returns number of requests left during the last hour for every token
+        :return: Dict[str, int] - hashed token: number of requests left
+        """
+        hashed_tokens = [sha256(token.encode("utf-8")).hexdigest() for token in cls.TOKENS]
+        session = Session_factory()
+        used_requests = dict(session.query(RequestsHistory.hashed_token, func.count(RequestsHistory.id)).where(
+            RequestsHistory.hashed_token.in_(hashed_tokens),
+            RequestsHistory.request_timestamp.between(datetime.now() - timedelta(**cls.EXPIRE_TIME), datetime.now())
+        ).group_by(RequestsHistory.hashed_token).all())
+        session.close()
+        return {hashed_token: max(cls.TOKEN_LIMIT - used_requests.get(hashed_token, 0), 0)
+                for hashed_token in hashed_tokens}
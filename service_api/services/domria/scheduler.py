@@ -0,0 +1,91 @@
+"""
+Scheduler of DomRia requests budget
+"""
+import math
+import time
+
+from service_api import CACHE, LOGGER
+
+from ...constants import (DOMRIA_BUDGET_WINDOW_PREFIX, DOMRIA_BUDGET_WINDOW_SECONDS, DOMRIA_INTERACTIVE_BUDGET_SHARE,
+                           DOMRIA_SEARCH_PAGE_SIZE)
+from ..page_cache import page_slices
+from .limitation import DomriaLimitationSystem
+
+
+class DomriaBudgetScheduler:
+    """
+    Distributes hourly budget of all DomRia tokens between interactive requests and background crawls.
+
+    Interactive work (/grabbing/latest) can spend the whole remaining budget.
+    Background work can't touch the part reserved for interactive requests
+    and is paced by windows, so its share of the hourly budget is spread evenly over the hour
+    """
+    INTERACTIVE = "interactive"
+    BACKGROUND = "background"
+
+    @classmethod
+    def hourly_budget(cls) -> int:
+        """
+        Number of requests all tokens can make per hour
+        """
+        return DomriaLimitationSystem.TOKEN_LIMIT * len(DomriaLimitationSystem.TOKENS)
+
+    @classmethod
+    def reserved_budget(cls, priority: str) -> int:
+        """
+        Number of requests that can't be used by work with given priority
+        """
+        if priority == cls.INTERACTIVE:
+            return 0
+        return math.ceil(cls.hourly_budget() * DOMRIA_INTERACTIVE_BUDGET_SHARE)
+
+    @classmethod
+    def window_budget(cls) -> int:
+        """
+        Number of requests background work can spend during one window
+        """
+        background_budget = cls.hourly_budget() - cls.reserved_budget(cls.BACKGROUND)
+        return max(int(background_budget * DOMRIA_BUDGET_WINDOW_SECONDS / 3600), 1)
+
+    @classmethod
+    def acquire(cls, cost: int, priority: str = BACKGROUND) -> bool:
+        """
+        Check if work with given priority can spend `cost` requests now
+        :param cost: int - expected number of requests to DomRia
+        :param priority: str - INTERACTIVE or BACKGROUND
+        :return: bool - True if budget is acquired
+        """
+        remaining = sum(DomriaLimitationSystem.get_remaining_requests().values())
+        if remaining - cost < cls.reserved_budget(priority):
+            LOGGER.debug("DomRia budget for %s work is exhausted. Remaining requests: %s", priority, remaining)
+            return False
+        if priority == cls.INTERACTIVE:
+            return True
+
+        window_key = f"{DOMRIA_BUDGET_WINDOW_PREFIX}:{int(time.time() // DOMRIA_BUDGET_WINDOW_SECONDS)}"
+        spent = CACHE.incrby(window_key, cost)
+        CACHE.expire(window_key, DOMRIA_BUDGET_WINDOW_SECONDS * 2)
+        if spent > cls.window_budget():
+            CACHE.decrby(window_key, cost)
+            return False
+        return True
+
+    @staticmethod
+    def page_cost(page: int, page_ads_number: int) -> int:
+        """
+        Number of requests DomriaServiceHandler sends for a page of results at most:
+        search requests for every search page it covers and a request for every ad.
+        Cached search pages and ads are charged as well, so budget isn't overshot
+        :param page: int - page of results
+        :param page_ads_number: int - number of ads DomRia is asked for
+        """
+        start = page * page_ads_number
+        search_pages = len(list(page_slices(start, start + page_ads_number, DOMRIA_SEARCH_PAGE_SIZE)))
+        return search_pages + page_ads_number
+
+    @classmethod
+    def get_delay(cls) -> int:
+        """
+        Seconds till the next budget window
+        """
+        return math.ceil(DOMRIA_BUDGET_WINDOW_SECONDS - time.time() % DOMRIA_BUDGET_WINDOW_SECONDS)
@@ -2,7 +2,7 @@
 Module with abstract interfaces for classes need to communicate with services
 """
 from abc import ABC, abstractmethod
-from typing import Dict
+from typing import Dict, Iterator
 from ..exceptions import BadFiltersException
 
 class AbstractServiceHandler(ABC):
@@ -23,6 +23,13 @@ class AbstractServiceHandler(ABC):
         Method that realise the logic of sending request to particular service and getting items
         """
 
+    def iter_latest_data(self) -> Iterator:
+        """
+        Lazy version of get_latest_data.
+        Handlers that can produce items one by one should override it
+        """
+        yield from self.get_latest_data()
+
 class AbstractInputConverter(ABC):
     """
     Abstract class for input converters
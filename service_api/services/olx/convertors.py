@@ -4,21 +4,26 @@ Olx convertors
 
 import datetime
 import json
-import re
-import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from functools import reduce
 from typing import Dict, List
-from urllib.error import HTTPError
 from urllib.parse import urljoin
 
 from bs4 import BeautifulSoup
+from requests.exceptions import HTTPError
 from sqlalchemy.orm import make_transient
 
 from service_api import models, session_scope
+from ...constants import OLX_LISTING_MAX_WORKERS
 from ...exceptions import ObjectNotFoundException
 from ...utils import recognize_by_alias
+from ...utils.http_client import get_http_session
 from ...utils.selenium import init_driver
+from ..resilience import ServicePolicy
 from ..interfaces import AbstractOutputConverter
+from ..page_cache import cached_ad, cached_page, page_key
+from .parser_spec import (DAY_PATTERN, LISTING_AD, LISTING_STRAINER, NEXT_PAGE_LINK, SQUARE_PATTERN, STATE_PATTERN,
+                          TIME_PATTERN, YEAR_PATTERN, get_parser_spec)
 
 
 class OLXOutputConverter(AbstractOutputConverter):
@@ -117,6 +122,17 @@ class OLXOutputConverter(AbstractOutputConverter):
         return url
 
 
+def listing_page_url(link: str, page: int) -> str:
+    """
+    Url of listing page by OLX pagination scheme, the first page is the link itself
+    :param link: link to OLX advertisements with certain filters
+    :param page: number of listing page from 1
+    """
+    if page <= 1:
+        return link
+    return f"{link}{'&' if '?' in link else '?'}page={page}"
+
+
 class OlxParser:
     """
     A class for parsing a single OLX ad
@@ -125,7 +141,8 @@ class OlxParser:
     def __init__(self, service_metadata):
 
         self.service_metadata = service_metadata
-        self.parser_metadata = service_metadata["urls"]["single_ad"]["parser"]
+        self.spec = get_parser_spec(service_metadata["name"])
+        self.policy = ServicePolicy.for_service(service_metadata["name"])
 
     def make_data(self, response: dict):
         """
@@ -179,6 +196,13 @@ class OlxParser:
         return realty_data, realty_details_data
 
     def main_logic(self, link: str):
+        """
+        :param link: a link to a single OLX page with a realty ad
+        :return: realty and realty_details data of the ad, parsed ads are cached by link
+        """
+        return cached_ad(self.service_metadata["name"], link, lambda: self.parse_ad(link))
+
+    def parse_ad(self, link: str):
         """
         :param link: a link to a single OLX page with a realty ad
         :return: calls make_data() in return
@@ -186,64 +210,50 @@ class OlxParser:
         driver = init_driver(link)
 
         try:
-            html = urllib.request.urlopen(link)
+            response = self.policy.call(lambda: get_http_session().get(link), hedge=True)
+            response.raise_for_status()
+            html = response.content
         except HTTPError as error:
             raise Warning(
                 "The requested page is no longer available!") from error
 
-        soup = BeautifulSoup(html, "html.parser")
+        location = driver.find_element_by_class_name(self.spec.location_class).text
+        result = self.parse_page(html, location)
+        result["price"] = self.price_converter(result["price"])
+        result["original_url"] = link
+        return self.make_data(result)
+
+    def parse_page(self, html: bytes, location: str) -> Dict:
+        """
+        Parse ad page with compiled parser specification
+        :param html: html of OLX ad page
+        :param location: text of location block rendered by browser
+        :return: ad data, price is a tuple of price and currency sign
+        """
+        soup = BeautifulSoup(html, "html.parser", parse_only=self.spec.strainer)
         result = {}
 
         tags = []
-        for tag in soup.find("ul", attrs={"class": self.parser_metadata["tags"]["class"]}):
+        for tag in self.spec.tags.find(soup):
             if tag.contents:
                 tags.append(tag.contents[0].string)
 
         result.update(self.tag_converter(tags))
-
-        price_string = soup.find(self.parser_metadata["price"]["html_tag"],
-                                 attrs={"class": self.parser_metadata["price"]["class"]})
-
-        price = self.price_divider(price_string)
-
-        result["price"] = self.price_converter(price)
-
-        published_at = soup.find(self.parser_metadata["published_at"]["html_tag"],
-                                 attrs={"class": self.parser_metadata["published_at"]["class"]})
-        result["published_at"] = self.date_converter(published_at.string)
-
-        location = driver.find_element_by_class_name(
-            self.parser_metadata["location"]["class"]).text
-        result["city_id"], result["state_id"] = self.location_converter(
-            location)
-
-        operation_type = soup.findAll(self.parser_metadata["operation_type"]["html_tag"],
-                                      attrs={"class": self.parser_metadata["operation_type"]["class"]})
-        result["operation_type_id"] = self.operation_type_converter(
-            operation_type)
-
-        result["original_url"] = link
-
-        original_id = soup.find(self.parser_metadata["original_id"]["html_tag"],
-                                attrs={"class": self.parser_metadata["original_id"]["class"]})
-        result["original_id"] = int(original_id.text[4:])
-
-        return self.make_data(result)
+        result["price"] = self.price_divider(self.spec.price.find(soup))
+        result["published_at"] = self.date_converter(self.spec.published_at.find(soup).string)
+        result["city_id"], result["state_id"] = self.location_converter(location)
+        result["operation_type_id"] = self.operation_type_converter(self.spec.operation_type.find_all(soup))
+        result["original_id"] = int(self.spec.original_id.find(soup).text[4:])
+        return result
 
     def price_divider(self, data):
         """
         :param data: an HTML row which contains the price and the currency sign ($, € or грн.)
+                     separated by html comments
         :return: divided float price and a currency sign as str
         """
-        data = str(data)
-
-        price = re.search(">(.*?)<!--", data)
-        price = price.group(1).replace(" ", "")
-
-        currency = re.search("<!-- -->(.*?)</h3>", data)
-        currency = str(currency.group(1))[9:]
-
-        return float(price), currency
+        strings = list(data.strings)
+        return float(strings[0].replace(" ", "")), strings[-1].strip()
 
     def price_converter(self, price):
         """
@@ -254,9 +264,9 @@ class OlxParser:
         if price[1] == "$":
             return price[0]
 
-        with urllib.request.urlopen("https://bank.gov.ua/NBUStatService/v1/statdirectory/exchange?&json") as url:
+        with get_http_session().get("https://bank.gov.ua/NBUStatService/v1/statdirectory/exchange?&json") as url:
 
-            data = json.loads(url.read().decode())
+            data = json.loads(url.content.decode())
             usd = next(x for x in data if x["cc"] == "USD")
             usd_currency = round(usd["rate"], 2)
 
@@ -284,17 +294,16 @@ class OlxParser:
         """
         if date.startswith("Сьогодні"):
             day = datetime.date.today()
-            time = re.search(r"\d\d:\d\d", date).group()
+            time = TIME_PATTERN.search(date).group()
 
             result = day.strftime("%Y-%m-%d") + f" {time}:00"
             return result
 
-        year = re.search(r"\d{4}", str(date)).group()
-        month = re.search("|".join(
-            self.parser_metadata["published_at"]["months"].keys()), str(date)).group()
-        day = re.search(r"\d{2}", str(date)).group()
+        year = YEAR_PATTERN.search(date).group()
+        month = self.spec.month_pattern.search(date).group()
+        day = DAY_PATTERN.search(date).group()
 
-        result_date = f"{year}-{self.parser_metadata['published_at']['months'][month]}-{day} 00:00:00"
+        result_date = f"{year}-{self.spec.months[month]}-{day} 00:00:00"
         return result_date
 
     def tag_converter(self, tags):
@@ -308,22 +317,22 @@ class OlxParser:
         for tag in tags:
             tag = str(tag)
 
-            if tag.startswith(self.parser_metadata["tags"]["floor"]):
+            if tag.startswith(self.spec.floor_prefix):
                 position = tag.find(":")
                 result["floor"] = int(float(tag[position + 2:]))
 
-            elif tag.startswith(self.parser_metadata["tags"]["floors_number"]):
+            elif tag.startswith(self.spec.floors_number_prefix):
                 position = tag.find(":")
                 result["floors_number"] = int(float(tag[position + 2:]))
 
-            elif tag.startswith(self.parser_metadata["tags"]["square"]):
-                square = re.search(": (.*?) м", tag).group(1)
+            elif tag.startswith(self.spec.square_prefix):
+                square = SQUARE_PATTERN.search(tag).group(1)
                 result["square"] = float(square)
 
-            elif re.search("|".join(self.parser_metadata["tags"]["realty_type"]), tag) and not realty_details_fetched:
+            elif self.spec.realty_type_pattern.search(tag) and not realty_details_fetched:
                 position = tag.find(":")
 
-                if tag.startswith(self.parser_metadata["tags"]["realty_type"][0]):
+                if tag.startswith(self.spec.realty_type_prefix):
                     result["realty_type_id"] = tag[position + 2:]
                     realty_details_fetched = True
                 result["realty_type_id"] = tag[position + 2:]
@@ -341,7 +350,7 @@ class OlxParser:
         city_with_district = location[:location.find("\n") - 1]
         city = city_with_district.split(",")
 
-        state = re.search("(.*?) область", location)
+        state = STATE_PATTERN.search(location)
 
         return city[0], state.group(1)
 
@@ -351,32 +360,50 @@ class OlxParser:
         :return: a string with a matching operation type
         """
         for element in [operation_type[2], operation_type[3]]:
-            if res_operation_type := re.search("|".join(self.parser_metadata["operation_type"]["types"]), str(element)):
+            if res_operation_type := self.spec.operation_type_pattern.search(element.get_text()):
                 return res_operation_type.group()
 
         return None
 
     def get_ads_urls(self, link: str, page_number: int, number_of_ads: int) -> List[str]:
         """
-        Function to get all ads urls from OLX according to number of ads
+        Function to get all ads urls from OLX according to number of ads.
+        Urls of listing pages are made with OLX pagination scheme, every page except the last one
+        has as many ads as the first one, so only pages with needed ads are requested, concurrently
         :param link: link to OLX advertisements with certain filters
         :param page_number: needed to get ads to this page
         :param number_of_ads: returned number of advertisements
         :return: List[str]
         """
-        ads, next_page = self.find_all_ads_on_the_page(link)
-        gen_num = (page_number + 1) * number_of_ads
-        num = gen_num - len(ads)
-        while next_page and num > 0:
-            more_ads, next_page = self.find_all_ads_on_the_page(next_page)
-            num -= len(more_ads)
-            if num < 0:
-                ads.extend(more_ads[:num])
-            else:
-                ads.extend(more_ads)
-        all_loaded_ads = ads if num >= 0 else ads[:gen_num]
-        partial = page_number * number_of_ads
-        return all_loaded_ads[partial:]
+        start, stop = page_number * number_of_ads, (page_number + 1) * number_of_ads
+        if stop <= start:
+            return []
+        ads, next_page = self.listing_page(link)
+        if stop <= len(ads) or not next_page or not ads:
+            return ads[start:stop]
+
+        page_size = len(ads)
+        first, last = start // page_size, (stop - 1) // page_size
+        with ThreadPoolExecutor(max_workers=min(OLX_LISTING_MAX_WORKERS, last - max(first, 1) + 1)) as executor:
+            pages = {index: executor.submit(self.listing_page, listing_page_url(link, index + 1))
+                     for index in range(max(first, 1), last + 1)}
+            # results are taken in order while pages have the next one,
+            # so errors of pages after the last one are ignored
+            needed_ads = ads if first == 0 else []
+            for index in range(max(first, 1), last + 1):
+                more_ads, next_page = pages[index].result()
+                needed_ads.extend(more_ads)
+                if not next_page or not more_ads:
+                    break
+            for page in pages.values():
+                page.cancel()
+        return needed_ads[start - first * page_size:stop - first * page_size]
+
+    def listing_page(self, link: str):
+        """
+        Ads urls and the next page link of listing page, cached by link
+        """
+        return cached_page(page_key(link), lambda: self.find_all_ads_on_the_page(link))
 
     def find_all_ads_on_the_page(self, link: str):
         """
@@ -384,16 +411,21 @@ class OlxParser:
         :param link: link to OLX ads
         :return: all founded advertisement urls plus link to the next page if one exists
         """
-        with urllib.request.urlopen(link) as html:
-            soup = BeautifulSoup(html, "html.parser")
+        with self.policy.call(lambda: get_http_session().get(link)) as html:
+            html.raise_for_status()
+            return self.parse_listing(html.content)
 
-            if a_tags := soup.find_all("a", {"data-cy": "listing-ad-title"}):
-                advertisement_urls = [tag_a['href'] for tag_a in a_tags]
-            else:
-                advertisement_urls = []
-
-            if next_page := soup.find("a", {"data-cy": "page-link-next"}):
-                contains_next_page_link = next_page["href"]
-            else:
-                contains_next_page_link = None
-            return advertisement_urls, contains_next_page_link
+    @staticmethod
+    def parse_listing(html: bytes):
+        """
+        :param html: html of OLX listing page
+        :return: all founded advertisement urls plus link to the next page if one exists
+        """
+        soup = BeautifulSoup(html, "html.parser", parse_only=LISTING_STRAINER)
+        advertisement_urls = [tag_a["href"] for tag_a in LISTING_AD.find_all(soup)]
+
+        if next_page := NEXT_PAGE_LINK.find(soup):
+            contains_next_page_link = next_page["href"]
+        else:
+            contains_next_page_link = None
+        return advertisement_urls, contains_next_page_link
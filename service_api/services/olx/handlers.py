@@ -1,6 +1,8 @@
 """
 Olx handler module
 """
+from typing import Iterator
+
 from ..interfaces import AbstractServiceHandler
 from .convertors import OLXOutputConverter, OlxParser
 
@@ -15,11 +17,15 @@ class OlxServiceHandler(AbstractServiceHandler):
         Method that realise the logic of sending request to OLX and getting items
         :return: List[Dict]
         """
+        return list(self.iter_latest_data())
+
+    def iter_latest_data(self) -> Iterator:
+        """
+        Parse OLX ads one by one
+        """
         url = OLXOutputConverter(self.post_body, self.metadata).make_url()
         olx_parser = OlxParser(self.metadata)
         parsed_links = olx_parser.get_ads_urls(url, self.post_body["additional"]["page"],
                                                self.post_body["additional"]["page_ads_number"])
-        records = []
         for link in parsed_links:
-            records.append(olx_parser.main_logic(link))
-        return records
+            yield olx_parser.main_logic(link)
@@ -0,0 +1,105 @@
+"""
+Compiled specification of OLX ad pages. Selectors, regular expressions and lookup tables
+are built from parser metadata once per process, so parsing of ads doesn't compile patterns.
+Only elements found by selectors are built from ad page html, the rest of page is skipped by strainer
+"""
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Pattern
+
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+
+from ...constants import PATH_TO_PARSER_METADATA
+from ...utils import open_metadata
+
+YEAR_PATTERN = re.compile(r"\d{4}")
+DAY_PATTERN = re.compile(r"\d{2}")
+TIME_PATTERN = re.compile(r"\d\d:\d\d")
+SQUARE_PATTERN = re.compile(": (.*?) м")
+STATE_PATTERN = re.compile("(.*?) область")
+
+
+class Selector(NamedTuple):
+    """
+    Html tag with attributes to find on page
+    """
+    tag: str
+    attrs: Dict[str, str]
+
+    def find(self, soup: BeautifulSoup) -> Optional[Tag]:
+        """
+        The first matching element
+        """
+        return soup.find(self.tag, attrs=self.attrs)
+
+    def find_all(self, soup: BeautifulSoup) -> list:
+        """
+        All matching elements
+        """
+        return soup.find_all(self.tag, attrs=self.attrs)
+
+
+# links on listing pages
+LISTING_AD = Selector("a", {"data-cy": "listing-ad-title"})
+NEXT_PAGE_LINK = Selector("a", {"data-cy": "page-link-next"})
+LISTING_STRAINER = SoupStrainer("a", attrs={"data-cy": [LISTING_AD.attrs["data-cy"], NEXT_PAGE_LINK.attrs["data-cy"]]})
+
+
+def alternation(words: Iterable[str]) -> Pattern:
+    """
+    Pattern that matches any of words
+    """
+    return re.compile("|".join(map(re.escape, words)))
+
+
+class OlxParserSpec:
+    """
+    Compiled "parser" part of OLX single ad metadata
+
+    :param parser_metadata: Dict - parser metadata of single ad
+    """
+
+    def __init__(self, parser_metadata: Dict) -> None:
+        tags, published_at = parser_metadata["tags"], parser_metadata["published_at"]
+        operation_type = parser_metadata["operation_type"]
+
+        self.tags = Selector("ul", {"class": tags["class"]})
+        self.floor_prefix = tags["floor"]
+        self.floors_number_prefix = tags["floors_number"]
+        self.square_prefix = tags["square"]
+        self.realty_type_prefix = tags["realty_type"][0]
+        self.realty_type_pattern = alternation(tags["realty_type"])
+
+        self.price = Selector(parser_metadata["price"]["html_tag"], {"class": parser_metadata["price"]["class"]})
+        self.published_at = Selector(published_at["html_tag"], {"class": published_at["class"]})
+        self.months: Dict[str, str] = dict(published_at["months"])
+        self.month_pattern = alternation(self.months)
+        self.location_class = parser_metadata["location"]["class"]
+        self.operation_type = Selector(operation_type["html_tag"], {"class": operation_type["class"]})
+        self.operation_type_pattern = alternation(operation_type["types"])
+        self.original_id = Selector(parser_metadata["original_id"]["html_tag"],
+                                    {"class": parser_metadata["original_id"]["class"]})
+
+        # classes of selectors by tag, element has to have all classes of one of them
+        self.ad_elements: Dict[str, List[FrozenSet[str]]] = {}
+        for selector in (self.tags, self.price, self.published_at, self.operation_type, self.original_id):
+            self.ad_elements.setdefault(selector.tag, []).append(frozenset(selector.attrs["class"].split()))
+        self.strainer = SoupStrainer(self.is_ad_element)
+
+    def is_ad_element(self, name: str, attrs: Dict) -> bool:
+        """
+        Check if element of page is found by one of selectors, its children are kept as well.
+        Element can have other classes besides classes of selector
+        """
+        classes = attrs.get("class") or ()
+        if isinstance(classes, str):
+            classes = classes.split()
+        return any(selector_classes.issubset(classes) for selector_classes in self.ad_elements.get(name, ()))
+
+
+@lru_cache(maxsize=None)
+def get_parser_spec(service: str) -> OlxParserSpec:
+    """
+    Compiled parser specification of service from parser metadata. Built once per process
+    """
+    return OlxParserSpec(open_metadata(PATH_TO_PARSER_METADATA)[service]["urls"]["single_ad"]["parser"])
@@ -0,0 +1,82 @@
+"""
+Caching of scrapes by pages of services (DomRia search pages, OLX listing pages) and by single ads.
+Client pages of any size and offset are assembled from cached pages, so browsing one search
+sends about one request for every underlying page and one for every ad
+"""
+import datetime
+import json
+from hashlib import sha256
+from typing import Any, Callable, Dict, Iterable, Iterator, Tuple
+
+import service_api
+from ..constants import (PAGE_BLOCK_EXPIRE_TIME, PAGE_BLOCK_PREFIX, SCRAPED_AD_EXPIRE_TIME, SCRAPED_AD_PREFIX)
+from ..metrics import CACHE_REQUESTS
+
+
+def page_key(url: str, params: Dict = None) -> str:
+    """
+    Redis key of service page by its url and query params
+    """
+    request = f"{url}?{json.dumps(params or {}, sort_keys=True)}"
+    return f"{PAGE_BLOCK_PREFIX}:{sha256(request.encode('utf-8')).hexdigest()}"
+
+
+def cached_page(key: str, load: Callable[[], Any]) -> Any:
+    """
+    Page of service from cache, loaded and cached on miss.
+    Page must be json serializable, tuples are returned as lists
+    """
+    if (cached := service_api.CACHE.get(key)) is not None:
+        CACHE_REQUESTS.labels(PAGE_BLOCK_PREFIX, "hit").inc()
+        return json.loads(cached)
+    CACHE_REQUESTS.labels(PAGE_BLOCK_PREFIX, "miss").inc()
+    page = load()
+    service_api.CACHE.set(key, json.dumps(page), datetime.timedelta(**PAGE_BLOCK_EXPIRE_TIME))
+    return page
+
+
+def page_slices(start: int, stop: int, page_size: int) -> Iterator[Tuple[int, int, int]]:
+    """
+    Service pages of fixed size that cover results from start to stop
+    :return: Iterator[Tuple[int, int, int]] - index of page from 0, start and stop of results inside page
+    """
+    for index in range(start // page_size, (stop - 1) // page_size + 1 if stop > start else 0):
+        yield index, max(start - index * page_size, 0), min(stop - index * page_size, page_size)
+
+
+def ad_key(service: str, ad_id: Any) -> str:
+    """
+    Redis key of scraped ad of service
+    """
+    return f"{SCRAPED_AD_PREFIX}:{service}:{ad_id}"
+
+
+def get_cached_ads(service: str, ad_ids: Iterable) -> Dict[Any, Any]:
+    """
+    Scraped ads of service that are cached, by their ids
+    """
+    ad_ids = list(ad_ids)
+    if not ad_ids:
+        return {}
+    cached = service_api.CACHE.mget([ad_key(service, ad_id) for ad_id in ad_ids])
+    ads = {ad_id: json.loads(ad) for ad_id, ad in zip(ad_ids, cached) if ad is not None}
+    CACHE_REQUESTS.labels(SCRAPED_AD_PREFIX, "hit").inc(len(ads))
+    CACHE_REQUESTS.labels(SCRAPED_AD_PREFIX, "miss").inc(len(ad_ids) - len(ads))
+    return ads
+
+
+def cache_ad(service: str, ad_id: Any, ad: Any) -> None:
+    """
+    Remember scraped ad, ad must be json serializable
+    """
+    service_api.CACHE.set(ad_key(service, ad_id), json.dumps(ad), datetime.timedelta(**SCRAPED_AD_EXPIRE_TIME))
+
+
+def cached_ad(service: str, ad_id: Any, load: Callable[[], Any]) -> Any:
+    """
+    Scraped ad from cache, loaded and cached on miss
+    """
+    if (ad := get_cached_ads(service, [ad_id]).get(ad_id)) is None:
+        ad = load()
+        cache_ad(service, ad_id, ad)
+    return ad
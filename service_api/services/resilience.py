@@ -0,0 +1,173 @@
+"""
+Resilience of requests to services: bounded retries with backoff, circuit breaker
+shared by all processes through redis and hedged requests for slow single ad fetches
+"""
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional
+
+from redis.exceptions import RedisError
+from requests import Response
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
+
+import service_api
+from service_api import LOGGER, flask_app
+from ..constants import CIRCUIT_BREAKER_PREFIX, HEDGE_MAX_WORKERS, RETRY_STATUS_CODES
+from ..exceptions import CircuitOpenError
+from ..metrics import CIRCUIT_REJECTIONS, SERVICE_HEDGES, SERVICE_RETRIES
+
+# network errors after which request is retried
+RETRY_EXCEPTIONS = (RequestsConnectionError, Timeout)
+
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+_hedge_executor_lock = threading.Lock()
+
+
+def get_hedge_executor() -> ThreadPoolExecutor:
+    """
+    Threads of the process that send hedged requests
+    """
+    global _hedge_executor
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="hedge")
+        return _hedge_executor
+
+
+class CircuitBreaker:
+    """
+    Breaker of service shared through redis. Opens for open_seconds after failure_threshold failed
+    requests, then lets requests through again, one more failure opens it at once (half-open state).
+    If redis is not available breaker stays closed
+
+    :param service: str - name of service in metadata
+    :param failure_threshold: int - failures in a row that open breaker
+    :param open_seconds: int - seconds requests are not sent after breaker is opened
+    """
+
+    def __init__(self, service: str, failure_threshold: int, open_seconds: int) -> None:
+        self.service = service
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.open_key = f"{CIRCUIT_BREAKER_PREFIX}:{service}:open"
+        self.failures_key = f"{CIRCUIT_BREAKER_PREFIX}:{service}:failures"
+
+    def is_open(self) -> bool:
+        """
+        Check if requests to service must not be sent
+        """
+        try:
+            return bool(service_api.CACHE.exists(self.open_key))
+        except RedisError as error:
+            LOGGER.warning("Circuit breaker of %s is not available: %s", self.service, error)
+            return False
+
+    def record_success(self) -> None:
+        """
+        Close breaker after successful request
+        """
+        try:
+            service_api.CACHE.delete(self.failures_key)
+        except RedisError as error:
+            LOGGER.warning("Circuit breaker of %s is not available: %s", self.service, error)
+
+    def record_failure(self) -> None:
+        """
+        Count failed request and open breaker if there are too many failures in a row
+        """
+        try:
+            with service_api.CACHE.pipeline() as pipe:
+                failures, _ = pipe.incr(self.failures_key).expire(self.failures_key, 2 * self.open_seconds).execute()
+                if failures >= self.failure_threshold:
+                    pipe.set(self.open_key, 1, ex=self.open_seconds)
+                    # the first failure after breaker is closed again opens it
+                    pipe.set(self.failures_key, self.failure_threshold - 1, ex=2 * self.open_seconds)
+                    pipe.execute()
+                    LOGGER.warning("Circuit breaker of %s is open for %s s after %s failures", self.service,
+                                   self.open_seconds, failures)
+        except RedisError as error:
+            LOGGER.warning("Circuit breaker of %s is not available: %s", self.service, error)
+
+
+class ServicePolicy:
+    """
+    Retries, circuit breaker and hedging of requests to one service
+
+    :param service: str - name of service in metadata
+    :param retries: int - retries after failed request, failed are network errors and RETRY_STATUS_CODES
+    :param retry_failed_responses: bool - retry responses with RETRY_STATUS_CODES, network errors are retried anyway
+    :param backoff: float - seconds before the first retry, doubled for every next one, with jitter
+    :param failure_threshold: int - failures in a row that open circuit breaker
+    :param open_seconds: int - seconds breaker stays open
+    :param hedge_after: float - seconds after which second request is sent if the first one didn't respond,
+                                None disables hedging
+    """
+
+    def __init__(self, service: str, retries: int = 2, retry_failed_responses: bool = True, backoff: float = 0.5,
+                 failure_threshold: int = 5, open_seconds: int = 30, hedge_after: float = None) -> None:
+        self.service = service
+        self.retries = retries
+        self.retry_failed_responses = retry_failed_responses
+        self.backoff = backoff
+        self.hedge_after = hedge_after
+        self.breaker = CircuitBreaker(service, failure_threshold, open_seconds)
+
+    @classmethod
+    def for_service(cls, service: str) -> "ServicePolicy":
+        """
+        Policy of service with settings from SERVICE_POLICIES config
+        """
+        settings: Dict = flask_app.config.get("SERVICE_POLICIES", {}).get(service, {})
+        return cls(service, **settings)
+
+    def call(self, request: Callable[[], Response], hedge: bool = False) -> Response:
+        """
+        Send request with retries. Response of the last attempt is returned even if its status is failed,
+        so callers handle it as before
+
+        :param request: Callable - sends request and returns response, called for every attempt
+        :param hedge: bool - request fetches single ad and can be hedged
+        :raises CircuitOpenError: if breaker of service is open
+        :raises RequestException: network error of the last attempt
+        """
+        if self.breaker.is_open():
+            CIRCUIT_REJECTIONS.labels(self.service).inc()
+            raise CircuitOpenError(f"{self.service} is unavailable, requests are paused by circuit breaker")
+        attempt = 0
+        while True:
+            try:
+                response = self.hedged(request) if hedge and self.hedge_after is not None else request()
+            except RETRY_EXCEPTIONS:
+                if attempt >= self.retries:
+                    self.breaker.record_failure()
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    self.breaker.record_success()
+                    return response
+                if attempt >= self.retries or not self.retry_failed_responses:
+                    self.breaker.record_failure()
+                    return response
+            SERVICE_RETRIES.labels(self.service).inc()
+            time.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+            attempt += 1
+
+    def hedged(self, request: Callable[[], Response]) -> Response:
+        """
+        Send second request if the first one didn't respond in hedge_after seconds, the first response wins.
+        Request that lost keeps running in background
+        """
+        executor = get_hedge_executor()
+        first = executor.submit(request)
+        done, _ = wait([first], timeout=self.hedge_after)
+        if done:
+            return first.result()
+        SERVICE_HEDGES.labels(self.service).inc()
+        second = executor.submit(request)
+        done, pending = wait([first, second], return_when=FIRST_COMPLETED)
+        winner = done.pop()
+        if winner.exception() is not None and pending:
+            return pending.pop().result()
+        return winner.result()
@@ -0,0 +1,342 @@
+"""
+Lightweight request tracing in OpenTelemetry style.
+Spans are kept in context variable, context is propagated between services with
+W3C `traceparent` header (HTTP requests and celery task headers).
+Finished spans are passed to exporter set with TRACING_EXPORTER config or set_exporter
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, NamedTuple, Optional
+
+from flask import Flask, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from service_api import flask_app
+
+TRACEPARENT_HEADER = "traceparent"
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+# longer SQL statements are cut in span attributes
+MAX_STATEMENT_LENGTH = 500
+
+
+class SpanContext(NamedTuple):
+    """
+    Identifiers that are enough to continue trace in another process
+    """
+    trace_id: str
+    span_id: str
+
+
+class Span:
+    """
+    Timed operation of a trace
+    """
+
+    def __init__(self, name: str, parent: Optional[SpanContext] = None, attributes: Optional[Dict] = None) -> None:
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes or {}
+        self.error = None
+        self.start_time = time.time_ns()
+        self.end_time = None
+
+    @property
+    def context(self) -> SpanContext:
+        """
+        Context for child spans
+        """
+        return SpanContext(self.trace_id, self.span_id)
+
+    def set_attribute(self, key: str, value) -> None:
+        """
+        Add attribute to the span
+        """
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        """
+        Mark span as failed
+        """
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self) -> None:
+        """
+        Finish span and pass it to exporter
+        """
+        self.end_time = time.time_ns()
+        EXPORTER.export(self)
+
+    def to_dict(self) -> Dict:
+        """
+        Representation for exporters
+        """
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_ms": (self.end_time - self.start_time) / 10**6 if self.end_time else None,
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+
+class NoopSpan(Span):
+    """
+    Span that is returned when tracing is disabled. Does nothing
+    """
+
+    def __init__(self) -> None:  # pylint: disable=super-init-not-called
+        self.attributes = {}
+
+    def set_attribute(self, key: str, value) -> None:
+        """
+        Ignore attribute
+        """
+
+    def record_error(self, error: BaseException) -> None:
+        """
+        Ignore error
+        """
+
+    def end(self) -> None:
+        """
+        Nothing to finish
+        """
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class SpanExporter:
+    """
+    Base exporter. Subclass it to send spans to tracing backend
+    """
+
+    def export(self, span: Span) -> None:
+        """
+        Called for every finished span
+        """
+
+
+class NoopExporter(SpanExporter):
+    """
+    Exporter of disabled tracing
+    """
+
+
+class ConsoleExporter(SpanExporter):
+    """
+    Writes spans as json lines to stdout
+    """
+
+    def __init__(self, stream=None) -> None:
+        self.stream = stream or sys.stdout
+        self.lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        """
+        Write span as json line
+        """
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self.lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+class FileExporter(ConsoleExporter):
+    """
+    Appends spans as json lines to file for offline profiling
+    """
+
+    def __init__(self, path: str) -> None:
+        super().__init__(open(path, "a", encoding="utf-8"))  # pylint: disable=consider-using-with
+
+
+EXPORTER: SpanExporter = NoopExporter()
+_CURRENT_SPAN: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def set_exporter(exporter: SpanExporter) -> None:
+    """
+    Replace exporter of finished spans. NoopExporter disables tracing
+    """
+    global EXPORTER  # pylint: disable=global-statement
+    EXPORTER = exporter
+
+
+def make_exporter(name: str, path: str = None) -> SpanExporter:
+    """
+    Exporter by config name: noop, console or file
+    """
+    if name == "console":
+        return ConsoleExporter()
+    if name == "file":
+        return FileExporter(path)
+    if name == "noop":
+        return NoopExporter()
+    raise ValueError(f"Unknown tracing exporter {name}")
+
+
+def tracing_enabled() -> bool:
+    """
+    True if spans are exported anywhere
+    """
+    return not isinstance(EXPORTER, NoopExporter)
+
+
+def current_span() -> Optional[Span]:
+    """
+    Span of the current operation or None
+    """
+    return _CURRENT_SPAN.get()
+
+
+@contextmanager
+def start_span(name: str, parent: Optional[SpanContext] = None, **attributes) -> Iterator[Span]:
+    """
+    Run block in a new span. Span is a child of parent or of the current span,
+    otherwise a new trace is started
+    """
+    if not tracing_enabled():
+        yield NOOP_SPAN
+        return
+    if parent is None and (current := current_span()) is not None:
+        parent = current.context
+    span = Span(name, parent, attributes)
+    token = _CURRENT_SPAN.set(span)
+    try:
+        yield span
+    except BaseException as error:
+        span.record_error(error)
+        raise
+    finally:
+        _CURRENT_SPAN.reset(token)
+        span.end()
+
+
+def inject(headers: Optional[Dict] = None) -> Dict:
+    """
+    Add traceparent of the current span to headers
+    """
+    headers = {} if headers is None else headers
+    span = current_span()
+    if span is not None and tracing_enabled():
+        headers[TRACEPARENT_HEADER] = f"00-{span.trace_id}-{span.span_id}-01"
+    return headers
+
+
+def extract(traceparent: Optional[str]) -> Optional[SpanContext]:
+    """
+    Parent context from traceparent header value
+    """
+    match = TRACEPARENT_PATTERN.match(traceparent or "")
+    return SpanContext(*match.groups()) if match else None
+
+
+def register_flask_tracing(app: Flask) -> None:
+    """
+    Run every request in a span continuing trace from traceparent header
+    """
+    @app.before_request
+    def start_request_span():
+        if tracing_enabled():
+            g.trace_span = start_span(f"{request.method} {request.url_rule or request.path}",
+                                      parent=extract(request.headers.get(TRACEPARENT_HEADER)),
+                                      endpoint=request.endpoint)
+            g.trace_span.__enter__().set_attribute("http.method", request.method)
+
+    @app.after_request
+    def set_status_code(response):
+        if (span := current_span()) is not None:
+            span.set_attribute("http.status_code", response.status_code)
+        return response
+
+    @app.teardown_request
+    def end_request_span(error=None):
+        if (span := g.pop("trace_span", None)) is not None:
+            span.__exit__(type(error) if error else None, error, error.__traceback__ if error else None)
+
+
+def instrument_engine(db_engine: Engine) -> None:
+    """
+    Record every SQL statement executed inside a traced operation as a span
+    """
+    @event.listens_for(db_engine, "before_cursor_execute")
+    def start_query_span(conn, cursor, statement, parameters, context, executemany):
+        if (parent := current_span()) is not None and tracing_enabled():
+            conn.info.setdefault("trace_spans", []).append(
+                Span("db.query", parent.context, {"db.statement": statement[:MAX_STATEMENT_LENGTH]}))
+
+    @event.listens_for(db_engine, "after_cursor_execute")
+    def end_query_span(conn, cursor, statement, parameters, context, executemany):
+        if spans := conn.info.get("trace_spans"):
+            spans.pop().end()
+
+    @event.listens_for(db_engine, "handle_error")
+    def end_failed_query_span(exception_context):
+        connection = exception_context.connection
+        if connection is not None and (spans := connection.info.get("trace_spans")):
+            span = spans.pop()
+            span.record_error(exception_context.original_exception)
+            span.end()
+
+
+def inject_task_headers(headers=None, **kwargs):
+    """
+    Pass trace context to celery task in message headers
+    """
+    if headers is not None:
+        inject(headers)
+
+
+def start_task_span(task=None, **kwargs):
+    """
+    Run celery task in a span continuing trace of the caller
+    """
+    if tracing_enabled():
+        span = start_span(f"celery {task.name}", parent=extract(getattr(task.request, TRACEPARENT_HEADER, None)))
+        span.__enter__().set_attribute("celery.task_id", task.request.id)
+        task.request.trace_span = span
+
+
+def record_task_error(exception=None, **kwargs):
+    """
+    Mark span of failed celery task
+    """
+    if (span := current_span()) is not None and exception is not None:
+        span.record_error(exception)
+
+
+def end_task_span(task=None, **kwargs):
+    """
+    End span of finished celery task
+    """
+    if (span := getattr(task.request, "trace_span", None)) is not None:
+        task.request.trace_span = None
+        span.__exit__(None, None, None)
+
+
+def register_task_tracing() -> None:
+    """
+    Trace celery tasks and pass trace context to them. Called when celery app is created
+    """
+    from celery.signals import before_task_publish, task_failure, task_postrun, task_prerun
+    before_task_publish.connect(inject_task_headers)
+    task_prerun.connect(start_task_span)
+    task_failure.connect(record_task_error)
+    task_postrun.connect(end_task_span)
+
+
+set_exporter(make_exporter(flask_app.config.get("TRACING_EXPORTER", "noop"), flask_app.config.get("TRACING_FILE")))
+register_flask_tracing(flask_app)
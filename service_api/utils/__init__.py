@@ -12,10 +12,14 @@ from requests import Session
 from sqlalchemy.orm import make_transient
 from sqlalchemy import func
 
-from service_api import LOGGER, Base, session_scope
+from service_api import LOGGER, Base, flask_app, session_scope
+from .aggregates import add_to_market_aggregates, retire_from_market_aggregates
+from .http_client import get_http_session
+from ..constants import VERSION_DEFAULT_TIMESTAMP
 from ..exceptions import (MetaDataError, ModelNotFoundException, ObjectNotFoundException)
 from ..models import Realty, RealtyDetails
 from ..schemas import RealtyDetailsSchema, RealtySchema
+from ..tracing import start_span
 
 
 @singledispatch
@@ -78,6 +82,9 @@ def _(model_schema: RealtyDetailsSchema, data: Dict, model: RealtyDetails):
             del realty_record.id
 
             session.add(realty_record)
+            if realty_record.version is VERSION_DEFAULT_TIMESTAMP:
+                retire_from_market_aggregates(session, realty_record, realty_details)
+                add_to_market_aggregates(session, realty_record, realty_details_record)
 
         with session_scope() as session:
             session.query(Realty).filter_by(
@@ -102,12 +109,15 @@ def _(model_schema: RealtySchema, data: Dict, model: Realty):
     if realty is None:
         with session_scope() as session:
             session.add(realty_record)
+            add_to_market_aggregates(session, realty_record,
+                                     session.get(RealtyDetails, realty_record.realty_details_id))
     return realty or realty_record
 
 
 def open_metadata(path: str) -> Dict:
     """
-    Open file with metadata and return content
+    Open file with metadata and return content.
+    Base urls of services are replaced with ones from SERVICE_BASE_URLS config
     """
     try:
         with open(path, encoding="utf-8") as meta_file:
@@ -118,6 +128,9 @@ def open_metadata(path: str) -> Dict:
     except FileNotFoundError as error:
         LOGGER.error("Invalid metadata path, or metadata.json file does not exist")
         raise MetaDataError from error
+    for service_name, base_url in flask_app.config.get("SERVICE_BASE_URLS", {}).items():
+        if isinstance(metadata.get(service_name), dict):
+            metadata[service_name]["base_url"] = base_url
     return metadata
 
 
@@ -147,15 +160,27 @@ def recognize_by_alias(model: Base, alias: str, set_=None):
     return obj
 
 
-def send_request(method: str, url: str, request_session: Session = None, *args, **kwargs):
+def send_request(method: str, url: str, request_session: Session = None, *args, service: str = None,
+                 hedge: bool = False, **kwargs):
     """
-    Wrapper for sending requests
+    Wrapper for sending requests, shared session of the thread is used if session is not passed.
+    Requests to service are sent with its retries and circuit breaker (see ServicePolicy)
+
+    :param service: str - name of service in metadata
+    :param hedge: bool - request fetches single ad and can be hedged if service policy allows
     """
-    request_session = request_session or Session()
-    response = request_session.request(method, url, *args, **kwargs)
-    from ..services.limitation import LimitationSystem
-    LimitationSystem().mark_token_after_request(response.url)
-    return response
+    def request():
+        with start_span("scrape.request", method=method, url=url) as span:
+            response = (request_session or get_http_session()).request(method, url, *args, **kwargs)
+            span.set_attribute("http.status_code", response.status_code)
+        from ..services.limitation import LimitationSystem
+        LimitationSystem().mark_token_after_request(response.url)
+        return response
+
+    if service is None:
+        return request()
+    from ..services.resilience import ServicePolicy
+    return ServicePolicy.for_service(service).call(request, hedge=hedge)
 
 
 def chunkify(number, pieces):
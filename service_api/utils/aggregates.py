@@ -0,0 +1,107 @@
+"""
+Incremental maintenance of market aggregates.
+Every inserted or retired actual realty changes only one aggregate row,
+so reading statistics never requires scanning realties
+"""
+import datetime
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from service_api import LOGGER, session_scope
+from .sketch import QuantileSketch
+from ..constants import MARKET_AGGREGATE_DIMENSIONS, MARKET_AGGREGATE_QUANTILES, VERSION_DEFAULT_TIMESTAMP
+from ..models import MarketAggregate, Realty, RealtyDetails
+
+
+def aggregate_key(realty: Realty) -> Dict[str, int]:
+    """
+    Dimensions of aggregate the realty belongs to
+    """
+    return {dimension: getattr(realty, dimension) or 0 for dimension in MARKET_AGGREGATE_DIMENSIONS}
+
+
+def update_market_aggregate(session: Session, realty: Realty, realty_details: RealtyDetails, sign: int) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) realty from its aggregate.
+    Aggregate row is locked until the end of transaction, so concurrent loaders don't lose updates
+    """
+    key = aggregate_key(realty)
+    session.execute(insert(MarketAggregate).values(**key).on_conflict_do_nothing(index_elements=list(key)))
+    aggregate = session.query(MarketAggregate).filter_by(**key).with_for_update().one()
+
+    aggregate.count += sign
+    aggregate.price_sum += sign * realty_details.price
+    if realty_details.square:
+        price_per_square = realty_details.price / realty_details.square
+        aggregate.square_count += sign
+        aggregate.square_sum += sign * realty_details.square
+        aggregate.price_per_square_sum += sign * price_per_square
+        sketch = QuantileSketch(aggregate.price_per_square_sketch)
+        sketch.add(price_per_square, sign)
+        aggregate.price_per_square_sketch = sketch.to_dict()
+    aggregate.updated_at = datetime.datetime.now()
+
+
+def add_to_market_aggregates(session: Session, realty: Realty, realty_details: RealtyDetails) -> None:
+    """
+    Count newly inserted actual realty in market aggregates
+    """
+    if realty.version is VERSION_DEFAULT_TIMESTAMP and realty_details is not None:
+        update_market_aggregate(session, realty, realty_details, 1)
+
+
+def retire_from_market_aggregates(session: Session, realty: Realty, realty_details: RealtyDetails) -> None:
+    """
+    Remove realty that is no longer actual from market aggregates
+    """
+    if realty_details is not None:
+        update_market_aggregate(session, realty, realty_details, -1)
+
+
+def rebuild_market_aggregates() -> None:
+    """
+    Recalculate all aggregates from actual realties.
+    Needed once after the aggregates table is created
+    """
+    with session_scope() as session:
+        session.query(MarketAggregate).delete()
+        rows = session.query(Realty, RealtyDetails).join(RealtyDetails).filter(
+            Realty.version == VERSION_DEFAULT_TIMESTAMP).yield_per(1000)
+        for realty, realty_details in rows:
+            update_market_aggregate(session, realty, realty_details, 1)
+    LOGGER.info("Market aggregates rebuilt")
+
+
+def summarize(aggregates: Iterable[MarketAggregate]) -> Dict[str, Optional[float]]:
+    """
+    Merge aggregate rows into one summary with averages and price per square meter quantiles
+    """
+    count = price_sum = square_count = square_sum = price_per_square_sum = 0
+    sketch = QuantileSketch()
+    for aggregate in aggregates:
+        count += aggregate.count
+        price_sum += aggregate.price_sum
+        square_count += aggregate.square_count
+        square_sum += aggregate.square_sum
+        price_per_square_sum += aggregate.price_per_square_sum
+        sketch.merge(QuantileSketch(aggregate.price_per_square_sketch))
+
+    summary = {
+        "count": count,
+        "avg_price": price_sum / count if count else None,
+        "avg_square": square_sum / square_count if square_count else None,
+        "avg_price_per_square": price_per_square_sum / square_count if square_count else None
+    }
+    for quantile in MARKET_AGGREGATE_QUANTILES:
+        summary[f"price_per_square_p{round(quantile * 100)}"] = sketch.quantile(quantile)
+    return summary
+
+
+def get_market_aggregates(filters: Dict[str, int]) -> Dict[str, Optional[float]]:
+    """
+    Summary of aggregates matching filters by any subset of dimensions
+    """
+    with session_scope() as session:
+        return summarize(session.query(MarketAggregate).filter_by(**filters))
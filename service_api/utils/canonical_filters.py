@@ -0,0 +1,63 @@
+"""
+Canonical form of realty filters. Filters that select the same realties from services get
+the same form, so they share cached results, task locks and negative caching:
+numeric strings and integral floats become ints, empty values and sections are dropped
+and lower bound 0 of non-negative characteristics is dropped as it is the same as no bound
+"""
+import json
+import re
+from hashlib import sha256
+from typing import Any, Dict
+
+from ..constants import NON_NEGATIVE_CHARACTERISTICS
+
+NUMBER_PATTERN = re.compile(r"-?\d+(\.\d+)?")
+
+
+def canonical_value(value: Any) -> Any:
+    """
+    Value with normalized types. None values and empty dicts are dropped from dicts
+    """
+    if isinstance(value, dict):
+        items = ((key, canonical_value(item)) for key, item in value.items())
+        return {key: item for key, item in sorted(items) if item is not None and item != {}}
+    if isinstance(value, (list, tuple)):
+        return [canonical_value(item) for item in value]
+    if isinstance(value, str) and NUMBER_PATTERN.fullmatch(value.strip()):
+        value = float(value) if "." in value else int(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def canonical_filters(request_filters: Dict) -> Dict:
+    """
+    Canonical form of request filters of services (realty_filters, characteristics and additional).
+    Used only for keys, services get filters as they were validated
+
+    :param request_filters: Dict - filters split by sections
+    :return: Dict - filters with the same sections in canonical form
+    """
+    filters = canonical_value(request_filters)
+    characteristics = filters.get("characteristics", {})
+    for name in NON_NEGATIVE_CHARACTERISTICS:
+        bounds = characteristics.get(name)
+        if not isinstance(bounds, dict):
+            continue
+        lower = bounds.get("ge")
+        if isinstance(lower, (int, float)) and not isinstance(lower, bool) and lower <= 0:
+            del bounds["ge"]
+        if not bounds:
+            del characteristics[name]
+    return {section: filters.get(section, {}) for section in ("realty_filters", "characteristics", "additional")}
+
+
+def canonical_key(filters: Dict) -> str:
+    """
+    Hash of filters in canonical form. Sectioned request filters get bounds normalized as well
+    """
+    if "characteristics" in filters or "realty_filters" in filters:
+        filters = canonical_filters(filters)
+    else:
+        filters = canonical_value(filters)
+    return sha256(json.dumps(filters, sort_keys=True).encode("utf-8")).hexdigest()
@@ -1,19 +1,25 @@
 """
 Module with data LoadersFactory and order generator
 """
+import time
 from collections import defaultdict
 from copy import deepcopy
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from marshmallow.exceptions import ValidationError
+from requests.exceptions import RequestException
 from service_api import LOGGER
 from selenium.common.exceptions import WebDriverException
 
 from ..constants import (PATH_TO_CORE_DB_METADATA, PATH_TO_METADATA, PATH_TO_PARSER_METADATA)
-from ..exceptions import (CycleReferenceException, LimitBoundError, MetaDataError, ObjectNotFoundException,
-                          ResponseNotOkException)
+from ..metrics import SCRAPE_ERRORS, SCRAPE_LATENCY, SCRAPES_AVOIDED
+from ..exceptions import (CircuitOpenError, CycleReferenceException, LimitBoundError, MetaDataError,
+                          ObjectNotFoundException, ResponseNotOkException)
 from ..services import services_handlers
+from ..tracing import start_span
 from ..utils import chunkify, loaders, open_metadata
+from ..utils.scrape_cache import (cache_empty_result, is_empty_result_cached, mark_service_unavailable,
+                                  unavailable_services)
 
 
 class FetchingOrderGenerator:
@@ -166,40 +172,87 @@ class RealtyFetcher:
         :param: filters - data for filtering realties in services
                 by default None or replace filters passed in __init__
         """
+        return list(self.iter_fetch(filters, limit_data))
+
+    def split_page(self, limit_data=False) -> Dict[str, Optional[int]]:
+        """
+        Number of ads every service is asked for to fill the page of filters
+        :param: limit_data - page and number of ads are limited by limits of services metadata
+        :return: dict[str, Optional[int]] - None for services that are skipped for the page
+        """
+        additional = self.filters["additional"]
+        result = {}
+        for service_name, per_page in zip(self.metadata, chunkify(additional["page_ads_number"], len(self.metadata))):
+            limits = self.metadata[service_name]["limits"]
+            page_numbers_limit, page_ads_limit = limits["page_numbers_limit_le"], limits["page_ads_number_le"]
+            if limit_data and page_numbers_limit and page_ads_limit:
+                if additional["page"] > page_numbers_limit:
+                    per_page = None
+                else:
+                    per_page = min(page_ads_limit, per_page)
+            result[service_name] = per_page
+        return result
+
+    def iter_fetch(self, filters=None, limit_data=False) -> Iterator[Dict]:
+        """
+        Lazy version of fetch. Yields realties as soon as they are loaded to DB.
+        Services that recently failed or had no realties for the same filters are skipped
+        :param: filters - data for filtering realties in services
+                by default None or replace filters passed in __init__
+        """
         self.filters = filters or self.filters
-        realties = []
-        for service_name, per_page in zip(self.metadata,
-                                          chunkify(self.filters["additional"]["page_ads_number"], len(self.metadata))):
-            realty_service_metadata = self.metadata[service_name]
+        unavailable = unavailable_services(self.metadata)
+        scraped = 0
 
+        def count_scraped(items: Iterator) -> Iterator:
+            nonlocal scraped
+            for item in items:
+                scraped += 1
+                yield item
+
+        for service_name, per_page in self.split_page(limit_data).items():
+            realty_service_metadata = self.metadata[service_name]
+            if per_page is None:
+                continue
             self.filters["additional"]["page_ads_number"] = per_page
 
-            if limit_data:
-                page_numbers_limit = realty_service_metadata["limits"]["page_numbers_limit_le"]
-                page_ads_limit = realty_service_metadata["limits"]["page_ads_number_le"]
-                additional = self.filters["additional"]
-                if page_numbers_limit and page_ads_limit:
-                    if additional["page"] > page_numbers_limit:
-                        continue
-                    additional["page_ads_number"] = min(page_ads_limit, additional["page_ads_number"])
             handler = services_handlers.get(realty_service_metadata["handler_name"])
             if not handler:
                 raise MetaDataError
+            if service_name in unavailable:
+                SCRAPES_AVOIDED.labels(service_name, "service_unavailable").inc()
+                continue
             filter_copy = deepcopy(self.filters)
+            # handlers change filters they get
+            filters_of_service = deepcopy(filter_copy)
+            if is_empty_result_cached(service_name, filters_of_service):
+                SCRAPES_AVOIDED.labels(service_name, "empty").inc()
+                continue
             request_to_service = handler(filter_copy, realty_service_metadata)
+            scraped = 0
+            started_at = time.perf_counter()
             try:
-                response = request_to_service.get_latest_data()
+                with start_span("fetch", service=service_name):
+                    yield from loaders.RealtyLoader().iter_load(count_scraped(request_to_service.iter_latest_data()))
             except LimitBoundError as error:
+                SCRAPE_ERRORS.labels(service_name, type(error).__name__).inc()
                 LOGGER.warning(error.args[0])
                 continue
             except WebDriverException as error:
+                SCRAPE_ERRORS.labels(service_name, type(error).__name__).inc()
                 LOGGER.warning(error.args[0])
                 continue
-
-            try:
-                loaded_data = loaders.RealtyLoader().load(response)
-            except LimitBoundError as error:
-                print(error)
-            realties.extend(loaded_data)
-
-        return realties
+            except (CircuitOpenError, RequestException, ResponseNotOkException) as error:
+                # service is down, realties of other services are still fetched
+                SCRAPE_ERRORS.labels(service_name, type(error).__name__).inc()
+                LOGGER.warning("%s is skipped: %s", service_name, error)
+                mark_service_unavailable(service_name)
+                continue
+            except Exception as error:
+                SCRAPE_ERRORS.labels(service_name, type(error).__name__).inc()
+                raise
+            else:
+                if not scraped:
+                    cache_empty_result(service_name, filters_of_service)
+            finally:
+                SCRAPE_LATENCY.labels(service_name).observe(time.perf_counter() - started_at)
@@ -0,0 +1,54 @@
+"""
+Shared client for outbound HTTP requests to services.
+Every thread gets its own requests Session, so cookies and headers aren't shared between threads,
+while all sessions of the process mount one adapter: connections to every host are pooled and kept alive
+"""
+import os
+import threading
+from typing import Optional
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+from service_api import flask_app
+
+_local = threading.local()
+_adapter_lock = threading.Lock()
+_adapter: Optional[HTTPAdapter] = None
+
+
+def get_adapter() -> HTTPAdapter:
+    """
+    Adapter with connection pools of the process, limits are taken from HTTP_POOL_* config
+    """
+    global _adapter
+    with _adapter_lock:
+        if _adapter is None:
+            _adapter = HTTPAdapter(pool_connections=flask_app.config.get("HTTP_POOL_CONNECTIONS", 10),
+                                   pool_maxsize=flask_app.config.get("HTTP_POOL_MAXSIZE", 10),
+                                   pool_block=flask_app.config.get("HTTP_POOL_BLOCK", False))
+        return _adapter
+
+
+def get_http_session() -> Session:
+    """
+    Session of the current thread that sends requests through shared connection pools
+    """
+    if (session := getattr(_local, "session", None)) is None:
+        session = _local.session = Session()
+        adapter = get_adapter()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+    return session
+
+
+def reset_http_client() -> None:
+    """
+    Forget sessions and pools, so forked process (celery prefork) doesn't use sockets of its parent
+    """
+    global _adapter, _local
+    _adapter = None
+    _local = threading.local()
+
+
+os.register_at_fork(after_in_child=reset_http_client)
@@ -1,7 +1,7 @@
 """
 Module with data Loaders
 """
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List
 
 from service_api import LOGGER, session_scope
 from service_api.services import city_loaders, state_loaders
@@ -18,6 +18,7 @@ from ..constants import (PATH_TO_CATEGORIES_CSV, PATH_TO_CATEGORY_ALIASES_CSV, P
                          PATH_TO_CITIES_CSV, PATH_TO_OPERATION_TYPE_ALIASES_CSV,
                          PATH_TO_OPERATION_TYPE_CSV, PATH_TO_REALTY_TYPE_ALIASES_CSV,
                          PATH_TO_REALTY_TYPE_CSV, PATH_TO_SERVICES_CSV, PATH_TO_STATE_ALIASES_CSV, PATH_TO_STATE_CSV)
+from ..serializers import serialize
 from ..utils import load_data, recognize_by_alias
 from .loaders_interfaces import XRefBaseLoader, CSVLoader
 
@@ -283,7 +284,13 @@ class RealtyLoader:
         :params: List[Dict] - list of realty
         :return: None - the only loader's responsibility is to load realty and realty details to the database
         """
-        result = []
+        return list(self.iter_load(all_data))
+
+    def iter_load(self, all_data: Iterable) -> Iterator[Dict]:
+        """
+        Lazy version of load. Yields every realty as soon as it is loaded
+        :params: Iterable - pairs of realty and realty details
+        """
         for realty, realty_details_id in all_data:
             try:
                 load_data(RealtyDetailsSchema(), realty_details_id, RealtyDetails)
@@ -298,11 +305,11 @@ class RealtyLoader:
                     filter_by(**realty_details_id).first().id
                 realty["realty_details_id"] = realty_details_id
             try:
-                result.append(RealtySchema().dump(load_data(RealtySchema(), realty, Realty)))
+                loaded_realty = load_data(RealtySchema(), realty, Realty)
             except KeyError as error:
                 print(error.args)
             except AlreadyInDbException as error:
                 print(error)
                 continue
-
-        return result
+            else:
+                yield serialize(RealtySchema, loaded_realty)
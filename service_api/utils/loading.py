@@ -0,0 +1,101 @@
+"""
+Loading strategies of realty relations.
+Realty details are loaded together with realties by configured strategy,
+reference entities (city, state, types, service) are taken from process-level cache
+"""
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, contains_eager, lazyload, make_transient_to_detached, selectinload
+
+from service_api import flask_app
+from ..constants import REFERENCE_CACHE_EXPIRE_TIME
+from ..models import Realty
+
+# Query must join RealtyDetails for "joined" strategy
+LOADING_STRATEGIES = {
+    "joined": contains_eager,
+    "selectin": selectinload,
+    "lazy": lazyload
+}
+
+
+def realty_loading_options(strategy: str = None) -> List:
+    """
+    Query options that load realty details with realties
+    :param strategy: str - one of LOADING_STRATEGIES, REALTY_LOADING_STRATEGY from config by default
+    """
+    strategy = strategy or flask_app.config.get("REALTY_LOADING_STRATEGY", "joined")
+    try:
+        return [LOADING_STRATEGIES[strategy](Realty.realty_details)]
+    except KeyError as error:
+        raise ValueError(f"Unknown realty loading strategy {strategy}") from error
+
+
+class ReferenceCache:
+    """
+    Cache of rarely changing reference entities shared by all requests of the process.
+    Detached copies are cached and merged into session without queries,
+    so lazy loading of relations finds them in session identity map
+    """
+
+    def __init__(self, expire_time: int = REFERENCE_CACHE_EXPIRE_TIME) -> None:
+        """
+        :param expire_time: int - seconds entity is cached
+        """
+        self.expire_time = expire_time
+        self.entities: Dict[Tuple[type, int], Tuple[float, object]] = {}
+
+    def detached_copy(self, entity):
+        """
+        Copy of column attributes of entity that isn't bound to any session
+        """
+        mapper = inspect(entity).mapper
+        copy = mapper.class_(**{attr.key: getattr(entity, attr.key) for attr in mapper.column_attrs})
+        make_transient_to_detached(copy)
+        return copy
+
+    def load(self, session: Session, model: type, ids: Iterable[int]) -> List:
+        """
+        Put entities with ids into session. Only entities missing in cache are queried (with one IN query).
+        Returned list must be kept alive while entities are used, identity map holds weak references
+        """
+        now = time.monotonic()
+        loaded, missing = [], []
+        for id_ in ids:
+            expires_at, entity = self.entities.get((model, id_), (0, None))
+            if expires_at > now:
+                loaded.append(session.merge(entity, load=False))
+            else:
+                missing.append(id_)
+
+        if missing:
+            for entity in session.query(model).filter(model.id.in_(missing)):
+                self.entities[(model, entity.id)] = (now + self.expire_time, self.detached_copy(entity))
+                loaded.append(entity)
+        return loaded
+
+    def clear(self) -> None:
+        """
+        Drop all cached entities
+        """
+        self.entities.clear()
+
+
+REFERENCE_CACHE = ReferenceCache()
+
+
+def preload_references(session: Session, realties: List[Realty], relations: Iterable[str]) -> List:
+    """
+    Load entities referenced by realties, so serialization of these relations doesn't query DB for every realty.
+    Returned list must be kept alive until realties are serialized
+    """
+    loaded = []
+    for name in relations:
+        relation = Realty.__mapper__.relationships[name]
+        foreign_key = next(iter(relation.local_columns)).key
+        ids = {getattr(realty, foreign_key) for realty in realties} - {None}
+        if ids:
+            loaded += REFERENCE_CACHE.load(session, relation.mapper.class_, ids)
+    return loaded
@@ -0,0 +1,44 @@
+"""
+Counter of SQL statements executed by engine
+"""
+from typing import List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import service_api
+
+
+class QueryCounter:
+    """
+    Context manager that records every SQL statement executed by engine inside the block.
+    Used to check that serving a request doesn't issue a query per row
+
+        with QueryCounter() as counter:
+            RealtyResource().post()
+        assert counter.count <= 3
+    """
+
+    def __init__(self, engine: Engine = None) -> None:
+        """
+        :param engine: Engine - engine to listen, service engine by default
+        """
+        self.engine = engine or service_api.engine
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        """
+        Number of executed statements
+        """
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn, cursor, statement, *args) -> None:
+        self.statements.append(statement)
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *args) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._before_cursor_execute)
@@ -0,0 +1,62 @@
+"""
+Negative caching of scrapes. Empty result of a service for filters is cached for a short time
+and a service that failed is marked unavailable, so next fetches skip it instead of spending
+DomRia tokens and scrape time. Outcomes are kept per service, so outage of one service
+doesn't change cached results of others
+"""
+import datetime
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List
+
+import service_api
+from ..constants import (CACHED_EMPTY_REQUESTS_EXPIRE_TIME, EMPTY_RESULT_PREFIX, PATH_TO_METADATA,
+                         PATH_TO_PARSER_METADATA, SERVICE_UNAVAILABLE_EXPIRE_TIME, SERVICE_UNAVAILABLE_PREFIX)
+from ..utils import open_metadata
+from ..utils.canonical_filters import canonical_key
+
+
+@lru_cache(maxsize=1)
+def service_names() -> FrozenSet[str]:
+    """
+    Names of all services in metadata
+    """
+    return frozenset(open_metadata(PATH_TO_METADATA) | open_metadata(PATH_TO_PARSER_METADATA))
+
+
+def empty_result_key(service: str, filters: Dict) -> str:
+    """
+    Redis key of empty result of service for filters
+    """
+    return f"{EMPTY_RESULT_PREFIX}:{service}:{canonical_key(filters)}"
+
+
+def cache_empty_result(service: str, filters: Dict) -> None:
+    """
+    Remember that service has no realties for filters
+    """
+    service_api.CACHE.set(empty_result_key(service, filters), 1,
+                          datetime.timedelta(**CACHED_EMPTY_REQUESTS_EXPIRE_TIME))
+
+
+def is_empty_result_cached(service: str, filters: Dict) -> bool:
+    """
+    Check if service had no realties for filters recently
+    """
+    return bool(service_api.CACHE.exists(empty_result_key(service, filters)))
+
+
+def mark_service_unavailable(service: str) -> None:
+    """
+    Skip service for SERVICE_UNAVAILABLE_EXPIRE_TIME after its failure
+    """
+    service_api.CACHE.set(f"{SERVICE_UNAVAILABLE_PREFIX}:{service}", 1,
+                          datetime.timedelta(**SERVICE_UNAVAILABLE_EXPIRE_TIME))
+
+
+def unavailable_services(services: Iterable[str] = None) -> List[str]:
+    """
+    Services that are marked unavailable, all services of metadata by default
+    """
+    services = sorted(services or service_names())
+    marks = service_api.CACHE.mget([f"{SERVICE_UNAVAILABLE_PREFIX}:{service}" for service in services])
+    return [service for service, mark in zip(services, marks) if mark is not None]
@@ -2,19 +2,20 @@
 Module of grabbing service contains driver for selenium
 """
 import os
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 
 DRIVER = None
 
 
 def init_driver(link):
     """
-    A function to initialize Chrome WebDriver
+    A function to initialize Chrome WebDriver.
+    Selenium is imported on the first call, only scraping processes need it
     """
     global DRIVER
 
     if DRIVER is None:
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
         options = Options()
         options.headless = True
         DRIVER = webdriver.Remote(os.environ.get('SELENIUM_URL'), options=options)
@@ -0,0 +1,88 @@
+"""
+Mergeable quantile sketch with relative error guarantee (DDSketch-like).
+Values are counted in logarithmic buckets, so unlike most sketches
+values can be removed as cheaply as added
+"""
+import math
+from typing import Dict, Optional
+
+from ..constants import SKETCH_RELATIVE_ACCURACY
+
+
+class QuantileSketch:
+    """
+    Approximate quantiles of positive values.
+    Any returned quantile is within relative_accuracy of the exact one
+    """
+
+    def __init__(self, bins: Optional[Dict[str, int]] = None,
+                 relative_accuracy: float = SKETCH_RELATIVE_ACCURACY) -> None:
+        """
+        :param bins: Dict[str, int] - serialized bins of the sketch (see to_dict)
+        :param relative_accuracy: float - relative error of returned quantiles
+        """
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {int(key): count for key, count in (bins or {}).items()}
+
+    @property
+    def count(self) -> int:
+        """
+        Number of values in the sketch
+        """
+        return sum(self.bins.values())
+
+    def key(self, value: float) -> int:
+        """
+        Bucket index of the value
+        """
+        return math.ceil(math.log(value) / self.log_gamma)
+
+    def add(self, value: float, count: int = 1) -> None:
+        """
+        Add value to the sketch. Negative count removes previously added value.
+        Non positive values are ignored
+        """
+        if value <= 0:
+            return
+        key = self.key(value)
+        bin_count = self.bins.get(key, 0) + count
+        if bin_count > 0:
+            self.bins[key] = bin_count
+        else:
+            self.bins.pop(key, None)
+
+    def remove(self, value: float) -> None:
+        """
+        Remove previously added value from the sketch
+        """
+        self.add(value, -1)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """
+        Add all values of other sketch with the same accuracy
+        """
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Approximate q-quantile or None for empty sketch
+        :param q: float - from 0 to 1
+        """
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_dict(self) -> Dict[str, int]:
+        """
+        JSON serializable representation of the sketch
+        """
+        return {str(key): count for key, count in self.bins.items()}
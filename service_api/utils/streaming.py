@@ -0,0 +1,91 @@
+"""
+Utilities for streaming records as newline delimited json
+"""
+import json
+from typing import Dict, Iterable, Iterator, Union
+
+from flask import Response, request, stream_with_context
+
+from service_api import CACHE, LOGGER
+from ..constants import GRABBING_STREAM_EXPIRE_TIME, NDJSON_MIMETYPE
+from ..errors import InternalServerErrorException, ServiceUnavailableException
+
+STREAM_END = "__end__"
+# pushed before end marker when producer failed
+STREAM_ERROR = "__error__"
+# key of the last record of stream that failed after response was started
+ERROR_RECORD_KEY = "error"
+
+
+def wants_ndjson() -> bool:
+    """
+    Check if client asked for streaming response with Accept header
+    """
+    return request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def error_record(error: Union[InternalServerErrorException, ServiceUnavailableException]) -> Dict:
+    """
+    Record sent instead of the rest of stream, status code is already sent when streaming fails
+    """
+    return {ERROR_RECORD_KEY: error.to_dict()}
+
+
+def is_error_record(record: Dict) -> bool:
+    """
+    Check if record is sent by error_record
+    """
+    return ERROR_RECORD_KEY in record
+
+
+def ndjson_response(records: Iterable[Dict]) -> Response:
+    """
+    Stream records as newline delimited json.
+    Every record is serialized and sent as soon as it is produced.
+    If producing of records fails with service error, error record is sent as the last line
+    """
+    def generate():
+        try:
+            for record in records:
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+        except (InternalServerErrorException, ServiceUnavailableException) as error:
+            LOGGER.warning("Streaming failed: %s", error.message)
+            yield json.dumps(error_record(error), ensure_ascii=False) + "\n"
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+
+def push_to_stream(key: str, records: Iterable[Dict]) -> None:
+    """
+    Push records to redis list one by one, so reader can send them before all records are ready.
+    End marker is pushed even if producing of records fails, error marker goes before it then
+    """
+    try:
+        for record in records:
+            CACHE.rpush(key, json.dumps(record))
+            CACHE.expire(key, GRABBING_STREAM_EXPIRE_TIME)
+    except Exception:
+        CACHE.rpush(key, STREAM_ERROR)
+        raise
+    finally:
+        CACHE.rpush(key, STREAM_END)
+        CACHE.expire(key, GRABBING_STREAM_EXPIRE_TIME)
+
+
+def iter_stream(key: str, timeout: int) -> Iterator[Dict]:
+    """
+    Read records pushed by push_to_stream until end marker
+    :param timeout: int - seconds to wait for every next record
+    :raises ServiceUnavailableException: if the next record isn't pushed in time
+    :raises InternalServerErrorException: if producer failed
+    """
+    try:
+        while item := CACHE.blpop(key, timeout):
+            _, value = item
+            if value == STREAM_END:
+                return
+            if value == STREAM_ERROR:
+                raise InternalServerErrorException("Grabbing failed")
+            yield json.loads(value)
+        raise ServiceUnavailableException("Grabbing takes too long")
+    finally:
+        CACHE.delete(key)
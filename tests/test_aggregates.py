@@ -0,0 +1,85 @@
+"""
+Market aggregates testing module
+"""
+from unittest.mock import MagicMock
+
+import pytest
+
+from service_api.models import MarketAggregate, Realty, RealtyDetails
+from service_api.utils.aggregates import summarize, update_market_aggregate
+from service_api.utils.sketch import QuantileSketch
+
+VALUES = [float(value) for value in range(1, 1001)]
+
+
+@pytest.mark.parametrize("quantile", (0, 0.1, 0.25, 0.5, 0.75, 0.99, 1))
+def test_sketch_quantile_accuracy(quantile):
+    """
+    Checking that quantiles are within relative accuracy
+    """
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for value in VALUES:
+        sketch.add(value)
+    exact = VALUES[int(quantile * (len(VALUES) - 1))]
+
+    assert sketch.quantile(quantile) == pytest.approx(exact, rel=0.01)
+
+
+def test_sketch_remove_and_serialization():
+    """
+    Checking that removed values don't affect quantiles and sketch survives serialization
+    """
+    sketch = QuantileSketch()
+    for value in VALUES:
+        sketch.add(value)
+    for value in VALUES[500:]:
+        sketch.remove(value)
+    restored = QuantileSketch(sketch.to_dict())
+
+    assert restored.count == 500
+    assert restored.quantile(1) == pytest.approx(500, rel=0.01)
+    assert QuantileSketch().quantile(0.5) is None
+
+
+def test_sketch_merge():
+    """
+    Checking that merged sketch is the same as sketch of all values
+    """
+    first, second, full = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for value in VALUES:
+        (first if value % 2 else second).add(value)
+        full.add(value)
+    first.merge(second)
+
+    assert first.bins == full.bins
+
+
+def test_update_market_aggregate():
+    """
+    Checking that insert and retire of the same realty cancel each other
+    """
+    aggregate = MarketAggregate(count=0, price_sum=0, square_count=0, square_sum=0, price_per_square_sum=0,
+                                price_per_square_sketch={})
+    session = MagicMock()
+    session.query.return_value.filter_by.return_value.with_for_update.return_value.one.return_value = aggregate
+    realty = Realty(state_id=1, city_id=None, realty_type_id=2, operation_type_id=1)
+    first, second = RealtyDetails(price=50000.0, square=50.0), RealtyDetails(price=30000.0, square=None)
+
+    update_market_aggregate(session, realty, first, 1)
+    update_market_aggregate(session, realty, second, 1)
+    session.query.return_value.filter_by.assert_called_with(state_id=1, city_id=0, realty_type_id=2,
+                                                            operation_type_id=1)
+    assert (aggregate.count, aggregate.price_sum, aggregate.square_count) == (2, 80000.0, 1)
+    assert summarize([aggregate])["price_per_square_p50"] == pytest.approx(1000, rel=0.01)
+
+    update_market_aggregate(session, realty, first, -1)
+    assert (aggregate.count, aggregate.square_count, aggregate.price_per_square_sketch) == (1, 0, {})
+
+
+def test_summarize_empty():
+    """
+    Checking summary when nothing matches filters
+    """
+    assert summarize([]) == {"count": 0, "avg_price": None, "avg_square": None, "avg_price_per_square": None,
+                             "price_per_square_p25": None, "price_per_square_p50": None,
+                             "price_per_square_p75": None}
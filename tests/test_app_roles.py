@@ -0,0 +1,70 @@
+"""
+App roles and lazy imports testing module
+"""
+import subprocess
+import sys
+
+import pytest
+
+import service_api
+from benchmarks.import_time import forbidden_imports, measure_imports
+from service_api.services import services_handlers
+
+
+@pytest.mark.parametrize("role", ("api", "grabbing"))
+def test_role_does_not_import_scraping_stack(role):
+    """
+    Checking that api processes don't import modules of other roles
+    """
+    records = measure_imports(role)
+
+    assert {record.module for record in records} >= {"service_api", "flask"}
+    assert forbidden_imports(role, records) == []
+
+
+@pytest.mark.parametrize("role", ("api", "grabbing", "worker", "all"))
+def test_role_resources_profile(role):
+    """
+    Checking that DB pool and redis connections are created on create_app with sizes of the role
+    """
+    code = ("import service_api; created = 'engine' in vars(service_api); service_api.create_app(%r); "
+            "print(created, service_api.engine.pool.size(), service_api.CACHE.connection_pool.max_connections)" % role)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    profile = service_api.flask_app.config["ROLE_PROFILES"][role]
+
+    created, pool_size, redis_connections = output.splitlines()[-1].split()
+    assert created == "False"
+    assert int(pool_size) == profile["DB_POOL_SIZE"]
+    assert int(redis_connections) == (profile["REDIS_MAX_CONNECTIONS"] or 2 ** 31)
+
+
+def test_create_app_registers_role_resources():
+    """
+    Checking that create_app imports resources of the role
+    """
+    rules = {rule.rule for rule in service_api.create_app("all").url_map.iter_rules()}
+
+    assert {"/realty", "/grabbing/latest", "/metrics"} <= rules
+
+
+def test_lazy_services_handlers():
+    """
+    Checking that handlers are imported on first access
+    """
+    from service_api.services.domria.handlers import DomriaServiceHandler
+
+    assert services_handlers["DomriaServiceHandler"] is DomriaServiceHandler
+    assert services_handlers.get("UnknownHandler") is None
+    assert sorted(services_handlers) == ["DomriaServiceHandler", "OlxServiceHandler"]
+
+
+def test_short_commands_do_not_create_app():
+    """
+    Checking that management commands that don't serve requests don't import components of roles
+    """
+    code = ("import sys, manage; manage.cli(['hi'], standalone_mode=False); "
+            "print(sorted(module for module in ('celery', 'selenium', 'service_api.utils.db', "
+            "'service_api.client_api') if module in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+
+    assert output.splitlines()[-1] == "[]"
@@ -0,0 +1,215 @@
+"""
+Async grabbing api testing module
+"""
+import asyncio
+import json
+from unittest.mock import DEFAULT, patch
+
+import pytest
+from redis.asyncio import Redis
+
+import service_api
+from service_api import flask_app
+from service_api.constants import NDJSON_MIMETYPE
+from service_api.grabbing_api.asgi import GrabbingApp, StreamDispatcher
+from service_api.utils.streaming import STREAM_END, STREAM_ERROR
+
+
+class FakeAsyncRedis:
+    """
+    In-memory lists with BLPOP, RPUSH, EXPIRE and DEL of asyncio redis client
+    """
+
+    def __init__(self) -> None:
+        self.lists = {}
+        self.deleted = []
+
+    async def blpop(self, keys, timeout):
+        """
+        Pop the first value of the first non-empty list or wait until timeout
+        """
+        deadline = asyncio.get_running_loop().time() + timeout
+        while asyncio.get_running_loop().time() < deadline:
+            for key in keys:
+                if self.lists.get(key):
+                    return key, self.lists[key].pop(0)
+            await asyncio.sleep(0.01)
+        return None
+
+    async def rpush(self, key, *values):
+        """
+        Append values to list
+        """
+        self.lists.setdefault(key, []).extend(values)
+        return len(self.lists[key])
+
+    async def expire(self, key, seconds):
+        """
+        Lists never expire
+        """
+        return True
+
+    async def delete(self, *keys):
+        """
+        Remember deleted keys
+        """
+        self.deleted.extend(keys)
+        return len(keys)
+
+    def pipeline(self, transaction=True):
+        """
+        Pipeline running commands on this client
+        """
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """
+    Pipeline of FakeAsyncRedis, commands are run on execute
+    """
+
+    def __init__(self, client: FakeAsyncRedis) -> None:
+        self.client = client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+    def __getattr__(self, name):
+        def command(*args):
+            self.commands.append((name, args))
+            return self
+        return command
+
+    async def execute(self):
+        """
+        Run queued commands
+        """
+        return [await getattr(self.client, name)(*args) for name, args in self.commands]
+
+
+def call_app(app, method="POST", path="/grabbing/latest", body=b'{"realty_type_id": 1}', accept=b"*/*"):
+    """
+    Call ASGI app and return status, headers and body of response
+    """
+    scope = {"type": "http", "method": method, "path": path, "headers": [(b"accept", accept)]}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent[0]["status"], dict(sent[0]["headers"]), b"".join(message.get("body", b"") for message in sent[1:])
+
+
+def grab_with(values):
+    """
+    Patch celery app, so sent grabbing task pushes values to its stream
+    """
+    client = FakeAsyncRedis()
+
+    def apply_async(args, kwargs):
+        client.lists[kwargs["stream_key"]] = list(values)
+        return DEFAULT
+
+    mock_celery = patch("service_api.celery_app")
+    celery_app = mock_celery.start()
+    celery_app.signature.return_value.apply_async.side_effect = apply_async
+    return client, mock_celery
+
+
+@pytest.mark.parametrize(("accept", "content_type"), ((b"application/json", b"application/json; charset=utf-8"),
+                                                      (NDJSON_MIMETYPE.encode(), NDJSON_MIMETYPE.encode())))
+def test_grabbing_responds_with_pushed_records(accept, content_type):
+    """
+    Checking that records pushed by task are returned as json list or json lines and stream is deleted
+    """
+    records = [{"id": 1}, {"id": 2}]
+    client, mock_celery = grab_with([json.dumps(record) for record in records] + [STREAM_END])
+    try:
+        status, headers, body = call_app(GrabbingApp(client), accept=accept)
+    finally:
+        mock_celery.stop()
+
+    assert status == 200
+    assert headers[b"content-type"] == content_type
+    if accept == b"application/json":
+        assert json.loads(body) == records
+    else:
+        assert [json.loads(line) for line in body.splitlines()] == records
+    assert len(client.deleted) == 1
+
+
+def test_grabbing_errors():
+    """
+    Checking that failed task, invalid body and unknown urls get json errors
+    """
+    client, mock_celery = grab_with([json.dumps({"id": 1}), STREAM_ERROR, STREAM_END])
+    try:
+        status, _, body = call_app(GrabbingApp(client))
+    finally:
+        mock_celery.stop()
+
+    assert (status, json.loads(body)["code"]) == (500, 500)
+    assert call_app(GrabbingApp(FakeAsyncRedis()), body=b"{")[0] == 400
+    assert call_app(GrabbingApp(FakeAsyncRedis()), method="GET")[0] == 405
+    assert call_app(GrabbingApp(FakeAsyncRedis()), path="/unknown")[0] == 404
+
+
+def test_default_redis_client():
+    """
+    Checking that asyncio redis client is created with connections limit of grabbing role
+    """
+    app = GrabbingApp()
+    app.get_dispatcher()
+
+    assert isinstance(app.client, Redis)
+    assert app.client.connection_pool.max_connections == \
+        (flask_app.config["ROLE_PROFILES"]["grabbing"]["REDIS_MAX_CONNECTIONS"] or 10)
+
+
+@pytest.mark.parametrize(("values", "error"), (([json.dumps({"id": 1}), STREAM_ERROR, STREAM_END], 500),
+                                               ([json.dumps({"id": 1})], 503)))
+@patch("service_api.grabbing_api.asgi.GRABBING_TASK_TIMEOUT", 0.1)
+def test_grabbing_stream_errors(values, error):
+    """
+    Checking that failed and too long grabbing end stream with error record and too long task is revoked
+    """
+    client, mock_celery = grab_with(values)
+    try:
+        status, _, body = call_app(GrabbingApp(client), accept=NDJSON_MIMETYPE.encode())
+        task = service_api.celery_app.signature.return_value.apply_async.return_value
+    finally:
+        mock_celery.stop()
+
+    first, last = [json.loads(line) for line in body.splitlines()]
+    assert (status, first, last["error"]["code"]) == (200, {"id": 1}, error)
+    assert task.revoke.called is (error == 503)
+
+
+def test_dispatcher_awaits_new_keys_at_once():
+    """
+    Checking that key subscribed while BLPOP runs doesn't wait for the end of this BLPOP
+    """
+    client = FakeAsyncRedis()
+    dispatcher = StreamDispatcher(client, poll_timeout=5)
+
+    async def read():
+        first = await dispatcher.subscribe("first")
+        await asyncio.sleep(0.05)
+        second = await dispatcher.subscribe("second")
+        await client.rpush("second", "value")
+        value = await asyncio.wait_for(second.get(), 1)
+        dispatcher.unsubscribe("first")
+        dispatcher.unsubscribe("second")
+        await client.rpush(dispatcher.wake_key, "stop")
+        await dispatcher.task
+        return first.empty(), value
+
+    assert asyncio.run(read()) == (True, "value")
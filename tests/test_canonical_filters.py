@@ -0,0 +1,46 @@
+"""
+Canonical filters testing module
+"""
+from service_api.celery_tasks.locks import filters_key
+from service_api.utils.canonical_filters import canonical_filters, canonical_value
+from service_api.utils.scrape_cache import empty_result_key
+
+FILTERS = {"realty_filters": {"city_id": 1, "realty_type_id": 2},
+           "characteristics": {"price": {"le": 50000}},
+           "additional": {"page": 1, "page_ads_number": 10}}
+
+
+def test_canonical_value_types():
+    """
+    Checking that numeric strings and integral floats become ints and empty values are dropped
+    """
+    assert canonical_value({"b": "2", "a": 1.0, "c": None, "d": {}, "e": 1.5, "f": "Київ"}) == \
+        {"a": 1, "b": 2, "e": 1.5, "f": "Київ"}
+    assert list(canonical_value({"b": 1, "a": 2})) == ["a", "b"]
+
+
+def test_equivalent_filters_have_the_same_form():
+    """
+    Checking that filters that select the same realties from services have the same canonical form
+    """
+    equivalent = {"realty_filters": {"city_id": "1", "realty_type_id": 2.0, "state_id": None},
+                  "characteristics": {"price": {"ge": 0, "le": "50000"}, "square": {}, "floor": {"ge": None}},
+                  "additional": {"page": "1", "page_ads_number": 10}}
+
+    assert canonical_filters(equivalent) == canonical_filters(FILTERS) == FILTERS
+    assert filters_key({"state_id": "1"}) == filters_key({"state_id": 1})
+    assert empty_result_key("OLX", equivalent) == empty_result_key("OLX", FILTERS)
+
+
+def test_different_filters_keep_their_form():
+    """
+    Checking that bounds that change results and pages are kept
+    """
+    filters = {"realty_filters": {}, "characteristics": {"price": {"ge": 100}, "floor": {"le": 0}},
+               "additional": {"page": 2, "page_ads_number": 10}}
+
+    assert canonical_filters(filters) == filters
+    assert canonical_filters(filters) != canonical_filters(dict(filters, additional={"page": 1,
+                                                                                    "page_ads_number": 10}))
+    assert canonical_filters({"characteristics": {}}) == {"realty_filters": {}, "characteristics": {},
+                                                          "additional": {}}
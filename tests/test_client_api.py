@@ -3,7 +3,7 @@ Client Api testing module
 """
 import os
 from typing import Dict, List
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import pytest
 
@@ -11,8 +11,11 @@ from convertors import get_model_convertors, get_realty_template
 from service_api import Base, engine, flask_app, session_scope
 from service_api.client_api.resources import StateResource, StatesResource, \
     CityResource, CitiesResource, RealtyTypeResource, RealtyTypesResource, \
-    OperationTypeResource, OperationTypesResource, RealtyResource
+    OperationTypeResource, OperationTypesResource, RealtyResource, RealtyStatsResource, \
+    parse_expand, parse_ids, serialize_realties
 from service_api.errors import BadRequestException
+from service_api.models import City, Realty, RealtyDetails
+from service_api.utils.loading import REFERENCE_CACHE
 
 path_to_tests_static_data = ["tests", "static_data"]
 PATH_TO_TEST_DATA = os.sep.join([*path_to_tests_static_data, "test_data.json"])
@@ -455,3 +458,120 @@ def test_for_getting_latest_realty(mock_grabbing_request, database):
             actual = RealtyResource().post()
             expected = [realty_template]
             assert expected.sort(key=lambda x: x.get("id")) == actual.sort(key=lambda x: x.get("id"))
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [{
+        "price": {
+            "ge": 1000,
+            "le": 88000
+        },
+        "realty_type_id": 1,
+        "operation_type_id": 1
+     },
+     {
+        "price": {
+            "ge": 2000,
+            "le": 14000
+        },
+        "realty_type_id": 3,
+        "latest": False,
+        "page": 1,
+        "page_ads_number": 5,
+        "operation_type_id": 3
+     }])
+@patch("service_api.client_api.resources.make_hash")
+@patch("service_api.client_api.resources.get_hash", return_value=None)
+def test_realty_stats(_, mock_make_hash, filters, database, open_testing_data):
+    """
+    Test route for counting realties matching filters
+    """
+    with flask_app.test_request_context():
+        with patch("service_api.client_api.resources.request.get_json") as mock_request:
+            mock_request.return_value = dict(filters)
+            actual, response_code = RealtyStatsResource().post()
+
+    expected_total = len(filter_test_data(filters, open_testing_data))
+    assert response_code == 200
+    assert actual["total"] == expected_total
+    for facet in actual["facets"].values():
+        assert sum(item["count"] for item in facet) == expected_total
+    assert sum(item["count"] for item in actual["histograms"]["price"]) == expected_total
+    mock_make_hash.assert_called_once()
+
+
+@patch("service_api.client_api.resources.get_realty_stats")
+@patch("service_api.client_api.resources.get_hash", return_value='{"total": 3}')
+def test_realty_stats_from_cache(_, mock_get_realty_stats):
+    """
+    Test that cached stats are returned without DB queries
+    """
+    with flask_app.test_request_context():
+        with patch("service_api.client_api.resources.request.get_json") as mock_request:
+            mock_request.return_value = {"realty_type_id": 1, "operation_type_id": 1}
+            actual, response_code = RealtyStatsResource().post()
+
+    assert (actual, response_code) == ({"total": 3}, 200)
+    mock_get_realty_stats.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "resource,ids,expected_ids",
+    [(StatesResource, "1,3", [1, 3]),
+     (RealtyTypesResource, "2", [2]),
+     (OperationTypesResource, "1,2,100", [1, 2]),
+     (CitiesResource, "4,5,6", [4, 5, 6])])
+def test_get_entities_by_ids(resource, ids, expected_ids, database):
+    """
+    Checking batch lookup of reference entities by ids
+    """
+    with flask_app.test_request_context(query_string={"ids": ids}):
+        actual, response_code = resource().get()
+    assert sorted(item["id"] for item in actual) == expected_ids
+    assert response_code == 200
+
+
+@pytest.mark.parametrize("ids,expected", [("1,2,3", [1, 2, 3]), ("7", [7]), ("1,", [1])])
+def test_parse_ids(ids, expected):
+    """
+    Checking parsing of comma separated ids
+    """
+    assert parse_ids(ids) == expected
+
+
+@pytest.mark.parametrize("ids", ["a,b", "1;2"])
+def test_parse_ids_exception(ids):
+    """
+    Checking that malformed ids are rejected
+    """
+    with pytest.raises(BadRequestException):
+        parse_ids(ids)
+
+
+@pytest.mark.parametrize("expand", ["city,unknown", ["flat"], 5])
+def test_parse_expand_exception(expand):
+    """
+    Checking that only realty relations can be expanded
+    """
+    with pytest.raises(BadRequestException):
+        parse_expand(expand)
+
+
+def test_serialize_realties_with_expand():
+    """
+    Checking that not expanded relations are replaced by ids
+    """
+    realty = Realty(id=1, city_id=3, state_id=2, realty_type_id=4, operation_type_id=1, service_id=1,
+                    realty_details=RealtyDetails(id=1, price=1000.0),
+                    city=City(id=3, name="TestCityName3", self_id=303))
+    session = MagicMock()
+    REFERENCE_CACHE.clear()
+
+    actual, = serialize_realties(session, [realty], parse_expand("city"))
+
+    assert actual["city"] == {"id": 3, "name": "TestCityName3", "self_id": 303}
+    assert {key: actual[key] for key in ("state_id", "realty_type_id", "operation_type_id", "service_id")} == \
+        {"state_id": 2, "realty_type_id": 4, "operation_type_id": 1, "service_id": 1}
+    assert "state" not in actual
+    session.query.assert_any_call(City)
@@ -0,0 +1,51 @@
+"""
+Grabbing api resource and routing of tasks testing module
+"""
+from unittest.mock import patch
+
+import pytest
+from celery.exceptions import TimeoutError as CeleryTimeoutError
+
+import service_api
+from service_api.constants import CELERY_DEFAULT_QUEUE, CELERY_TASK_ROUTES, GRAB_LATEST_REALTIES_TASK, URLS
+
+
+@pytest.fixture(name="grabbing_client")
+def grabbing_client_fixture():
+    """
+    Test client of app with grabbing api resources
+    """
+    return service_api.create_app("grabbing").test_client()
+
+
+@pytest.mark.parametrize(("task", "queue"), CELERY_TASK_ROUTES.items())
+def test_task_route(task, queue):
+    """
+    Checking that every task is sent to its queue
+    """
+    import service_api.celery_tasks.tasks  # pylint: disable=import-outside-toplevel,unused-import
+
+    assert task in service_api.celery_app.tasks
+    assert service_api.celery_app.amqp.router.route({}, task)["queue"].name == queue["queue"]
+
+
+def test_unknown_task_route():
+    """
+    Checking that tasks without route are sent to default queue
+    """
+    assert service_api.celery_app.amqp.router.route({}, "tests.unknown")["queue"].name == CELERY_DEFAULT_QUEUE
+
+
+@patch("service_api.celery_app")
+def test_grabbing_timeout(mock_celery, grabbing_client):
+    """
+    Checking that task that takes too long is revoked and client gets 503
+    """
+    task = mock_celery.signature.return_value.apply_async.return_value
+    task.get.side_effect = CeleryTimeoutError
+
+    response = grabbing_client.post(URLS["GRABBING"]["GET_LATEST_URL"], json={"city_id": 1})
+
+    assert response.status_code == 503
+    mock_celery.signature.assert_called_once_with(GRAB_LATEST_REALTIES_TASK)
+    task.revoke.assert_called_once_with()
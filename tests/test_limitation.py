@@ -6,10 +6,14 @@ from unittest.mock import Mock, PropertyMock, patch
 
 import pytest
 from service_api import session_scope
+from service_api.celery_tasks.tasks import load_realties_by_filters
 from service_api.exceptions import LimitBoundError
 from service_api.models import RequestsHistory
+from service_api.services.domria.handlers import DomriaServiceHandler
 from service_api.services.domria.limitation import DomriaLimitationSystem
+from service_api.services.domria.scheduler import DomriaBudgetScheduler
 from service_api.services.limitation import LimitationSystem
+from service_api.utils.db import RealtyFetcher
 
 URL = "https://developers.ria.com/dom/search?api_key=token&param=1"
 
@@ -99,3 +103,84 @@ class TestDomriaLimitationSystem:
 
                 with pytest.raises(LimitBoundError):
                     DomriaLimitationSystem.get_token()
+
+
+class TestDomriaBudgetScheduler:
+    """
+    Suite for testing DomriaBudgetScheduler
+    """
+
+    @pytest.mark.parametrize(("remaining", "priority", "expected"),
+                            ((1600, DomriaBudgetScheduler.BACKGROUND, True),
+                            (321, DomriaBudgetScheduler.BACKGROUND, False),
+                            (321, DomriaBudgetScheduler.INTERACTIVE, True),
+                            (1, DomriaBudgetScheduler.INTERACTIVE, False)))
+    @patch("service_api.services.domria.scheduler.CACHE")
+    def test_budget_reserved_for_interactive(self, mock_cache, remaining, priority, expected):
+        """
+        Checking that background work can't spend budget reserved for interactive requests
+        """
+        mock_cache.incrby.return_value = 2
+        with patch.object(DomriaLimitationSystem, "TOKENS", ["token1", "token2"]), \
+                patch.object(DomriaLimitationSystem, "get_remaining_requests") as mock_remaining:
+            mock_remaining.return_value = {"hash": remaining}
+            assert DomriaBudgetScheduler.acquire(2, priority) is expected
+
+    @patch("service_api.services.domria.scheduler.CACHE")
+    def test_background_work_is_paced(self, mock_cache):
+        """
+        Checking that background work can't spend more than its part of budget during one window
+        """
+        with patch.object(DomriaLimitationSystem, "TOKENS", ["token"]), \
+                patch.object(DomriaLimitationSystem, "get_remaining_requests") as mock_remaining:
+            mock_remaining.return_value = {"hash": 800}
+            mock_cache.incrby.return_value = DomriaBudgetScheduler.window_budget() + 1
+
+            assert not DomriaBudgetScheduler.acquire(2)
+            mock_cache.decrby.assert_called_once()
+
+    @pytest.mark.parametrize(("page", "page_ads_limit"), ((1, 1), (1, None), (3, None)))
+    @patch("service_api.services.domria.handlers.DomRiaOutputConverter")
+    @patch("service_api.services.domria.handlers.get_all_responses")
+    @patch("service_api.services.domria.handlers.send_request")
+    @patch("service_api.services.domria.handlers.DomriaLimitationSystem.get_token", return_value="token")
+    @patch("service_api.services.domria.handlers.DomRiaInputConverter.convert", return_value={})
+    @patch("service_api.CACHE")
+    def test_crawl_page_cost(self, mock_cache, _, __, mock_search, mock_ads, mock_converter, page, page_ads_limit):
+        """
+        Checking that budget charged for crawled page is the number of requests DomRia handler sends for it
+        """
+        mock_cache.get.return_value = None
+        mock_cache.mget.side_effect = lambda keys: [None] * len(keys)
+        mock_search.side_effect = lambda *args, params, **kwargs: Mock(status_code=200, json=lambda: {
+            "items": list(range((params["page"] - 1) * 100, params["page"] * 100))})
+        mock_ads.side_effect = lambda url, params, ids, service: [Mock(ok=True)] * len(ids)
+        mock_converter.return_value.make_realty_data.return_value = {}
+        mock_converter.return_value.make_realty_details_data.return_value = {}
+        fetcher = RealtyFetcher({"realty_filters": {}, "characteristics": {},
+                                 "additional": {"page": page, "page_ads_number": 100}})
+        fetcher.metadata["DOMRIA API"]["limits"]["page_ads_number_le"] = page_ads_limit
+        ads_number = fetcher.split_page(limit_data=True)["DOMRIA API"]
+
+        handler = DomriaServiceHandler({"realty_filters": {}, "characteristics": {},
+                                        "additional": {"page": page, "page_ads_number": ads_number}},
+                                       fetcher.metadata["DOMRIA API"])
+        assert len(handler.get_latest_data()) == ads_number
+        requests = mock_search.call_count + sum(len(call.args[2]) for call in mock_ads.call_args_list)
+        assert DomriaBudgetScheduler.page_cost(page, ads_number) == requests == ads_number + 1
+
+    @pytest.mark.parametrize(("split", "cost"), (({"DOMRIA API": 50, "OLX": 50}, 51),
+                                                 ({"DOMRIA API": 1, "OLX": 50}, 2),
+                                                 ({"DOMRIA API": None, "OLX": 50}, 0)))
+    @patch("service_api.celery_tasks.locks.CACHE")
+    def test_crawl_task_charges_page_cost(self, _, split, cost):
+        """
+        Checking that crawl charges requests DomRia is sent for the page before fetching it
+        """
+        with patch.object(DomriaBudgetScheduler, "acquire", return_value=True) as mock_acquire, \
+                patch.object(RealtyFetcher, "split_page", return_value=split), \
+                patch.object(RealtyFetcher, "fetch", return_value=[]):
+            load_realties_by_filters.run({"realty_type_id": 1, "state_id": 1, "operation_type_id": 1})
+
+        mock_acquire.assert_called_once_with(cost, DomriaBudgetScheduler.BACKGROUND)
+        assert DomriaBudgetScheduler.page_cost(3, 30) == 2 + 30
@@ -0,0 +1,85 @@
+"""
+Realty loading strategies testing module.
+Queries are counted on in-memory SQLite database with realty related tables only
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from service_api import Base
+from service_api.client_api.resources import serialize_realties
+from service_api.constants import REALTY_EXPANDABLE_RELATIONS
+from service_api.models import (Category, City, OperationType, Realty, RealtyDetails, RealtyType, Service, State)
+from service_api.utils.loading import REFERENCE_CACHE, realty_loading_options
+from service_api.utils.query_counter import QueryCounter
+
+REALTIES_NUMBER = 40
+
+
+@pytest.fixture(scope="module")
+def sqlite_engine():
+    """
+    SQLite database filled with realties referencing several cities and types
+    """
+    engine = create_engine("sqlite://")
+    models = (Category, State, City, RealtyType, OperationType, Service, RealtyDetails, Realty)
+    Base.metadata.create_all(engine, tables=[model.__table__ for model in models])
+    with Session(engine) as session:
+        session.add_all([Category(id=1, name="Житло", self_id=1), Service(id=1, name="DOMRIA API"),
+                         OperationType(id=1, name="Продаж", self_id=201)])
+        session.add_all([State(id=id_, name=f"State{id_}", self_id=110 + id_) for id_ in range(1, 4)])
+        session.add_all([City(id=id_, name=f"City{id_}", self_id=300 + id_, state_id=id_ % 3 + 1)
+                         for id_ in range(1, 11)])
+        session.add_all([RealtyType(id=id_, name=f"Type{id_}", self_id=100 + id_, category_id=1)
+                         for id_ in range(1, 4)])
+        for id_ in range(1, REALTIES_NUMBER + 1):
+            session.add(RealtyDetails(id=id_, price=1000.0 * id_, square=50.0, published_at=datetime(2021, 5, 1),
+                                      original_url=f"https://dom.ria.com/{id_}.html"))
+            session.add(Realty(id=id_, city_id=id_ % 10 + 1, state_id=id_ % 3 + 1, realty_details_id=id_,
+                               realty_type_id=id_ % 3 + 1, operation_type_id=1, service_id=1))
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+def serve_page(engine, strategy: str, page_size: int) -> int:
+    """
+    Serve realty page the same way as RealtyResource and return number of executed queries
+    """
+    with Session(engine) as session, QueryCounter(engine) as counter:
+        realties = session.query(Realty).join(RealtyDetails).filter(RealtyDetails.price >= 0) \
+            .options(*realty_loading_options(strategy)).limit(page_size).all()
+        records = serialize_realties(session, realties, REALTY_EXPANDABLE_RELATIONS)
+    assert len(records) == page_size
+    assert all(record["realty_details"]["price"] and record["city"]["name"] for record in records)
+    return counter.count
+
+
+@pytest.mark.parametrize("strategy,max_queries", [("joined", 1), ("selectin", 2)])
+def test_queries_per_page_are_constant(sqlite_engine, strategy, max_queries):
+    """
+    Checking that number of queries doesn't depend on page size
+    """
+    REFERENCE_CACHE.clear()
+    cold_queries = serve_page(sqlite_engine, strategy, REALTIES_NUMBER)
+    assert cold_queries == max_queries + len(REALTY_EXPANDABLE_RELATIONS)
+
+    for page_size in (5, 20, REALTIES_NUMBER):
+        assert serve_page(sqlite_engine, strategy, page_size) == max_queries
+
+
+def test_lazy_strategy_is_detected(sqlite_engine):
+    """
+    Checking that harness catches query per row
+    """
+    assert serve_page(sqlite_engine, "lazy", 20) > 20
+
+
+def test_unknown_strategy():
+    """
+    Checking that misconfigured strategy is reported
+    """
+    with pytest.raises(ValueError):
+        realty_loading_options("eager")
@@ -0,0 +1,91 @@
+"""
+Logger setup testing module
+"""
+import json
+import logging
+import os
+
+import pytest
+
+from logs.logger import (PROJECT_DIR, DebugSamplingFilter, JsonFormatter, LazyQueueHandler, ModuleLevelFilter,
+                         setup_logger)
+
+
+def make_record(level: int = logging.DEBUG, pathname: str = "service_api/utils/loaders.py", lineno: int = 1,
+                msg: str = "message %s", args=("arg",)) -> logging.LogRecord:
+    """
+    Build log record logged from the project file
+    """
+    return logging.LogRecord("test", level, os.path.join(PROJECT_DIR, pathname), lineno, msg, args, None)
+
+
+def test_json_formatter():
+    """
+    Checking that record is formatted as json with extra fields
+    """
+    record = make_record(logging.INFO)
+    record.realty_id = 5
+    data = json.loads(JsonFormatter().format(record))
+
+    assert data["message"] == "message arg"
+    assert data["module"] == "service_api.utils.loaders"
+    assert data["level"] == "INFO"
+    assert data["realty_id"] == 5
+
+
+@pytest.mark.parametrize("pathname,level,expected", [
+    ("service_api/celery_tasks/updaters.py", logging.DEBUG, False),
+    ("service_api/celery_tasks/updaters.py", logging.INFO, True),
+    ("service_api/celery_tasks/tasks.py", logging.DEBUG, True),
+    ("service_api/client_api/resources.py", logging.DEBUG, False),
+    ("service_api/client_api/resources.py", logging.WARNING, True)])
+def test_module_level_filter(pathname, level, expected):
+    """
+    Checking that the longest configured module prefix defines the level
+    """
+    module_filter = ModuleLevelFilter(logging.INFO, {"service_api.celery_tasks": logging.DEBUG,
+                                                     "service_api.celery_tasks.updaters": logging.INFO})
+    assert module_filter.filter(make_record(level, pathname)) is expected
+
+
+def test_debug_sampling_filter():
+    """
+    Checking that every n-th DEBUG record of every call site is kept
+    """
+    sampling_filter = DebugSamplingFilter(0.1)
+
+    assert sum(sampling_filter.filter(make_record(lineno=1)) for _ in range(100)) == 10
+    assert sampling_filter.filter(make_record(lineno=2))
+    assert all(sampling_filter.filter(make_record(logging.INFO)) for _ in range(10))
+    assert not DebugSamplingFilter(0).filter(make_record())
+
+
+def test_queue_handler_formats_message_before_enqueueing():
+    """
+    Checking that args changed after logging call don't change the message written by listener
+    """
+    ids = [1]
+    record = make_record(msg="loaded %s", args=(ids,))
+    prepared = LazyQueueHandler(None).prepare(record)
+    ids.append(2)
+
+    assert prepared.getMessage() == "loaded [1]"
+    assert prepared.args is None
+    assert record.args == (ids,)
+
+
+def test_setup_logger(tmp_path):
+    """
+    Checking that records are written to file by listener thread
+    """
+    log_file = tmp_path / "service.log"
+    logger = setup_logger("test_logger", str(log_file), logging.INFO)
+    logger.debug("skipped")
+    logger.info("loaded %s realties", 3, extra={"service": "DOMRIA API"})
+    for handler in logger.handlers:
+        handler.async_logging.stop()
+        logger.removeHandler(handler)
+
+    data, = [json.loads(line) for line in log_file.read_text(encoding="utf-8").splitlines()]
+    assert data["message"] == "loaded 3 realties"
+    assert data["service"] == "DOMRIA API"
@@ -0,0 +1,71 @@
+"""
+Metrics testing module
+"""
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from prometheus_client import REGISTRY
+
+from service_api import flask_app
+from service_api.client_api.utils import get_hash
+from service_api.metrics import CeleryQueueCollector, observe_task_duration, start_task_timer
+
+
+def sample(name, **labels):
+    """
+    Current value of metric sample or 0
+    """
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_request_latency_is_observed():
+    """
+    Checking that latency of requests is measured by endpoint
+    """
+    labels = {"endpoint": "metricsresource", "method": "GET", "status": "200"}
+    before = sample("http_request_duration_seconds_count", **labels)
+    with patch("service_api.metrics.DomriaBudgetCollector.collect", return_value=[]), \
+            patch("service_api.metrics.CeleryQueueCollector.collect", return_value=[]):
+        response = flask_app.test_client().get("/metrics")
+
+    assert response.status_code == 200
+    assert b"http_request_duration_seconds" in response.data
+    assert sample("http_request_duration_seconds_count", **labels) == before + 1
+
+
+@patch("service_api.client_api.utils.CACHE")
+def test_cache_hits_and_misses(mock_cache):
+    """
+    Checking that cache lookups are counted
+    """
+    hits, misses = sample("cache_requests_total", cache="test", result="hit"), \
+        sample("cache_requests_total", cache="test", result="miss")
+    mock_cache.get.side_effect = ["[]", None, None]
+    for _ in range(3):
+        get_hash({"filters": 1}, "test")
+
+    assert sample("cache_requests_total", cache="test", result="hit") == hits + 1
+    assert sample("cache_requests_total", cache="test", result="miss") == misses + 2
+
+
+def test_task_duration_is_observed():
+    """
+    Checking that duration of celery task is observed by task name and state
+    """
+    task = SimpleNamespace(name="test_task", request=SimpleNamespace())
+    start_task_timer(task_id="1", task=task)
+    observe_task_duration(task_id="1", task=task, state="SUCCESS")
+
+    assert sample("celery_task_duration_seconds_count", task="test_task", state="SUCCESS") == 1
+
+
+@patch("service_api.CACHE")
+def test_celery_queue_collector(mock_cache):
+    """
+    Checking that queue lengths are read from broker lists
+    """
+    mock_cache.llen.side_effect = lambda queue: {"interactive": 1, "crawl": 20, "refresh": 3}[queue]
+    gauge, = CeleryQueueCollector().collect()
+
+    assert {sample.labels["queue"]: sample.value for sample in gauge.samples} == \
+        {"interactive": 1, "crawl": 20, "refresh": 3}
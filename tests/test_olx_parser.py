@@ -0,0 +1,70 @@
+"""
+OLX parser with compiled specification testing module
+"""
+import re
+from unittest.mock import patch
+
+from service_api.constants import PATH_TO_PARSER_METADATA
+from service_api.services.olx.convertors import OlxParser
+from service_api.services.olx.parser_spec import get_parser_spec
+from service_api.utils import open_metadata
+
+AD_PAGE = """<html><body>
+<ol><li><a class="css-862oeo" href="/uk/">Головна</a></li>
+<li><a class="css-862oeo" href="/uk/nedvizhimost/">Нерухомість</a></li>
+<li><a class="css-862oeo" href="/uk/nedvizhimost/kvartiry-komnaty/">Квартири, кімнати</a></li>
+<li><a class="css-862oeo" href="/uk/prodazha-kvartir-komnat/">Продаж квартир і кімнат</a></li></ol>
+<span class="css-19yf5ek">05 травня 2021 р.</span>
+<h3 class="css-8kqr5l-Text eu5v0x0">32 500<!-- --> <!-- -->грн.</h3>
+<ul class="css-sfcl1s"><li><p>Приватна особа</p></li>\
+<li><p>Тип об'єкта: Квартира</p></li><li><p>Поверх: 3</p></li>\
+<li><p>Поверховість: 9</p></li><li><p>Загальна площа: 45.5 м²</p></li></ul>
+<span class="css-7oa68k-Text eu5v0x0">ID: 681234567</span>
+</body></html>"""
+
+LOCATION = "Вінниця, Ленінський\nВінницька область"
+
+LISTING_PAGE = """<html><body>
+<a data-cy="listing-ad-title" href="https://www.olx.ua/d/uk/obyavlenie/1.html"><h6>1</h6></a>
+<a href="https://www.olx.ua/uk/">OLX</a>
+<a data-cy="listing-ad-title" href="https://www.olx.ua/d/uk/obyavlenie/2.html"><h6>2</h6></a>
+<a data-cy="page-link-next" href="https://www.olx.ua/uk/nedvizhimost/?page=2">Далі</a>
+</body></html>"""
+
+
+def test_parse_ad_page():
+    """
+    Checking that ad page is parsed with compiled specification without pattern lookups in re module
+    """
+    parser = OlxParser(open_metadata(PATH_TO_PARSER_METADATA)["OLX"])
+
+    with patch.object(re, "_compile", side_effect=AssertionError("pattern is compiled while parsing")):
+        result = parser.parse_page(AD_PAGE, LOCATION)
+
+    assert result == {"realty_type_id": "Квартира", "floor": 3, "floors_number": 9, "square": 45.5,
+                      "price": (32500.0, "грн."), "published_at": "2021-05-05 00:00:00", "city_id": "Вінниця",
+                      "state_id": "Вінницька", "operation_type_id": "Продаж", "original_id": 681234567}
+    assert parser.spec is get_parser_spec("OLX")
+
+
+def test_parse_listing_page():
+    """
+    Checking that only ads links and the next page link are taken from listing page
+    """
+    assert OlxParser.parse_listing(LISTING_PAGE) == (["https://www.olx.ua/d/uk/obyavlenie/1.html",
+                                                      "https://www.olx.ua/d/uk/obyavlenie/2.html"],
+                                                     "https://www.olx.ua/uk/nedvizhimost/?page=2")
+
+
+def test_ad_elements_with_extra_classes_are_kept():
+    """
+    Checking that strainer keeps elements that have classes besides classes of selectors
+    """
+    parser = OlxParser(open_metadata(PATH_TO_PARSER_METADATA)["OLX"])
+    page = AD_PAGE.replace('class="css-sfcl1s"', 'class="css-sfcl1s extra"')
+
+    assert parser.spec.is_ad_element("ul", {"class": ["extra", "css-sfcl1s"]})
+    assert parser.spec.is_ad_element("h3", {"class": "eu5v0x0 css-8kqr5l-Text"})
+    assert not parser.spec.is_ad_element("h3", {"class": "css-8kqr5l-Text"})
+    assert not parser.spec.is_ad_element("div", {"class": "css-sfcl1s"})
+    assert parser.parse_page(page, LOCATION)["floor"] == 3
@@ -0,0 +1,166 @@
+"""
+Caching of service pages and scraped ads testing module
+"""
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from service_api.constants import PATH_TO_METADATA, PATH_TO_PARSER_METADATA
+from service_api.exceptions import ResponseNotOkException
+from service_api.services.domria.handlers import DomriaServiceHandler
+from service_api.services.olx.convertors import OlxParser, listing_page_url
+from service_api.services.page_cache import ad_key, page_slices
+from service_api.utils import open_metadata
+
+
+class FakeCache:
+    """
+    Dict with the part of redis client interface used by caches
+    """
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        """
+        Value by key
+        """
+        return self.data.get(key)
+
+    def mget(self, keys):
+        """
+        Values by keys
+        """
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, *args):
+        """
+        Save value, expiration is ignored
+        """
+        self.data[key] = value
+
+
+def domria_filters(page, page_ads_number):
+    """
+    Filters of DomRia request with page and its size
+    """
+    return {"realty_filters": {}, "characteristics": {},
+            "additional": {"page": page, "page_ads_number": page_ads_number}}
+
+
+def test_page_slices():
+    """
+    Checking that range of results is split by pages of service
+    """
+    assert list(page_slices(10, 20, 100)) == [(0, 10, 20)]
+    assert list(page_slices(90, 215, 100)) == [(0, 90, 100), (1, 0, 100), (2, 0, 15)]
+    assert not list(page_slices(10, 10, 100))
+
+
+@patch("service_api.CACHE", new_callable=FakeCache)
+@patch.object(DomriaServiceHandler, "create_records", side_effect=lambda ids, metadata: ids)
+@patch("service_api.services.domria.handlers.DomriaLimitationSystem.get_token", return_value="token")
+@patch("service_api.services.domria.handlers.DomRiaInputConverter.convert", return_value={"page": 1})
+@patch("service_api.services.domria.handlers.send_request")
+def test_domria_pages_share_search_pages(mock_request, *_):
+    """
+    Checking that client pages of different sizes are assembled from search pages requested once
+    """
+    def search_page(*args, params, **kwargs):
+        first = (params["page"] - 1) * 100
+        return SimpleNamespace(status_code=200, json=lambda: {"items": list(range(first, first + 100))})
+
+    mock_request.side_effect = search_page
+    metadata = open_metadata(PATH_TO_METADATA)["DOMRIA API"]
+
+    assert DomriaServiceHandler(domria_filters(1, 10), metadata).get_latest_data() == list(range(10, 20))
+    assert DomriaServiceHandler(domria_filters(0, 20), metadata).get_latest_data() == list(range(20))
+    assert DomriaServiceHandler(domria_filters(6, 15), metadata).get_latest_data() == list(range(90, 105))
+    assert [call.kwargs["params"]["page"] for call in mock_request.call_args_list] == [1, 2]
+    assert mock_request.call_args.kwargs["params"][metadata["token_name"]] == "token"
+
+
+@patch("service_api.CACHE", new_callable=FakeCache)
+@patch("service_api.services.domria.handlers.get_all_responses")
+def test_domria_cached_ads_are_not_requested(mock_responses, mock_cache):
+    """
+    Checking that ads are taken from cache without requests
+    """
+    metadata = open_metadata(PATH_TO_METADATA)["DOMRIA API"]
+    mock_cache.set(ad_key("DOMRIA API", 1), '[{"city_id": 1}, {"original_id": 1}]')
+
+    assert DomriaServiceHandler.create_records([1], metadata) == [[{"city_id": 1}, {"original_id": 1}]]
+    mock_responses.assert_not_called()
+
+
+@patch("service_api.CACHE", new_callable=FakeCache)
+@patch("service_api.services.domria.handlers.DomriaLimitationSystem.get_token", return_value="token")
+@patch("service_api.services.domria.handlers.DomRiaOutputConverter")
+@patch("service_api.services.domria.handlers.get_all_responses")
+def test_domria_partly_cached_ads_keep_search_order(mock_responses, mock_converter, _, mock_cache):
+    """
+    Checking that cached and requested ads are returned in the order of search results
+    """
+    metadata = open_metadata(PATH_TO_METADATA)["DOMRIA API"]
+    mock_cache.set(ad_key("DOMRIA API", 2), '[{"city_id": 2}, {"original_id": 2}]')
+    mock_responses.return_value = [SimpleNamespace(ok=True, json=lambda ad_id=ad_id: ad_id) for ad_id in (1, 3)]
+    mock_converter.side_effect = lambda ad_id, metadata: SimpleNamespace(
+        make_realty_data=lambda: {"city_id": ad_id}, make_realty_details_data=lambda: {"original_id": ad_id})
+
+    records = DomriaServiceHandler.create_records([1, 2, 3], metadata)
+
+    assert [realty_data["city_id"] for realty_data, _ in records] == [1, 2, 3]
+    assert mock_responses.call_args.args[2] == [1, 3]
+
+
+@patch("service_api.CACHE", new_callable=FakeCache)
+@patch.object(OlxParser, "find_all_ads_on_the_page")
+def test_olx_listing_pages_are_cached(mock_listing, _):
+    """
+    Checking that listing pages are requested once for client pages of any size
+    """
+    listing = {"page1": ([f"ad{index}" for index in range(4)], "page1?page=2"),
+               "page1?page=2": ([f"ad{index}" for index in range(4, 8)], None),
+               "page1?page=3": ([], None)}
+    mock_listing.side_effect = listing.get
+    parser = OlxParser(open_metadata(PATH_TO_PARSER_METADATA)["OLX"])
+
+    assert parser.get_ads_urls("page1", 1, 3) == ["ad3", "ad4", "ad5"]
+    assert parser.get_ads_urls("page1", 0, 6) == [f"ad{index}" for index in range(6)]
+    assert parser.get_ads_urls("page1", 1, 5) == ["ad5", "ad6", "ad7"]
+    # the third page after the last one may be requested concurrently, it is not used
+    assert [call.args[0] for call in mock_listing.call_args_list][:2] == ["page1", "page1?page=2"]
+
+
+@patch("service_api.CACHE", new_callable=FakeCache)
+@patch.object(OlxParser, "find_all_ads_on_the_page")
+def test_olx_deep_page_requests_only_needed_listing_pages(mock_listing, _):
+    """
+    Checking that listing pages are addressed by number and pages before the needed ones are not requested
+    """
+    def listing_page(link):
+        page = int(link.partition("page=")[2] or 1)
+        return [f"ad{index}" for index in range((page - 1) * 4, page * 4)], listing_page_url("search?q=1", page + 1)
+
+    mock_listing.side_effect = listing_page
+    parser = OlxParser(open_metadata(PATH_TO_PARSER_METADATA)["OLX"])
+
+    assert parser.get_ads_urls("search?q=1", 5, 6) == [f"ad{index}" for index in range(30, 36)]
+    assert sorted(call.args[0] for call in mock_listing.call_args_list) == \
+        ["search?q=1", "search?q=1&page=8", "search?q=1&page=9"]
+
+
+@patch("service_api.CACHE", new_callable=FakeCache)
+@patch("service_api.services.domria.handlers.DomriaLimitationSystem.get_token", return_value="token")
+@patch("service_api.services.domria.handlers.get_all_responses")
+def test_domria_failed_ads_are_not_empty_result(mock_responses, *_):
+    """
+    Checking that ads that were found but all failed to load are a failure of service
+    """
+    metadata = open_metadata(PATH_TO_METADATA)["DOMRIA API"]
+    mock_responses.return_value = [SimpleNamespace(ok=False, content=b"error")] * 2
+
+    with pytest.raises(ResponseNotOkException):
+        DomriaServiceHandler.create_records([1, 2], metadata)
+    assert DomriaServiceHandler.create_records([], metadata) == []
@@ -0,0 +1,94 @@
+"""
+Profiling testing module
+"""
+import os
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from service_api import celery_app, flask_app
+from service_api.profiling import SQLRecorder, list_profiles, profile_execution, summarize_profile
+
+
+@pytest.fixture
+def profiles_dir(tmp_path):
+    """
+    Save profiles to temporary directory
+    """
+    with patch.dict(flask_app.config, {"PROFILING_DIR": str(tmp_path), "PROFILING_TOKEN": "secret"}):
+        yield tmp_path
+
+
+def slow_function():
+    """
+    Function that should be seen in profile
+    """
+    return sum(range(10 ** 6))
+
+
+def test_profile_execution(profiles_dir):
+    """
+    Checking that profile and SQL statements of the block are saved
+    """
+    db_engine = create_engine("sqlite://")
+    with profile_execution("POST /realty", db_engine) as profile_id:
+        slow_function()
+        with db_engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        with profile_execution("nested", db_engine) as nested_id:
+            assert nested_id is None
+
+    assert sorted(os.listdir(profiles_dir)) == [f"{profile_id}.json", f"{profile_id}.prof"]
+    summary, = list_profiles()
+    assert summary["id"] == profile_id
+    assert summary["name"] == "POST /realty"
+    assert summary["sql_count"] == 1
+
+    report = summarize_profile(profile_id)
+    assert "slow_function" in report
+    assert "SELECT 1" in report
+
+
+def test_profile_execution_recording_fails(profiles_dir):
+    """
+    Checking that error of statements recording is raised and the profile is still saved
+    """
+    with patch.object(SQLRecorder, "__enter__", side_effect=RuntimeError("no events")):
+        with pytest.raises(RuntimeError, match="no events"):
+            with profile_execution("POST /realty", create_engine("sqlite://")):
+                pass
+
+    summary, = list_profiles()
+    assert summary["sql_count"] == 0
+
+
+@pytest.mark.parametrize(("token", "profiled"), (("secret", True), ("wrong", False), (None, False)))
+def test_request_profiling(profiles_dir, token, profiled):
+    """
+    Checking that only requests with valid token are profiled
+    """
+    headers = {"X-Profile": token} if token else {}
+    with patch("service_api.metrics.DomriaBudgetCollector.collect", return_value=[]), \
+            patch("service_api.metrics.CeleryQueueCollector.collect", return_value=[]):
+        response = flask_app.test_client().get("/metrics", headers=headers)
+
+    assert response.status_code == 200
+    assert ("X-Profile-Id" in response.headers) is profiled
+    assert [summary["id"] for summary in list_profiles()] == ([response.headers["X-Profile-Id"]] if profiled else [])
+
+
+def test_task_profiling(profiles_dir):
+    """
+    Checking that task is profiled when it is sent with profile kwarg
+    """
+    @celery_app.task(name="tests.add")
+    def add(first, second):
+        return first + second
+
+    assert add.apply(args=(1, 2)).get() == 3
+    assert not list_profiles()
+
+    assert add.apply(args=(1, 2), kwargs={"profile": True}).get() == 3
+    summary, = list_profiles()
+    assert summary["name"] == "task tests.add"
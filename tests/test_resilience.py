@@ -0,0 +1,114 @@
+"""
+Service requests resilience testing module
+"""
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from requests.exceptions import ConnectionError as RequestsConnectionError
+
+from service_api.exceptions import CircuitOpenError
+from service_api.services.resilience import CircuitBreaker, ServicePolicy
+
+
+def responses(*items):
+    """
+    Request function that returns responses with given statuses or raises given exceptions in turn
+    """
+    calls = iter(items)
+
+    def request():
+        item = next(calls)
+        if isinstance(item, Exception):
+            raise item
+        return SimpleNamespace(status_code=item)
+    return request
+
+
+@patch("service_api.services.resilience.time.sleep")
+@patch("service_api.CACHE")
+def test_failed_requests_are_retried(mock_cache, mock_sleep):
+    """
+    Checking that server errors and network errors are retried and success closes breaker
+    """
+    mock_cache.exists.return_value = 0
+    policy = ServicePolicy("DOMRIA API", retries=2, backoff=0.5)
+
+    assert policy.call(responses(503, RequestsConnectionError(), 200)).status_code == 200
+    assert mock_sleep.call_count == 2
+    assert 0.25 <= mock_sleep.call_args_list[0].args[0] <= 0.75
+    assert 0.5 <= mock_sleep.call_args_list[1].args[0] <= 1.5
+    mock_cache.delete.assert_called_once_with("circuit:DOMRIA API:failures")
+
+
+@patch("service_api.services.resilience.time.sleep")
+@patch("service_api.CACHE")
+def test_failure_is_recorded_after_last_retry(mock_cache, mock_sleep):
+    """
+    Checking that response of the last attempt is returned and network error of the last attempt is raised
+    """
+    mock_cache.exists.return_value = 0
+    pipe = mock_cache.pipeline.return_value.__enter__.return_value
+    pipe.incr.return_value.expire.return_value.execute.return_value = [1, True]
+    policy = ServicePolicy("OLX", retries=1)
+
+    assert policy.call(responses(502, 500)).status_code == 500
+    with pytest.raises(RequestsConnectionError):
+        policy.call(responses(RequestsConnectionError(), RequestsConnectionError()))
+    assert pipe.incr.call_count == 2
+    assert policy.call(responses(404)).status_code == 404
+
+
+@patch("service_api.CACHE")
+def test_circuit_breaker(mock_cache):
+    """
+    Checking that breaker opens after threshold of failures and requests fail fast while it is open
+    """
+    pipe = mock_cache.pipeline.return_value.__enter__.return_value
+    pipe.incr.return_value.expire.return_value.execute.return_value = [3, True]
+    CircuitBreaker("OLX", failure_threshold=3, open_seconds=60).record_failure()
+
+    pipe.set.assert_any_call("circuit:OLX:open", 1, ex=60)
+    pipe.set.assert_any_call("circuit:OLX:failures", 2, ex=120)
+
+    mock_cache.exists.return_value = 1
+    with pytest.raises(CircuitOpenError):
+        ServicePolicy("OLX").call(responses())
+
+
+@patch("service_api.CACHE")
+def test_hedged_request(mock_cache):
+    """
+    Checking that second request is sent for slow single ad fetch and the first response wins
+    """
+    mock_cache.exists.return_value = 0
+    delays = iter((1.0, 0.0))
+
+    def request():
+        delay = next(delays)
+        time.sleep(delay)
+        return SimpleNamespace(status_code=200, delay=delay)
+
+    policy = ServicePolicy("OLX", hedge_after=0.05)
+    started_at = time.perf_counter()
+
+    assert policy.call(request, hedge=True).delay == 0.0
+    assert time.perf_counter() - started_at < 0.5
+
+
+@patch("service_api.services.resilience.time.sleep")
+@patch("service_api.CACHE")
+def test_failed_responses_are_not_retried_by_domria_policy(mock_cache, mock_sleep):
+    """
+    Checking that DomRia responses that spend tokens budget aren't retried, network errors still are
+    """
+    mock_cache.exists.return_value = 0
+    pipe = mock_cache.pipeline.return_value.__enter__.return_value
+    pipe.incr.return_value.expire.return_value.execute.return_value = [1, True]
+    policy = ServicePolicy.for_service("DOMRIA API")
+
+    assert policy.call(responses(503, 200)).status_code == 503
+    pipe.incr.assert_called_once_with("circuit:DOMRIA API:failures")
+    assert policy.call(responses(RequestsConnectionError(), 200)).status_code == 200
+    assert mock_sleep.call_count == 1
@@ -0,0 +1,60 @@
+"""
+Filters validation testing module
+"""
+import pytest
+
+from service_api.exceptions import BadFiltersException
+from service_api.models import AdditionalFilters, Realty, RealtyDetails
+from service_api.schemas import (AdditionalFilterParametersSchema, RealtyDetailsInputSchema, RealtySchema,
+                                 filters_validation, get_filters_validator)
+
+VALIDATORS = [(Realty, RealtySchema),
+              (RealtyDetails, RealtyDetailsInputSchema),
+              (AdditionalFilters, AdditionalFilterParametersSchema)]
+
+
+def test_filters_are_split_by_models():
+    """
+    Checking that every key goes to filters of its model
+    """
+    params = {"city_id": 1, "realty_type_id": 2, "operation_type_id": 1, "price": {"ge": 100, "le": 200},
+              "floor": None, "page": 1, "page_ads_number": 10}
+
+    assert filters_validation(params, VALIDATORS) == [
+        {"city_id": 1, "realty_type_id": 2, "operation_type_id": 1},
+        {"price": {"ge": 100, "le": 200}, "floor": None},
+        {"page": 1, "page_ads_number": 10}]
+
+
+@pytest.mark.parametrize("params", ({"realty_type_id": 2, "operation_type_id": 1, "page": 1,
+                                     "page_ads_number": 10, "unknown": 1},
+                                    {"realty_type_id": 2, "operation_type_id": 1, "page": 1,
+                                     "page_ads_number": 10, "id": 1}))
+def test_undefined_parameters(params):
+    """
+    Checking that unknown keys and keys of several models are rejected
+    """
+    with pytest.raises(BadFiltersException) as error:
+        filters_validation(params, VALIDATORS)
+    assert error.value.args == ("Undefined parameters found",)
+
+
+def test_bad_filters():
+    """
+    Checking that schema errors are passed in the exception description
+    """
+    params = {"realty_type_id": "flat", "operation_type_id": 1, "page": 1, "page_ads_number": 10}
+    with pytest.raises(BadFiltersException) as error:
+        filters_validation(params, VALIDATORS)
+    assert error.value.desc == ({"realty_type_id": ["Not a valid integer."]},)
+
+
+def test_validator_is_built_once():
+    """
+    Checking that the same validator with the same schema instances is reused
+    """
+    validator = get_filters_validator(tuple(map(tuple, VALIDATORS)))
+    filters_validation({"realty_type_id": 2, "operation_type_id": 1, "page": 1, "page_ads_number": 10}, VALIDATORS)
+
+    assert get_filters_validator(tuple(map(tuple, VALIDATORS))) is validator
+    assert validator.buckets["page"] == (2,)
@@ -0,0 +1,97 @@
+"""
+Negative scrape results caching testing module
+"""
+import datetime
+from unittest.mock import patch
+
+from prometheus_client import REGISTRY
+
+from service_api.client_api.utils import cache_latest_data, get_cached_latest_data
+from service_api.exceptions import ResponseNotOkException
+from service_api.utils.db import RealtyFetcher
+from service_api.utils.scrape_cache import unavailable_services
+
+FILTERS = {"realty_filters": {"realty_type_id": 1}, "characteristics": {},
+           "additional": {"page": 0, "page_ads_number": 10}}
+
+
+def avoided(service, reason):
+    """
+    Current number of avoided scrapes
+    """
+    return REGISTRY.get_sample_value("scrapes_avoided_total", {"service": service, "reason": reason}) or 0
+
+
+@patch("service_api.CACHE")
+def test_unavailable_services(mock_cache):
+    """
+    Checking that services are marked unavailable one by one
+    """
+    mock_cache.mget.return_value = [None, "1"]
+
+    assert unavailable_services(["OLX", "DOMRIA API"]) == ["OLX"]
+    mock_cache.mget.assert_called_once_with(["service_unavailable:DOMRIA API", "service_unavailable:OLX"])
+
+
+@patch("service_api.client_api.utils.CACHE")
+@patch("service_api.CACHE")
+def test_latest_data_cache_time(mock_cache, mock_client_cache):
+    """
+    Checking that empty results are cached shorter and not cached while some service is unavailable
+    """
+    mock_cache.mget.return_value = [None, None]
+    cache_latest_data(FILTERS, [])
+    cache_latest_data(FILTERS, [{"id": 1}])
+
+    mock_cache.mget.return_value = [None, "1"]
+    cache_latest_data(FILTERS, [])
+    cache_latest_data(FILTERS, [{"id": 1}])
+
+    assert [call.args[2] for call in mock_client_cache.set.call_args_list] == \
+        [datetime.timedelta(minutes=10), datetime.timedelta(hours=2), datetime.timedelta(minutes=2)]
+
+
+@patch("service_api.client_api.utils.CACHE")
+def test_cached_empty_result_is_counted(mock_client_cache):
+    """
+    Checking that cached empty result is returned and counted as avoided scrape
+    """
+    before = avoided("all", "empty")
+    mock_client_cache.get.side_effect = ["[]", None]
+
+    assert get_cached_latest_data(FILTERS) == []
+    assert get_cached_latest_data(FILTERS) is None
+    assert avoided("all", "empty") == before + 1
+
+
+@patch("service_api.utils.db.services_handlers")
+@patch("service_api.utils.db.is_empty_result_cached", return_value=True)
+@patch("service_api.utils.db.unavailable_services", return_value=["DOMRIA API"])
+def test_fetcher_skips_negative_results(mock_unavailable, mock_empty, mock_handlers):
+    """
+    Checking that unavailable services and services without realties for filters are not scraped
+    """
+    domria_before, olx_before = avoided("DOMRIA API", "service_unavailable"), avoided("OLX", "empty")
+
+    assert RealtyFetcher(FILTERS).fetch() == []
+    mock_handlers.get.return_value.assert_not_called()
+    assert mock_empty.call_args.args[0] == "OLX"
+    assert avoided("DOMRIA API", "service_unavailable") == domria_before + 1
+    assert avoided("OLX", "empty") == olx_before + 1
+
+
+@patch("service_api.utils.db.services_handlers")
+@patch("service_api.utils.db.cache_empty_result")
+@patch("service_api.utils.db.mark_service_unavailable")
+@patch("service_api.utils.db.is_empty_result_cached", return_value=False)
+@patch("service_api.utils.db.unavailable_services", return_value=[])
+def test_fetcher_doesnt_cache_failed_ads_as_empty(mock_unavailable, mock_empty, mock_mark, mock_cache_empty,
+                                                  mock_handlers):
+    """
+    Checking that service whose ads requests all failed is marked unavailable instead of having no realties
+    """
+    mock_handlers.get.return_value.return_value.iter_latest_data.side_effect = ResponseNotOkException("failed")
+
+    assert RealtyFetcher(FILTERS).fetch() == []
+    assert [call.args[0] for call in mock_mark.call_args_list] == ["DOMRIA API", "OLX"]
+    mock_cache_empty.assert_not_called()
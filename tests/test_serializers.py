@@ -0,0 +1,89 @@
+"""
+Precompiled serializers testing module
+"""
+import json
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask_restful import output_json
+
+import service_api
+from service_api.models import City, OperationType, Realty, RealtyDetails, RealtyType, Service, State
+from service_api.schemas import (CitySchema, OperationTypeSchema, RealtyDetailsSchema, RealtySchema, RealtyTypeSchema,
+                                 ServiceSchema, StateSchema)
+from service_api.serializers import dumps, serialize
+
+
+def make_realty(realty_id: int, with_details: bool = True) -> Realty:
+    """
+    Build realty with all relations without DB
+    """
+    details = RealtyDetails(id=realty_id, floor=None if realty_id % 2 else 3, floors_number=9, square=45.5,
+                            price=1000.0 * realty_id, published_at=datetime(2021, 5, realty_id % 28 + 1, 12, 30),
+                            original_url=f"https://dom.ria.com/uk/{realty_id}.html", original_id=realty_id)
+    return Realty(id=realty_id, city=City(id=1, name="Київ", self_id=301, state_id=1),
+                  state=State(id=1, name="Київська", self_id=111),
+                  realty_type=RealtyType(id=2, name="Квартира", self_id=102, category_id=1),
+                  operation_type=OperationType(id=1, name="Продаж", self_id=201),
+                  service=Service(id=1, name="DOMRIA API"),
+                  realty_details=details if with_details else None)
+
+
+@pytest.mark.parametrize(("schema", "obj"),
+                         ((StateSchema, State(id=1, name="Київська", self_id=111)),
+                          (CitySchema, City(id=1, name="Київ", self_id=301, state_id=1)),
+                          (RealtyTypeSchema, RealtyType(id=2, name="Квартира", self_id=102, category_id=1)),
+                          (OperationTypeSchema, OperationType(id=1, name="Продаж", self_id=201)),
+                          (ServiceSchema, Service(id=1, name="OLX")),
+                          (RealtyDetailsSchema, make_realty(3).realty_details),
+                          (RealtySchema, make_realty(4)),
+                          (RealtySchema, make_realty(5, with_details=False)),
+                          (StateSchema, None),
+                          (StateSchema, {"id": 1, "name": "Київська", "self_id": 111, "unknown": 1})))
+def test_serializer_matches_marshmallow(schema, obj):
+    """
+    Checking that compiled serializer gives the same output as marshmallow dump
+    """
+    expected = schema().dump(obj)
+    actual = serialize(schema, obj)
+
+    assert actual == expected
+    assert json.dumps(actual, ensure_ascii=False) == json.dumps(expected, ensure_ascii=False)
+    assert dumps(actual) == dumps(expected)
+
+
+def test_many_serializer_matches_marshmallow():
+    """
+    Checking serialization of lists
+    """
+    realties = [make_realty(realty_id) for realty_id in range(1, 20)]
+
+    assert dumps(serialize(RealtySchema, realties, many=True)) == dumps(RealtySchema(many=True).dump(realties))
+    assert serialize(RealtySchema, [], many=True) == []
+
+
+@pytest.mark.parametrize(("url", "schema", "objects"),
+                         (("/states", StateSchema, [State(id=1, name="Київська", self_id=111),
+                                                    State(id=2, name="Львівська", self_id=112)]),
+                          ("/realty_types", RealtyTypeSchema, [RealtyType(id=2, name="Квартира", self_id=102,
+                                                                          category_id=1)]),
+                          ("/operation_types", OperationTypeSchema, [])))
+def test_list_response_body_matches_baseline(url, schema, objects):
+    """
+    Checking that response body of list endpoint is byte-identical to marshmallow dump encoded by output_json
+    """
+    app = service_api.create_app("api")
+    session = MagicMock()
+    session.query.return_value.filter_by.return_value.all.return_value = objects
+
+    with patch("service_api.client_api.resources.session_scope") as mock_session_scope:
+        mock_session_scope.return_value.__enter__.return_value = session
+        response = app.test_client().get(url, headers={"Accept": "application/json; charset=utf-8"})
+    with app.test_request_context():
+        expected = output_json(schema(many=True).dump(objects), 200).get_data()
+
+    assert response.status_code == 200
+    assert response.get_data() == expected
+    assert expected == (json.dumps(schema(many=True).dump(objects), ensure_ascii=False,
+                                   indent=4 if app.debug else None) + "\n").encode("utf-8")
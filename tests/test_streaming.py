@@ -0,0 +1,115 @@
+"""
+Streaming utils testing module
+"""
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from service_api import flask_app
+from service_api.client_api.utils import cache_streamed_response
+from service_api.constants import NDJSON_MIMETYPE
+from service_api.errors import InternalServerErrorException, ServiceUnavailableException
+from service_api.utils.streaming import (STREAM_END, STREAM_ERROR, iter_stream, ndjson_response, push_to_stream,
+                                         wants_ndjson)
+
+
+@pytest.mark.parametrize(("headers", "expected"),
+                         (({}, False),
+                          ({"Accept": "*/*"}, False),
+                          ({"Accept": "application/json"}, False),
+                          ({"Accept": NDJSON_MIMETYPE}, True)))
+def test_wants_ndjson(headers, expected):
+    """
+    Checking that streaming is used only when client asks for it
+    """
+    with flask_app.test_request_context(headers=headers):
+        assert wants_ndjson() is expected
+
+
+def test_ndjson_response():
+    """
+    Checking that every record is sent as a separate json line
+    """
+    records = [{"id": 1, "name": "Київ"}, {"id": 2, "name": "Львів"}]
+    with flask_app.test_request_context():
+        response = ndjson_response(iter(records))
+        body = "".join(response.response)
+
+    assert response.mimetype == NDJSON_MIMETYPE
+    assert [json.loads(line) for line in body.splitlines()] == records
+
+
+@patch("service_api.utils.streaming.CACHE")
+def test_stream_end_marker_is_pushed_on_error(mock_cache):
+    """
+    Checking that reader is not left waiting if producer fails
+    """
+    def records():
+        yield {"id": 1}
+        raise ValueError
+
+    with pytest.raises(ValueError):
+        push_to_stream("key", records())
+    assert mock_cache.rpush.call_args_list[-2].args == ("key", STREAM_ERROR)
+    assert mock_cache.rpush.call_args_list[-1].args == ("key", STREAM_END)
+
+
+@patch("service_api.utils.streaming.CACHE")
+def test_iter_stream_reads_till_end_marker(mock_cache):
+    """
+    Checking that records are read until end marker
+    """
+    mock_cache.blpop.side_effect = [("key", json.dumps({"id": 1})), ("key", json.dumps({"id": 2})),
+                                    ("key", STREAM_END)]
+    assert list(iter_stream("key", 1)) == [{"id": 1}, {"id": 2}]
+    mock_cache.delete.assert_called_once_with("key")
+
+
+@pytest.mark.parametrize(("items", "error"),
+                         (([("key", json.dumps({"id": 1})), ("key", STREAM_ERROR), ("key", STREAM_END)],
+                           InternalServerErrorException),
+                          ([("key", json.dumps({"id": 1})), None], ServiceUnavailableException)))
+@patch("service_api.utils.streaming.CACHE")
+def test_iter_stream_raises_if_stream_is_not_completed(mock_cache, items, error):
+    """
+    Checking that failed producer and timeout aren't taken for the end of stream
+    """
+    mock_cache.blpop.side_effect = items
+    records = iter_stream("key", 1)
+
+    assert next(records) == {"id": 1}
+    with pytest.raises(error):
+        next(records)
+    mock_cache.delete.assert_called_once_with("key")
+
+
+def test_ndjson_response_sends_error_record():
+    """
+    Checking that error record is sent as the last line if streaming fails after response is started
+    """
+    def records():
+        yield {"id": 1}
+        raise ServiceUnavailableException("Grabbing takes too long")
+
+    with flask_app.test_request_context():
+        body = "".join(ndjson_response(records()).response)
+
+    assert [json.loads(line) for line in body.splitlines()] == [
+        {"id": 1}, {"error": {"code": 503, "message": "Grabbing takes too long", "type": "Service_Unavailable_Error"}}]
+
+
+@pytest.mark.parametrize(("lines", "cached"),
+                         (([b'{"id": 1}', b"", b'{"id": 2}'], True),
+                          ([b'{"id": 1}', b'{"error": {"code": 500}}'], False)))
+@patch("service_api.client_api.utils.cache_latest_data")
+def test_streamed_response_is_cached_only_if_completed(mock_cache_latest_data, lines, cached):
+    """
+    Checking that records are passed to client as they are and cached only if grabbing completed the stream
+    """
+    response = MagicMock()
+    response.iter_lines.return_value = lines
+
+    assert list(cache_streamed_response({}, response)) == [json.loads(line) for line in lines if line]
+    assert mock_cache_latest_data.called is cached
+    response.close.assert_called_once_with()
@@ -0,0 +1,94 @@
+"""
+Celery task locks testing module
+"""
+from unittest.mock import Mock, patch
+
+from service_api.celery_tasks.locks import TaskLock, filters_key, get_skipped_tasks, singleton_task
+from service_api.constants import SKIPPED_TASKS_COUNTER
+
+
+@patch("service_api.celery_tasks.locks.CACHE")
+def test_task_runs_when_lock_acquired(mock_cache):
+    """
+    Checking that decorated task is executed and lock is released afterwards
+    """
+    mock_cache.set.return_value = True
+    task = Mock(return_value="done", __name__="task")
+
+    assert singleton_task()(task)(1, 2) == "done"
+    task.assert_called_once_with(1, 2)
+    mock_cache.eval.assert_called_once()
+    mock_cache.hincrby.assert_not_called()
+
+
+@patch("service_api.celery_tasks.locks.CACHE")
+def test_duplicated_task_is_skipped_and_counted(mock_cache):
+    """
+    Checking that task is not executed while the same task holds the lock
+    """
+    mock_cache.set.return_value = False
+    task = Mock(__name__="task")
+
+    assert singleton_task()(task)() is None
+    task.assert_not_called()
+    mock_cache.hincrby.assert_called_once_with(SKIPPED_TASKS_COUNTER, "task")
+
+
+@patch("service_api.celery_tasks.locks.CACHE")
+def test_uniqueness_key_is_part_of_lock_name(mock_cache):
+    """
+    Checking that tasks with different arguments use different locks
+    """
+    mock_cache.set.return_value = True
+    task = Mock(__name__="task")
+    decorated = singleton_task(key=filters_key)(task)
+
+    decorated({"state_id": 1})
+    decorated({"state_id": 2})
+
+    first_lock, second_lock = (call.args[0] for call in mock_cache.set.call_args_list)
+    assert first_lock != second_lock
+    assert first_lock.endswith(filters_key({"state_id": 1}))
+
+
+@patch("service_api.celery_tasks.locks.CACHE")
+def test_lock_is_released_on_error(mock_cache):
+    """
+    Checking that lock is released if task raises an error
+    """
+    mock_cache.set.return_value = True
+    task = Mock(side_effect=ValueError, __name__="task")
+
+    try:
+        singleton_task()(task)()
+    except ValueError:
+        pass
+    mock_cache.eval.assert_called_once()
+
+
+def test_filters_key_does_not_depend_on_order():
+    """
+    Checking that the same filters give the same key
+    """
+    assert filters_key({"a": 1, "b": 2}) == filters_key({"b": 2, "a": 1})
+
+
+@patch("service_api.celery_tasks.locks.CACHE")
+def test_lock_expiry(mock_cache):
+    """
+    Checking that lock is created with expiry and owner token
+    """
+    mock_cache.set.return_value = True
+    lock = TaskLock("name", {"seconds": 30})
+    with lock as acquired:
+        assert acquired
+    mock_cache.set.assert_called_once_with(lock.name, lock.token, ex=30, nx=True)
+
+
+@patch("service_api.celery_tasks.locks.CACHE")
+def test_get_skipped_tasks(mock_cache):
+    """
+    Checking that skipped counters are converted to int
+    """
+    mock_cache.hgetall.return_value = {"update_realties": "3"}
+    assert get_skipped_tasks() == {"update_realties": 3}
@@ -0,0 +1,129 @@
+"""
+Tracing testing module
+"""
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+
+from service_api import flask_app, tracing
+from service_api.tracing import (NOOP_SPAN, NoopExporter, SpanExporter, end_task_span, extract, inject,
+                                 inject_task_headers, instrument_engine, start_span, start_task_span)
+
+
+class ListExporter(SpanExporter):
+    """
+    Keeps finished spans in memory
+    """
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        """
+        Keep span
+        """
+        self.spans.append(span)
+
+
+@pytest.fixture
+def exporter():
+    """
+    Enable tracing for the test
+    """
+    list_exporter = ListExporter()
+    tracing.set_exporter(list_exporter)
+    yield list_exporter
+    tracing.set_exporter(NoopExporter())
+
+
+def test_nested_spans(exporter):
+    """
+    Checking that nested spans belong to the same trace
+    """
+    with start_span("parent") as parent:
+        with start_span("child", key="value"):
+            pass
+
+    child, exported_parent = exporter.spans
+    assert exported_parent is parent
+    assert child.trace_id == parent.trace_id and child.parent_id == parent.span_id
+    assert child.attributes == {"key": "value"}
+    assert tracing.current_span() is None
+
+
+def test_span_error(exporter):
+    """
+    Checking that exception is recorded and reraised
+    """
+    with pytest.raises(ValueError):
+        with start_span("failing"):
+            raise ValueError("bad value")
+    assert exporter.spans[0].error == "ValueError: bad value"
+
+
+def test_disabled_tracing():
+    """
+    Checking that nothing is created when tracing is disabled
+    """
+    with start_span("operation") as span:
+        assert span is NOOP_SPAN
+        assert inject() == {}
+
+
+def test_inject_extract(exporter):
+    """
+    Checking traceparent round trip
+    """
+    with start_span("operation") as span:
+        headers = inject({"Accept": "application/json"})
+    assert extract(headers["traceparent"]) == span.context
+    assert extract("broken") is None
+
+
+def test_request_span_continues_trace(exporter):
+    """
+    Checking that request span is a child of incoming traceparent
+    """
+    traceparent = "00-" + "a" * 32 + "-" + "b" * 16 + "-01"
+    with patch("service_api.metrics.get_registry") as mock_registry:
+        mock_registry.return_value.collect.return_value = []
+        flask_app.test_client().get("/metrics", headers={"traceparent": traceparent})
+
+    request_span, = [span for span in exporter.spans if span.name.startswith("GET")]
+    assert (request_span.trace_id, request_span.parent_id) == ("a" * 32, "b" * 16)
+    assert request_span.attributes["http.status_code"] == 200
+
+
+def test_db_query_spans(exporter):
+    """
+    Checking that SQL statements inside traced operation are recorded
+    """
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    with engine.connect() as connection:
+        connection.exec_driver_sql("SELECT 1")
+        with start_span("operation") as span:
+            connection.exec_driver_sql("SELECT 2")
+
+    query_span, _ = exporter.spans
+    assert query_span.attributes["db.statement"] == "SELECT 2"
+    assert query_span.parent_id == span.span_id
+
+
+def test_celery_task_continues_trace(exporter):
+    """
+    Checking trace propagation through celery message headers
+    """
+    headers = {}
+    with start_span("publisher") as publisher:
+        inject_task_headers(headers=headers)
+
+    task = SimpleNamespace(name="tasks.grab", request=SimpleNamespace(id="1", **headers))
+    start_task_span(task=task)
+    end_task_span(task=task)
+
+    task_span = exporter.spans[-1]
+    assert task_span.name == "celery tasks.grab"
+    assert (task_span.trace_id, task_span.parent_id) == (publisher.trace_id, publisher.span_id)
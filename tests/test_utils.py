@@ -0,0 +1,50 @@
+"""
+Utils testing module
+"""
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from service_api import flask_app
+from service_api.constants import PATH_TO_METADATA, PATH_TO_PARSER_METADATA
+from service_api.utils import open_metadata, send_request
+from service_api.utils.http_client import get_http_session
+
+
+def test_open_metadata_base_url_override():
+    """
+    Checking that base urls from SERVICE_BASE_URLS replace ones from metadata
+    """
+    base_urls = {"DOMRIA API": "http://127.0.0.1:8001/domria", "UNKNOWN": "http://127.0.0.1:8002"}
+    with patch.dict(flask_app.config, {"SERVICE_BASE_URLS": base_urls}):
+        metadata = open_metadata(PATH_TO_METADATA) | open_metadata(PATH_TO_PARSER_METADATA)
+
+    assert metadata["DOMRIA API"]["base_url"] == "http://127.0.0.1:8001/domria"
+    assert metadata["OLX"]["base_url"] == "https://www.olx.ua/uk/"
+    assert "UNKNOWN" not in metadata
+
+
+def test_http_sessions_share_connection_pools():
+    """
+    Checking that every thread has its own session and all sessions use one adapter
+    """
+    session = get_http_session()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        thread_session = executor.submit(get_http_session).result()
+
+    assert get_http_session() is session
+    assert thread_session is not session
+    assert thread_session.get_adapter("https://developers.ria.com") is session.get_adapter("http://127.0.0.1")
+    assert session.get_adapter("https://developers.ria.com")._pool_maxsize == flask_app.config["HTTP_POOL_MAXSIZE"]
+
+
+@patch("service_api.services.limitation.LimitationSystem.mark_token_after_request")
+@patch("service_api.utils.get_http_session")
+def test_send_request_uses_shared_session(mock_get_session, mock_mark_token):
+    """
+    Checking that requests without passed session go through shared session of the thread
+    """
+    response = send_request("GET", "https://developers.ria.com/dom/search", params={"page": 0})
+
+    mock_get_session.return_value.request.assert_called_once_with("GET", "https://developers.ria.com/dom/search",
+                                                                   params={"page": 0})
+    assert response is mock_get_session.return_value.request.return_value